@@ -8,26 +8,123 @@ if current_dir not in sys.path:
     sys.path.insert(0, current_dir)
 
 import time
+import json
 from loguru import logger
 from cryptography.hazmat.primitives import serialization
 from acme import challenges
 import acme.client as acme_client_module
 from acme import messages
+from acme import jws
 from acme.errors import Error
 
 # 从你的项目中导入
 from aliyun_dns import AliyunDNSManager
-from key_manager import KeyManager
-from typing import List, Dict, Any, Tuple
+from challenge_delegation import ChallengeDelegation
+from locks import LockManager
+from run_journal import RunJournal
+from acme_network import PooledClientNetwork, DirectoryCache
+from api_metrics import ApiMetrics
+from cassette import Cassette
+from http01 import Http01Responder, CHALLENGE_DNS01, CHALLENGE_HTTP01, CHALLENGE_POLICY_DNS, CHALLENGE_POLICY_AUTO
+from concurrent.futures import ThreadPoolExecutor
+from ca_pool import AccountCache, IssuanceRace
+from chain_selector import ChainSelector
+from key_manager import jwk_for_private_key, KeyManager, KEY_REUSE_NEW, KEY_REUSE_MAX_AGE, KEY_REUSE_FOREVER, KEY_TYPE_RSA, KEY_TYPE_EC
+from contextlib import nullcontext
+from typing import List, Dict, Any, Tuple, Optional
 from cryptography.hazmat.primitives import serialization
 
 
+def _public_key_der(key) -> bytes:
+    return key.public_key().public_bytes(serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo)
+
+
 class AcmeClient:
-    def __init__(self, acme_directory_url: str, aliyun_dns_manager: AliyunDNSManager):
+    def __init__(self, acme_directory_url: str, aliyun_dns_manager: AliyunDNSManager,
+                 challenge_delegation: Optional[ChallengeDelegation] = None, challenge_ttl: int = 600,
+                 lock_manager: Optional[LockManager] = None, journal: Optional[RunJournal] = None,
+                 directory_cache: Optional[DirectoryCache] = None, http_pool_size: int = 10,
+                 poll_log_level: str = "INFO", metrics: Optional[ApiMetrics] = None,
+                 cassette: Optional[Cassette] = None, challenge_policy: str = CHALLENGE_POLICY_DNS,
+                 challenge_overrides: Optional[Dict[str, str]] = None, http01_responder: Optional[Http01Responder] = None,
+                 chain_selector: Optional[ChainSelector] = None, account_key_type: str = KEY_TYPE_RSA):
         self.acme_directory_url = acme_directory_url
         self.aliyun_dns_manager = aliyun_dns_manager
+        self.challenge_delegation = challenge_delegation # 挑战记录的 CNAME 委派解析器（可选）
+        self.challenge_ttl = challenge_ttl # 挑战 TXT 记录的 TTL
+        self.lock_manager = lock_manager # 跨进程的区域/主机记录锁（可选）
+        self.journal = journal # 记录本次运行发布的 TXT 记录（可选）
+        self.directory_cache = directory_cache # ACME 目录的本地缓存（可选）
+        self.http_pool_size = http_pool_size # HTTP 连接池大小
+        self.poll_log_level = poll_log_level # 每次轮询挑战状态时的日志级别，证书数量较多时可设为 DEBUG
+        self.metrics = metrics if metrics is not None else ApiMetrics() # 按 ACME 端点统计请求次数和耗时
+        self.cassette = cassette # 录制/回放 ACME 请求（可选），用于离线回归测试
+        self.challenge_policy = challenge_policy # 挑战类型策略：dns-01 或 auto（非通配符域名使用 HTTP-01）
+        self.challenge_overrides = challenge_overrides or {} # 按域名指定挑战类型，优先于策略
+        self.http01_responder = http01_responder # HTTP-01 应答器（standalone 或 webroot），未配置时只使用 DNS-01
+        self.chain_selector = chain_selector # 在 CA 提供的多条证书链中选择（可选），未配置时使用默认证书链
+        self.account_key_type = account_key_type # 账户密钥类型：rsa（RS256）或 ec（ES256），缓存的账户类型不同时自动轮换
         self.client = None # ACME 客户端实例
-        self.key_manager = KeyManager() # 实例化 KeyManager
+        self.account = None # 已注册的 ACME 账户
+        self.ca_name = None # 多 CA 签发时的 CA 名称
+        self.eab_kid = None # External Account Binding（部分 CA 要求，例如 ZeroSSL）
+        self.eab_hmac_key = None
+        self.account_cache = None # 按 CA 缓存的账户（可选）
+        self._cached_regr = None
+        self.race = None # 多个 CA 同时签发时的协调者（可选）
+        self.cancel_event = None
+        self.key_manager = KeyManager(account_key_type=account_key_type) # 实例化 KeyManager
+
+    def for_ca(self, ca_name: str, directory_url: str, eab_kid: str = None, eab_hmac_key: str = None,
+               account_cache: Optional[AccountCache] = None, race: Optional[IssuanceRace] = None) -> "AcmeClient":
+        """
+        派生一个向另一个 CA 申请证书的 AcmeClient：共享 DNS 管理器、锁、挑战配置和统计，
+        使用独立的 ACME 连接和账户（优先使用缓存的账户）。
+        :param ca_name: CA 名称，用于账户缓存和多 CA 协调。
+        :param directory_url: CA 的 ACME 目录 URL。
+        :param eab_kid: (可选) External Account Binding 的 Key ID。
+        :param eab_hmac_key: (可选) External Account Binding 的 HMAC 密钥（base64url 编码）。
+        :param account_cache: (可选) 按 CA 缓存的账户。
+        :param race: (可选) 多个 CA 同时签发时的协调者，收到取消信号后尽快放弃，保存证书前需要先胜出。
+        """
+        derived = AcmeClient.__new__(AcmeClient)
+        derived.__dict__.update(self.__dict__)
+        derived.acme_directory_url = directory_url
+        derived.ca_name = ca_name
+        derived.eab_kid = eab_kid
+        derived.eab_hmac_key = eab_hmac_key
+        derived.account_cache = account_cache
+        derived.race = race
+        derived.cancel_event = race.register(ca_name) if race is not None else None
+        derived.client = None
+        derived.account = None
+        cached = account_cache.load(ca_name, directory_url) if account_cache is not None else None
+        derived._cached_regr = cached[1] if cached else None
+        derived.key_manager = KeyManager(account_key=cached[0] if cached else None, account_key_type=self.account_key_type)
+        return derived
+
+    def _check_cancelled(self) -> None:
+        """
+        多个 CA 同时签发时，其他 CA 已胜出或本 CA 已超时则抛出异常，放弃本次签发。
+        """
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise Error(f"向 {self.ca_name} 的申请已取消。")
+
+    def claim_result(self) -> bool:
+        """
+        保存证书之前调用。多个 CA 同时签发时只有第一个完成的 CA 返回 True。
+        """
+        return self.race is None or self.race.claim(self.ca_name)
+
+    def fork(self) -> "AcmeClient":
+        """
+        派生一个新的 AcmeClient：共享 ACME 连接、已注册的账户、DNS 管理器、锁和统计，但拥有独立的 KeyManager，
+        用于在同一进程中并发申请多张证书（每张证书的私钥和证书链互不影响）。
+        """
+        forked = AcmeClient.__new__(AcmeClient)
+        forked.__dict__.update(self.__dict__)
+        forked.key_manager = KeyManager(account_key=self.key_manager._account_key)
+        return forked
 
     def _init_acme_client(self) -> None:
         """
@@ -44,9 +141,22 @@ class AcmeClient:
             # 使用 KeyManager 获取账户 JWK
             account_jwk = self.key_manager.account_jwk
 
-            net=acme_client_module.ClientNetwork(account_jwk,user_agent="acme-python-client") # 使用同一个 signer 作为网络客户端的 key
+            net = PooledClientNetwork(account_jwk, alg=self.key_manager.account_alg, pool_size=self.http_pool_size, metrics=self.metrics,
+                                      directory_url=self.acme_directory_url, user_agent="acme-python-client") # 使用同一个 signer 作为网络客户端的 key
+            if self.cassette is not None:
+                self.cassette.mount(net.session, self.http_pool_size)
 
-            directory = messages.Directory.from_json(net.get(self.acme_directory_url).json())
+            if self.directory_cache is not None and self.cassette is None:
+                # 使用 cassette 时总是请求目录，使录制的交互完整，回放不依赖本地的目录缓存
+                directory = self.directory_cache.get(self.acme_directory_url, net)
+            else:
+                directory = messages.Directory.from_json(net.get(self.acme_directory_url).json())
+            net.set_directory(self.acme_directory_url, directory)
+
+            if self._cached_regr is not None:
+                # 使用缓存的账户，无需再次注册
+                self.account = messages.RegistrationResource.from_json(self._cached_regr)
+                net.account = self.account
 
             # 使用目录 URL 和账户密钥创建 ACME 客户端实例
             self.client = acme_client_module.ClientV2(
@@ -62,6 +172,32 @@ class AcmeClient:
 
         return
 
+    @property
+    def network_stats(self) -> Dict[str, Any]:
+        """
+        返回 ACME 请求的统计信息（往返次数、按方法分类的次数、nonce 请求次数等）。
+        """
+        if self.client is None or not isinstance(self.client.net, PooledClientNetwork):
+            return {}
+        return dict(self.client.net.stats)
+
+    def prefetch_nonces(self, count: int) -> int:
+        """
+        在并发发送签名请求之前预取 nonce。
+        :param count: 期望 nonce 池中至少拥有的 nonce 数量。
+        :return: 实际预取的数量。
+        """
+        if self.client is None or not isinstance(self.client.net, PooledClientNetwork):
+            return 0
+        return self.client.net.prefetch_nonces(count, self.client.directory['newNonce'])
+
+    def _directory_request_failed(self, error: Exception) -> None:
+        """
+        目录中的端点请求失败时，删除可能已失效的目录缓存。
+        """
+        if self.directory_cache is not None:
+            self.directory_cache.invalidate_after_failure(self.acme_directory_url, error)
+
     def register_acme_account(self, email: str) -> None:
         """
         注册或更新 ACME 账户。
@@ -71,6 +207,16 @@ class AcmeClient:
         if self.client is None:
             self._init_acme_client() # 确保客户端已初始化
 
+        if self.account is not None:
+            logger.info(f"ACME 账户已注册，跳过重复注册。账户 URI：{self.account.uri}")
+            if self.key_manager.account_key_type != self.account_key_type:
+                # 缓存的账户使用另一种类型的密钥（例如 RSA），通过密钥轮换迁移，账户及其授权保持不变
+                try:
+                    self.rollover_to_key_type(self.account_key_type)
+                except Exception as e:
+                    logger.warning(f"[账户密钥]自动轮换账户密钥失败，本次运行继续使用原密钥。账户 URI：{self.account.uri}，错误：{e}")
+            return
+
         try:
             # 尝试根据账户密钥查找现有账户
             # Let's Encrypt 不直接提供通过 email 查询账户的功能，
@@ -81,13 +227,28 @@ class AcmeClient:
             # 为了确保账户注册，即使密钥存在也尝试注册一次，因为 new_account 是幂等的。
 
             # 创建 NewRegistration 对象，包含联系信息和接受条款
+            eab = None
+            if self.eab_kid and self.eab_hmac_key:
+                eab = messages.ExternalAccountBinding.from_data(
+                    account_public_key=self.key_manager.account_jwk.public_key(),
+                    kid=self.eab_kid,
+                    hmac_key=self.eab_hmac_key,
+                    directory=self.client.directory
+                )
             new_reg_msg = messages.NewRegistration.from_data(
                 email=email,
-                terms_of_service_agreed=True
+                terms_of_service_agreed=True,
+                external_account_binding=eab
             )
 
             # 尝试注册新账户。
-            self.account = self.client.new_account(new_reg_msg)
+            try:
+                self.account = self.client.new_account(new_reg_msg)
+            except Exception as e:
+                self._directory_request_failed(e)
+                raise
+            if self.account_cache is not None:
+                self.account_cache.save(self.ca_name, self.acme_directory_url, self.key_manager._account_key, self.account.to_json())
 
             logger.info(f"ACME 账户注册成功。邮箱：{email}，账户 URI：{self.account.uri}")
 
@@ -97,12 +258,134 @@ class AcmeClient:
             
         return
 
-    def create_acme_order(self, domains: list[str],cert_key_path : str = None,key_size: int = 3072): # 添加 organization 和 country 参数
+    def rollover_account_key(self, new_key) -> None:
+        """
+        将已注册账户的密钥轮换为新密钥（RFC 8555 第 7.3.5 节），无需重新注册，账户 URI、订单和授权保持不变。
+        内层 JWS 使用新密钥签名并包含新公钥，外层 JWS 使用旧密钥（kid）签名。
+        轮换成功后，后续请求改用新密钥签名，并更新账户缓存。
+        :param new_key: 新的账户私钥（RSA 或 EC）。
+        :raises Error: CA 拒绝轮换，此时继续使用旧密钥。
+        """
+        if self.client is None or self.account is None:
+            raise Error("ACME 账户未注册，无法轮换账户密钥")
+
+        new_jwk, new_alg = jwk_for_private_key(new_key)
+        url = self.client.directory["keyChange"]
+        payload = {"account": self.account.uri, "oldKey": self.key_manager.account_jwk.public_key().to_partial_json()}
+        inner = jws.JWS.sign(json.dumps(payload).encode("utf-8"), key=new_jwk, alg=new_alg, nonce=None, url=url)
+        try:
+            self.client._post(url, inner)
+        except Exception as e:
+            logger.error(f"账户密钥轮换失败，继续使用原密钥。账户 URI：{self.account.uri}，错误：{e}")
+            raise
+
+        old_type = self.key_manager.account_key_type
+        self._use_account_key(new_key)
+        if self.account_cache is not None:
+            self.account_cache.save(self.ca_name, self.acme_directory_url, new_key, self.account.to_json())
+        logger.info(f"账户密钥轮换成功：{old_type} -> {self.key_manager.account_key_type}。账户 URI：{self.account.uri}")
+
+    def rollover_to_key_type(self, key_type: str, force: bool = False) -> bool:
+        """
+        将已注册账户的密钥轮换为指定类型的新密钥。
+        使用账户缓存时在该账户的跨进程锁中进行：先重新读取缓存，其他进程已经轮换了账户密钥时改用缓存中的新密钥
+        （原密钥已被 CA 作废），新密钥的类型一致时不再轮换。
+        :param key_type: 账户密钥类型，rsa 或 ec。
+        :param force: 密钥类型已一致时仍然轮换。
+        :return: 本次执行了轮换返回 True。
+        :raises Error: CA 拒绝轮换，此时继续使用原密钥。
+        :raises LockTimeoutError: 在超时时间内未能获取账户缓存的锁。
+        """
+        if self.account_cache is None:
+            if self.key_manager.account_key_type == key_type and not force:
+                return False
+            self.rollover_account_key(KeyManager.generate_account_key(key_type))
+            return True
+
+        with self.account_cache.lock(self.ca_name):
+            cached = self.account_cache.load(self.ca_name, self.acme_directory_url)
+            if cached is not None and _public_key_der(cached[0]) != _public_key_der(self.key_manager._account_key):
+                self._use_account_key(cached[0])
+                logger.info(f"[账户密钥]其他进程已轮换账户密钥，改用缓存中的 {self.key_manager.account_key_type} 密钥。账户 URI：{self.account.uri}")
+                if self.key_manager.account_key_type == key_type:
+                    return False
+            if self.key_manager.account_key_type == key_type and not force:
+                return False
+            self.rollover_account_key(KeyManager.generate_account_key(key_type))
+            return True
+
+    def _use_account_key(self, key) -> None:
+        """
+        改用另一个账户私钥签名后续请求。
+        """
+        jwk, alg = jwk_for_private_key(key)
+        self.key_manager._account_key = key
+        self.client.net.key = jwk
+        self.client.net.alg = alg
+
+    def _load_reusable_cert_key(self, cert_key_path: str, key_size: int, password: str = None,
+                                reuse_policy: str = KEY_REUSE_FOREVER, max_age_days: int = None,
+                                key_type: str = KEY_TYPE_RSA, ec_curve: str = "secp256r1") -> bool:
+        """
+        根据复用策略尝试加载现有的证书私钥。
+        :param cert_key_path: 现有证书私钥的路径。
+        :param key_size: 期望的 RSA 密钥位数，现有私钥位数不同时不复用。
+        :param password: 私钥的加密密码（如果有）。
+        :param reuse_policy: 复用策略，取值为 "new"、"max_age" 或 "forever"。
+        :param max_age_days: reuse_policy 为 "max_age" 时，私钥最多可使用的天数。
+        :param key_type: 期望的密钥类型，"rsa" 或 "ec"，现有私钥类型不同时不复用。
+        :param ec_curve: 期望的 ECDSA 曲线，仅在 key_type 为 "ec" 时生效。
+        :return: 成功加载可复用的私钥返回 True，否则返回 False（调用者应生成新私钥）。
+        """
+        if reuse_policy == KEY_REUSE_NEW:
+            logger.info("证书私钥复用策略为每次生成新私钥。")
+            return False
+
+        if not cert_key_path or not os.path.exists(cert_key_path):
+            logger.info("未提供证书私钥路径或文件不存在。将生成一个新的证书私钥。")
+            return False
+
+        age_days = KeyManager.key_file_age_days(cert_key_path)
+        if reuse_policy == KEY_REUSE_MAX_AGE and max_age_days is not None and age_days is not None and age_days >= max_age_days:
+            logger.info(f"证书私钥已使用 {age_days:.1f} 天，超过轮换周期 {max_age_days} 天。将生成一个新的证书私钥。")
+            return False
+
+        if not self.key_manager.load_cert_key_from_file(cert_key_path, password):
+            logger.warning(f"从 {cert_key_path} 加载证书私钥失败。将生成一个新的。")
+            return False
+
+        if not KeyManager.key_matches_type(self.key_manager.cert_private, key_type, key_size, ec_curve):
+            logger.info(f"现有证书私钥的类型或参数与配置（{key_type}）不一致。将生成一个新的证书私钥。")
+            return False
+
+        logger.info(f"成功从 {cert_key_path} 加载证书私钥，已使用 {age_days:.1f} 天，跳过密钥生成。")
+        return True
+
+    def prepare_cert_key(self, cert_key_path: str = None, key_size: int = 3072, password: str = None,
+                         reuse_policy: str = KEY_REUSE_FOREVER, max_age_days: int = None,
+                         key_type: str = KEY_TYPE_RSA, ec_curve: str = "secp256r1") -> None:
+        """
+        按复用策略加载现有的证书私钥，如果不复用或加载失败，则生成新的。
+        不需要访问 ACME 服务器，因此可以在启动阶段与其他准备工作并行执行。参数含义同 create_acme_order。
+        """
+        if not self._load_reusable_cert_key(cert_key_path, key_size, password, reuse_policy, max_age_days, key_type, ec_curve):
+            self.key_manager.generate_new_cert_key(key_size, key_type=key_type, curve=ec_curve)
+            logger.info("已生成一个新的证书私钥。")
+
+    def create_acme_order(self, domains: list[str], cert_key_path: str = None, key_size: int = 3072,
+                          password: str = None, reuse_policy: str = KEY_REUSE_FOREVER, max_age_days: int = None,
+                          key_type: str = KEY_TYPE_RSA, ec_curve: str = "secp256r1", key_prepared: bool = False):
         """
         创建 ACME 证书订单。
         :param domains: 需要申请证书的域名列表，例如 ["example.com", "*.example.com"]。
-        :param organization: 组织名称，默认为 "MyOrganization"。
-        :param country: 国家代码，默认为 "CN"。
+        :param cert_key_path: 现有证书私钥的路径，根据 reuse_policy 决定是否复用。
+        :param key_size: 新证书私钥的 RSA 位数。
+        :param password: 现有证书私钥的加密密码（如果有）。
+        :param reuse_policy: 证书私钥复用策略，取值为 "new"、"max_age" 或 "forever"。
+        :param max_age_days: reuse_policy 为 "max_age" 时，私钥最多可使用的天数。
+        :param key_type: 证书私钥类型，"rsa" 或 "ec"。
+        :param ec_curve: ECDSA 曲线，仅在 key_type 为 "ec" 时生效。
+        :param key_prepared: 证书私钥是否已经通过 prepare_cert_key 准备好，为 True 时不再加载或生成。
         :return: ACME 订单对象。
         """
         if self.client is None:
@@ -112,20 +395,9 @@ class AcmeClient:
 
         try:
 
-            # 尝试加载证书私钥，如果未提供路径或加载失败，则生成新的
-            cert_key_loaded_successfully = False
-            if cert_key_path and os.path.exists(cert_key_path):
-                if self.key_manager.load_cert_key_from_file(cert_key_path):
-                    logger.info(f"成功从 {cert_key_path} 加载证书私钥。")
-                    cert_key_loaded_successfully = True
-                else:
-                    logger.warning(f"从 {cert_key_path} 加载证书私钥失败。将生成一个新的。")
-            else:
-                logger.info("未提供证书私钥路径或文件不存在。将生成一个新的证书私钥。")
-
-            if not cert_key_loaded_successfully:
-                self.key_manager.generate_new_cert_key(key_size)
-                logger.info("已生成一个新的证书私钥。")
+            # 尝试按复用策略加载证书私钥，如果不复用或加载失败，则生成新的
+            if not key_prepared:
+                self.prepare_cert_key(cert_key_path, key_size, password, reuse_policy, max_age_days, key_type, ec_curve)
 
             # 2. 生成 CSR
             # 确保 domains 列表不为空
@@ -140,23 +412,83 @@ class AcmeClient:
             logger.info("CSR 已生成。")
 
             # 3. 创建新订单，传递 CSR 的 PEM 编码字节
-            order = self.client.new_order(csr_pem)
+            try:
+                order = self.client.new_order(csr_pem)
+            except Exception as e:
+                self._directory_request_failed(e)
+                raise
             logger.info(f"ACME 订单创建成功。订单 URI: {order.uri}")
             return order
         except Error as e:
             logger.error(f"ACME 订单创建失败: {e}")
             raise
 
-    def get_dns_challenges(self, order):
+    def _challenge_type_for(self, domain: str) -> str:
+        """
+        根据按域名指定的挑战类型和挑战类型策略，确定域名使用的挑战类型。
+        通配符域名只能使用 DNS-01；未配置 HTTP-01 应答器时全部使用 DNS-01。
+        """
+        if domain.startswith("*.") or self.http01_responder is None:
+            return CHALLENGE_DNS01
+        if domain in self.challenge_overrides:
+            return self.challenge_overrides[domain]
+        return CHALLENGE_HTTP01 if self.challenge_policy == CHALLENGE_POLICY_AUTO else CHALLENGE_DNS01
+
+    def dns_zones_for(self, domains: List[str]) -> List[str]:
+        """
+        返回这些域名的 DNS-01 挑战记录将写入的区域（考虑挑战类型策略和挑战委派），用于启动阶段的预检。
         """
-        从 ACME 订单中获取 DNS 挑战信息。
+        zones = []
+        for domain in domains:
+            if self._challenge_type_for(domain) != CHALLENGE_DNS01:
+                continue
+            _, zone = self._get_dns_rr_and_base_domain(domain)
+            if zone not in zones:
+                zones.append(zone)
+        return zones
+
+    def get_challenges(self, order):
+        """
+        从 ACME 订单中按挑战类型策略获取每个域名的挑战信息（DNS-01 或 HTTP-01）。
+        服务器未提供所选的挑战类型时回退到 DNS-01。
         :param order: ACME 订单对象。
-        :return: 包含域名和对应 DNS 挑战的列表，例如 [{"domain": "example.com", "authz": challenge_obj, ...}]。
+        :return: 包含域名和对应挑战的列表，例如 [{"domain": "example.com", "type": "dns-01", "authz": authz_obj, ...}]。
+        """
+        return self._get_authorization_challenges(order.authorizations)
+
+    def _get_authorization_challenges(self, authorizations: List[messages.AuthorizationResource]) -> List[Dict[str, Any]]:
+        """
+        获取一组授权的挑战信息，已有效的授权会被跳过。返回值同 get_challenges。
         """
         challenges_map = [] # 将 challenges_map 更改为列表
-        for authz in order.authorizations:
+        for authz in authorizations:
             domain_from_authz = authz.body.identifier.value # 获取授权对象中的域名
+            if authz.body.wildcard and not domain_from_authz.startswith("*."):
+                domain_from_authz = f"*.{domain_from_authz}"
+            if authz.body.status == messages.STATUS_VALID:
+                # 同一账户近期已验证过的域名（例如同一运行中的另一个订单），无需再次验证
+                logger.info(f"域名 {domain_from_authz} 的授权已有效，跳过挑战。")
+                continue
             logger.info(f"正在获取域名 {domain_from_authz} 的挑战信息...")
+            challenge_type = self._challenge_type_for(domain_from_authz)
+
+            if challenge_type == CHALLENGE_HTTP01:
+                challenge_body = next((c for c in authz.body.challenges if isinstance(c.chall, challenges.HTTP01)), None)
+                if challenge_body is not None:
+                    response, validation = challenge_body.chall.response_and_validation(self.client.net.key)
+                    challenges_map.append({
+                        "domain": domain_from_authz,
+                        "type": CHALLENGE_HTTP01,
+                        "authz": authz,
+                        "challenge_body": challenge_body,
+                        "response": response,
+                        "token": challenge_body.chall.encode("token"),
+                        "validation": validation
+                    })
+                    logger.info(f"获取到域名 {domain_from_authz} 的 HTTP-01 挑战，token: {challenge_body.chall.encode('token')}")
+                    continue
+                logger.warning(f"域名 {domain_from_authz} 没有 HTTP-01 挑战，改用 DNS-01。")
+
             for challenge_body in authz.body.challenges:
                 # 寻找 DNS-01 挑战
                 if isinstance(challenge_body.chall, challenges.DNS01):
@@ -165,6 +497,7 @@ class AcmeClient:
 
                     challenges_map.append({ # 将挑战信息作为字典添加到列表中
                         "domain": domain_from_authz, # 新增的 domain 字段
+                        "type": CHALLENGE_DNS01,
                         "authz": authz,
                         "challenge_body": challenge_body,
                         "dns_value": dns_value
@@ -174,11 +507,57 @@ class AcmeClient:
 
                     break # 每个域名我们只需要一个 DNS-01 挑战
 
-        if not challenges_map:
-            logger.error("未找到任何 DNS-01 挑战。")
-            raise ValueError("未找到任何 DNS-01 挑战。")
+        pending = [authz for authz in authorizations if authz.body.status != messages.STATUS_VALID]
+        if pending and len(challenges_map) < len(pending):
+            logger.error("部分域名未找到任何可用的挑战。")
+            raise ValueError("部分域名未找到任何可用的挑战。")
         return challenges_map
 
+    def prewarm_authorizations(self, domains: List[str]) -> Tuple[Dict[str, Any], List[Tuple[str, str, str]]]:
+        """
+        预热授权：在续期之前使这些域名在当前账户下的授权变为有效，续期时只需要创建订单并最终确定。
+        CA 支持 newAuthz（预授权，RFC 8555 第 7.4.1 节）时为每个非通配符域名单独创建授权；
+        其余域名通过一个只完成挑战、不最终确定的订单获得授权（使用临时私钥生成 CSR，不影响证书私钥），
+        订单过期后已通过验证的授权仍然有效（Let's Encrypt 为 30 天）。
+        :param domains: 需要预热的域名列表。
+        :return: (统计信息, 本次运行发布的、需要清理的 DNS 记录列表)。
+        """
+        if self.client is None:
+            raise Error("ACME 客户端未初始化")
+
+        authorizations = []
+        remaining = list(domains)
+        try:
+            new_authz_url = self.client.directory["newAuthz"]
+        except KeyError:
+            new_authz_url = None
+        if new_authz_url:
+            for domain in [d for d in domains if not d.startswith("*.")]:
+                identifier = messages.Identifier(typ=messages.IDENTIFIER_FQDN, value=domain)
+                response = self.client._post(new_authz_url, messages.NewAuthorization(identifier=identifier))
+                authorizations.append(self.client._authzr_from_response(response, identifier))
+                remaining.remove(domain)
+            logger.info(f"[授权预热]已通过 newAuthz 为 {len(authorizations)} 个域名创建预授权。")
+
+        if remaining:
+            ephemeral = KeyManager(account_key=self.key_manager._account_key)
+            ephemeral.generate_new_cert_key(key_type=KEY_TYPE_EC)
+            csr_pem = ephemeral.generate_csr(remaining).public_bytes(serialization.Encoding.PEM)
+            order = self.client.new_order(csr_pem)
+            logger.info(f"[授权预热]已为 {len(remaining)} 个域名创建预热订单（不会最终确定）。订单 URI: {order.uri}")
+            authorizations.extend(order.authorizations)
+
+        challenges_map = self._get_authorization_challenges(authorizations)
+        summary = {
+            "domains": len(domains),
+            "already_valid": len(authorizations) - len(challenges_map),
+            "validated": len(challenges_map),
+            "method": "newAuthz" if new_authz_url and not remaining else ("order" if not new_authz_url else "newAuthz+order"),
+        }
+        cleanup = self.perform_challenges(challenges_map) if challenges_map else []
+        logger.info(f"[授权预热]完成：{summary}")
+        return summary, cleanup
+
     def _get_dns_rr_and_base_domain(self, domain: str) -> Tuple[str, str]:
         """
         根据域名生成 ACME 挑战所需的 DNS TXT 记录的 RR (主机记录) 和主域名。
@@ -186,7 +565,13 @@ class AcmeClient:
         - "example.com" -> ("_acme-challenge", "example.com")
         - "www.example.com" -> ("_acme-challenge.www", "example.com")
         - "*.example.com" -> ("_acme-challenge", "example.com")
+        如果配置了挑战委派，且 `_acme-challenge.<域名>` 已通过 CNAME 委派到验证区域，则返回验证区域中的 RR 和验证区域。
         """
+        if self.challenge_delegation is not None:
+            delegated = self.challenge_delegation.resolve(domain)
+            if delegated:
+                return delegated
+
         rr_prefix = '_acme-challenge'
         effective_domain = domain
 
@@ -210,23 +595,24 @@ class AcmeClient:
         
         return rr, base_domain
 
-    def _validate_single_domain_challenge(self, domain: str, authz: Any, challenge_body: Any):
+    def _validate_single_domain_challenge(self, domain: str, authz: Any, challenge_body: Any, response: Any = None):
         """
         发送单个域名的挑战响应给 ACME 服务器，并等待验证结果。
         此方法封装了验证逻辑，避免 perform_dns_challenge 过长。
         :param domain: 当前正在处理的域名。
         :param authz: 当前域名的授权对象。
         :param challenge_body: 当前域名的挑战体对象。
+        :param response: (可选) 挑战响应对象，默认使用挑战本身。
         """
         if self.client is None:
             logger.info("ACME 客户端未初始化")
             raise Error("ACME 客户端未初始化")
 
         try:
-            self.client.answer_challenge(challenge_body, challenge_body.chall)
+            self.client.answer_challenge(challenge_body, response if response is not None else challenge_body.chall)
             logger.info(f"域名 {domain} 挑战响应已发送。5 秒后检查挑战状态。")
 
-            time.sleep(5)
+            self._sleep(5)
 
             max_retries = 10
             retry_delay_seconds = 5
@@ -234,13 +620,13 @@ class AcmeClient:
                 # 重新获取最新的授权对象，确保状态是最新的
                 authz, _ = self.client.poll(authz)
 
-                logger.info(f"域名 {domain} 挑战状态：{authz.body.status}。当前次数：{i+1}，最大重试次数：{max_retries}，重试间隔：{retry_delay_seconds} 秒。")
+                logger.log(self.poll_log_level, f"域名 {domain} 挑战状态：{authz.body.status}。当前次数：{i+1}，最大重试次数：{max_retries}，重试间隔：{retry_delay_seconds} 秒。")
                 if authz.body.status == messages.STATUS_VALID:
                     logger.info(f"域名 {domain} 挑战验证成功！")
                     return # 验证成功，函数结束
                 elif authz.body.status == messages.STATUS_PENDING:
-                    logger.info(f"域名 {domain} 挑战仍在等待验证，等待 {retry_delay_seconds} 秒后重试。")
-                    time.sleep(retry_delay_seconds)
+                    logger.log(self.poll_log_level, f"域名 {domain} 挑战仍在等待验证，等待 {retry_delay_seconds} 秒后重试。")
+                    self._sleep(retry_delay_seconds)
                 else:
                     raise Error(f"域名 {domain} 挑战验证失败，状态：{authz.body.status}")
 
@@ -249,18 +635,106 @@ class AcmeClient:
             logger.error(f"验证域名 {domain} 挑战时发生错误：{e}")
             raise
 
-    def perform_dns_challenge(self, domain_challenges_map: List[Dict[str, Any]]) -> List[Dict[str, str]]: # 更新参数类型提示
+    def _sleep(self, seconds: float) -> None:
+        """
+        流程中的固定等待。使用 cassette 回放时按回放速度缩放；多个 CA 同时签发时，等待期间收到取消信号会立即放弃。
+        """
+        self._check_cancelled()
+        if self.cancel_event is not None and self.cassette is None:
+            if self.cancel_event.wait(seconds):
+                self._check_cancelled()
+        elif self.cassette is not None:
+            self.cassette.sleep(seconds)
+        else:
+            time.sleep(seconds)
+
+    def _record_lock(self, zone: str, rr: str):
+        """
+        返回指定区域和主机记录的锁；未配置锁管理器时返回空上下文。
+        """
+        if self.lock_manager is None:
+            return nullcontext()
+        return self.lock_manager.lock(zone, rr)
+
+    def _publish_txt_records(self, zone: str, values_by_rr: Dict[str, List[str]]) -> List[Tuple[str, str, str]]:
+        """
+        在持有主机记录锁的情况下写入挑战 TXT 记录。
+        新的值与其他运行发布的值并存，而不会覆盖它们。
+        已存在的值属于另一个拿到同一授权的运行（例如预热与续期），由该运行负责清理，不写入 journal，也不返回。
+        :param zone: 区域（主域名）。
+        :param values_by_rr: {主机记录: [记录值, ...]}。
+        :return: 本次新增的 (RR, 区域, RecordId) 列表，用于清理。
+        """
+        published = []
+        for rr in sorted(values_by_rr):
+            with self._record_lock(zone, rr):
+                record_ids, created = self.aliyun_dns_manager.batch_upsert_txt_records(
+                    zone, {rr: values_by_rr[rr]}, ttl=self.challenge_ttl)
+            for value, record_id in record_ids[rr].items():
+                if record_id not in created:
+                    logger.info(f"区域 {zone} 的 {rr} 已存在相同的挑战值（RecordId：{record_id}），由写入它的运行负责清理。")
+                    continue
+                published.append((rr, zone, record_id))
+                if self.journal is not None:
+                    self.journal.record_published(zone, rr, record_id, value)
+        return published
+
+    def perform_challenges(self, challenges_map: List[Dict[str, Any]]) -> List[Tuple[str, str, str]]:
+        """
+        执行所有挑战：HTTP-01 挑战通过应答器发布后在线程池中并行验证，同时 DNS-01 挑战照常执行。
+        :param challenges_map: get_challenges 返回的挑战信息列表。
+        :return: 本次运行发布的、需要清理的 DNS 记录 (RR, 区域, RecordId) 列表。HTTP-01 的 token 在返回前已撤回。
+        """
+        http_challenges = [c for c in challenges_map if c["type"] == CHALLENGE_HTTP01]
+        dns_challenges = [c for c in challenges_map if c["type"] == CHALLENGE_DNS01]
+        if not http_challenges:
+            return self.perform_dns_challenge(dns_challenges)
+
+        logger.info(f"开始执行挑战：HTTP-01 {len(http_challenges)} 个，DNS-01 {len(dns_challenges)} 个。")
+        self.http01_responder.start()
+        workers = min(len(http_challenges), 8)
+        # 每个验证线程立即发送签名请求（响应挑战），预取 nonce 避免各线程分别请求 newNonce
+        self.prefetch_nonces(workers)
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="http01")
+        try:
+            for challenge_info in http_challenges:
+                self.http01_responder.add(challenge_info["token"], challenge_info["validation"])
+            futures = [
+                executor.submit(self._validate_single_domain_challenge, c["domain"], c["authz"], c["challenge_body"], c["response"])
+                for c in http_challenges
+            ]
+
+            cleanup = self.perform_dns_challenge(dns_challenges) if dns_challenges else []
+            try:
+                for future in futures:
+                    future.result()
+            except Exception:
+                # DNS-01 已发布的记录仍需清理
+                self.cleanup_dns_records(cleanup)
+                raise
+            logger.info("所有 HTTP-01 挑战验证完成。")
+            return cleanup
+        finally:
+            executor.shutdown(wait=True)
+            for challenge_info in http_challenges:
+                self.http01_responder.remove(challenge_info["token"])
+            self.http01_responder.stop()
+
+    def perform_dns_challenge(self, domain_challenges_map: List[Dict[str, Any]]) -> List[Tuple[str, str, str]]: # 更新参数类型提示
         """
         执行 DNS 挑战，将 TXT 记录添加到阿里云 DNS，并逐个等待验证。
         :param domain_challenges_map: 包含域名和对应 DNS 挑战信息的列表。
-        :return: 包含成功处理的、需要清理的唯一 DNS 记录信息的列表。
+        :return: 本次运行发布的、需要清理的 (RR, 区域, RecordId) 列表。
         """
         if self.client is None:
             logger.info("ACME 客户端未初始化")
             raise Error("ACME 客户端未初始化")
 
+        if self.challenge_delegation is not None:
+            return self._perform_batched_dns_challenge(domain_challenges_map)
+
         logger.info("开始逐个执行 DNS 挑战。")
-        cleanup = [] # 用于存储成功处理的 DNS 记录信息，以便后续清理
+        cleanup = [] # 用于存储本次运行发布的 DNS 记录信息，以便后续清理
 
         for challenge_info in domain_challenges_map: # 遍历列表中的每个挑战信息字典
             domain = challenge_info["domain"] # 从字典中获取 domain
@@ -273,34 +747,69 @@ class AcmeClient:
             logger.info(f"---------- 正在处理域名 {domain} 的 DNS 挑战 ----------")
             logger.info(f"准备为域名 {domain} 添加 DNS TXT 记录: RR='{rr}', 主域名: '{base_domain}'")
             try:
-                # Add/Upsert the DNS record
-                self.aliyun_dns_manager.upsert_record(
-                    domain_name=base_domain,
-                    rr=rr,
-                    record_type="TXT",
-                    value=dns_value,
-                    ttl=600 # Let's Encrypt 建议使用小 TTL
-                )
-                logger.info(f"已为域名 {domain} 添加/更新 TXT 记录。等待 DNS 传播。")
-
-                rr_domain = ( rr , domain )
-                if rr_domain in cleanup:
-                    time.sleep(60)
+                # 添加 TXT 记录（与同一 RR 下的其他值并存）
+                for published in self._publish_txt_records(base_domain, {rr: [dns_value]}):
+                    if published not in cleanup:
+                        cleanup.append(published)
+                logger.info(f"已为域名 {domain} 添加 TXT 记录。等待 DNS 传播。")
 
                 # 调用独立的函数来验证当前域名的挑战
                 self._validate_single_domain_challenge(domain, authz, challenge_body)
-                
-                # 将需要清理的记录信息添加到列表中，确保唯一性
-                if rr_domain not in cleanup:
-                    cleanup.append(rr_domain)
 
             except Exception as e:
                 logger.error(f"处理域名 {domain} 的挑战时发生错误：{e}")
+                # 已发布的记录仍需清理
+                self.cleanup_dns_records(cleanup)
                 raise
         
         logger.info("所有域名挑战逐个验证完成。")
         return cleanup
 
+    def _perform_batched_dns_challenge(self, domain_challenges_map: List[Dict[str, Any]]) -> List[Tuple[str, str, str]]:
+        """
+        批量执行 DNS 挑战：先按区域分组，并行写入所有区域的 TXT 记录，再逐个验证。
+        同一 RR 的多个挑战值（例如通配符域名和主域名）会同时存在，无需等待上一个挑战完成后再覆盖。
+        配置了挑战委派时，所有记录都写入同一个验证区域。
+        :param domain_challenges_map: 包含域名和对应 DNS 挑战信息的列表。
+        :return: 本次运行发布的、需要清理的 (RR, 区域, RecordId) 列表。
+        """
+        logger.info("开始批量执行 DNS 挑战。")
+
+        values_by_zone: Dict[str, Dict[str, List[str]]] = {}
+        for challenge_info in domain_challenges_map:
+            rr, zone = self._get_dns_rr_and_base_domain(challenge_info["domain"])
+            values_by_zone.setdefault(zone, {}).setdefault(rr, []).append(challenge_info["dns_value"])
+
+        cleanup = []
+        try:
+            # 各区域并行写入：区域分属不同阿里云账号时，每个账号使用独立的客户端和限速器
+            with ThreadPoolExecutor(max_workers=max(1, min(len(values_by_zone), 8)), thread_name_prefix="dns-publish") as executor:
+                futures = {}
+                for zone, values_by_rr in values_by_zone.items():
+                    logger.info(f"准备向区域 {zone} 批量写入 {sum(len(v) for v in values_by_rr.values())} 条 TXT 记录。")
+                    futures[zone] = executor.submit(self._publish_txt_records, zone, values_by_rr)
+            errors = []
+            for zone, future in futures.items():
+                try:
+                    cleanup.extend(future.result())
+                except Exception as e:
+                    errors.append(e)
+            if errors:
+                # 其他区域已写入的记录已加入 cleanup，由下方统一清理
+                raise errors[0]
+
+            for challenge_info in domain_challenges_map:
+                logger.info(f"---------- 正在验证域名 {challenge_info['domain']} 的 DNS 挑战 ----------")
+                self._validate_single_domain_challenge(challenge_info["domain"], challenge_info["authz"], challenge_info["challenge_body"])
+        except Exception as e:
+            logger.error(f"批量执行 DNS 挑战时发生错误：{e}")
+            # 已写入的记录仍需清理
+            self.cleanup_dns_records(cleanup)
+            raise
+
+        logger.info("所有域名挑战批量验证完成。")
+        return cleanup
+
     def finalize_order_and_fetch_certificate(self, order, domains: list[str]) -> bool:
         """
         生成 CSR 并最终确定订单，然后获取证书。
@@ -312,10 +821,14 @@ class AcmeClient:
             logger.info("ACME 客户端未初始化")
             raise Error("ACME 客户端未初始化")
 
+        self._check_cancelled()
         logger.info("最终确定订单并获取证书...")
         try:
             order = self.client.poll_and_finalize(order)
             fullchain_certificate_pem = order.fullchain_pem
+            if self.chain_selector is not None:
+                fullchain_certificate_pem = self.chain_selector.select(
+                    fullchain_certificate_pem, lambda: self._fetch_alternative_chains(order))
             # 将完整链证书保存到 KeyManager 中，确保编码为字节
             self.key_manager.certificate_chain = fullchain_certificate_pem.encode('utf-8') # 编码为字节
             logger.info("证书获取成功，并已保存到 KeyManager。")
@@ -324,6 +837,17 @@ class AcmeClient:
             logger.error(f"最终确定订单或获取证书时发生错误：{e}")
             return False
 
+    def _fetch_alternative_chains(self, order) -> List[str]:
+        """
+        获取 CA 通过 Link: rel="alternate" 提供的可选证书链（需要再请求一次证书 URL 以读取响应头）。
+        :param order: 已完成的订单。
+        :return: 可选证书链的 PEM 字符串列表。
+        """
+        response = self.client._post_as_get(order.body.certificate)
+        urls = self.client._get_links(response, "alternate")
+        logger.info(f"CA 提供了 {len(urls)} 条可选证书链。")
+        return [self.client._post_as_get(url).text for url in urls]
+
     def save_certificate(self,
                          account_key_path: str,
                          cert_key_path: str,
@@ -356,24 +880,22 @@ class AcmeClient:
             logger.error(f"保存证书和私钥失败: {e}")
             return False
 
-    def cleanup_dns_records(self, processed_domains_info: List[Tuple[str, str]]): # 更新参数类型提示
+    def cleanup_dns_records(self, processed_domains_info: List[Tuple[str, str, str]]): # 更新参数类型提示
         """
-        清理 DNS 挑战过程中添加的 TXT 记录。
-        :param processed_domains_info: 包含成功处理并需要清理的 DNS 记录信息的列表。
-        例如：[{"rr": "_acme-challenge", "base_domain": "example.com"}]
+        清理 DNS 挑战过程中本次运行发布的 TXT 记录。
+        只按 RecordId 删除本次运行发布的记录，同一 RR 下其他运行发布的值不受影响。
+        :param processed_domains_info: 本次运行发布的记录列表。
+        例如：[("_acme-challenge", "example.com", "1234567890")]
         """
         logger.info("开始清理 DNS 挑战记录...")
-        for rr_to_delete , base_domain in processed_domains_info: # 直接遍历列表
-            logger.info(f"正在清理域名 {base_domain} 的 DNS TXT 记录: RR='{rr_to_delete}', DomainName='{base_domain}'。")
+        for rr_to_delete, base_domain, record_id in processed_domains_info: # 直接遍历列表
+            logger.info(f"正在清理域名 {base_domain} 的 DNS TXT 记录: RR='{rr_to_delete}', RecordId='{record_id}'。")
             try:
-                self.aliyun_dns_manager.delete_sub_records(
-                    domain_name=base_domain,
-                    rr=rr_to_delete,
-                    record_type="TXT"
-                )
+                with self._record_lock(base_domain, rr_to_delete):
+                    self.aliyun_dns_manager.delete_record(record_id, domain_name=base_domain)
+                if self.journal is not None:
+                    self.journal.record_deleted(record_id)
                 logger.info(f"已成功清理域名 {base_domain} 的 DNS TXT 记录。")
             except Exception as e:
                 logger.warning(f"清理域名 {base_domain} 的 DNS TXT 记录失败，错误：{e}")
         logger.info("DNS 挑战记录清理完成。")
-
-
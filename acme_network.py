@@ -0,0 +1,231 @@
+import json
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from loguru import logger
+import josepy as jose
+from acme import jws
+import acme.client as acme_client_module
+from acme import messages
+from acme import errors as acme_errors
+
+from file_utils import write_file_atomic
+from api_metrics import ApiMetrics, classify_acme_url
+
+
+class PooledClientNetwork(acme_client_module.ClientNetwork):
+    """
+    在 acme.client.ClientNetwork 的基础上：
+    - 调整 HTTP 连接池大小并保持长连接，所有请求复用同一个会话；
+    - 维护线程安全的 nonce 池，从所有响应的 Replay-Nonce 头中收集 nonce，并支持在并发请求前预取；
+    - 统计请求往返次数，便于在运行报告中输出。
+    """
+    def __init__(self, key: jose.JWK, pool_size: int = 10, nonce_max_age: float = 300,
+                 metrics: Optional[ApiMetrics] = None, directory_url: Optional[str] = None, **kwargs: Any):
+        """
+        初始化 PooledClientNetwork。
+        :param key: 账户 JWK。
+        :param pool_size: 每个主机的最大连接数。
+        :param nonce_max_age: nonce 在池中的最长保留时间（秒），超时的 nonce 会被丢弃。
+        :param metrics: (可选) API 调用统计，按 ACME 端点记录调用次数和耗时。
+        :param directory_url: (可选) ACME 目录 URL，用于在获取目录之前就能识别目录请求。
+        :param kwargs: 传递给 ClientNetwork 的其他参数，例如 user_agent、alg。
+        """
+        super().__init__(key, **kwargs)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Connection"] = "keep-alive"
+
+        self.nonce_max_age = nonce_max_age
+        self._nonce_pool = deque() # (nonce, 获取时间)
+        self._nonce_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats: Dict[str, Any] = {"round_trips": 0, "by_method": {}, "nonce_requests": 0, "nonces_harvested": 0}
+        self.metrics = metrics
+        self._endpoint_names: Dict[str, str] = {directory_url: "directory"} if directory_url else {}
+
+    def set_directory(self, directory_url: str, directory: messages.Directory) -> None:
+        """
+        记录 ACME 目录中的端点地址，用于按端点名称统计请求。
+        """
+        names = {directory_url: "directory"}
+        for name in ("newNonce", "newAccount", "newOrder", "newAuthz", "revokeCert", "keyChange", "renewalInfo"):
+            try:
+                names[directory[name]] = name
+            except KeyError:
+                continue
+        self._endpoint_names = names
+
+    def _count(self, method: str) -> None:
+        with self._stats_lock:
+            self.stats["round_trips"] += 1
+            self.stats["by_method"][method] = self.stats["by_method"].get(method, 0) + 1
+
+    def _harvest_nonce(self, response: requests.Response) -> bool:
+        """
+        如果响应中包含 Replay-Nonce，则放入 nonce 池。
+        :return: 成功收集返回 True。
+        """
+        nonce = response.headers.get(self.REPLAY_NONCE_HEADER)
+        if not nonce:
+            return False
+        try:
+            decoded_nonce = jws.Header._fields['nonce'].decode(nonce)
+        except jose.DeserializationError:
+            return False
+        with self._nonce_lock:
+            if all(existing != decoded_nonce for existing, _ in self._nonce_pool):
+                self._nonce_pool.append((decoded_nonce, time.monotonic()))
+                with self._stats_lock:
+                    self.stats["nonces_harvested"] += 1
+        return True
+
+    def _send_request(self, method: str, url: str, *args: Any, **kwargs: Any) -> requests.Response:
+        self._count(method)
+        if self.metrics is not None:
+            with self.metrics.track("acme", classify_acme_url(url, self._endpoint_names)):
+                response = super()._send_request(method, url, *args, **kwargs)
+        else:
+            response = super()._send_request(method, url, *args, **kwargs)
+        self._harvest_nonce(response)
+        return response
+
+    def _add_nonce(self, response: requests.Response) -> None:
+        # nonce 已在 _send_request 中收集，这里只保留原有的缺失检查
+        if self.REPLAY_NONCE_HEADER not in response.headers:
+            raise acme_errors.MissingNonce(response)
+
+    def _pop_nonce(self) -> Optional[bytes]:
+        """
+        从池中取出一个未过期的 nonce，池为空时返回 None。
+        """
+        now = time.monotonic()
+        with self._nonce_lock:
+            while self._nonce_pool:
+                nonce, fetched_at = self._nonce_pool.popleft()
+                if now - fetched_at <= self.nonce_max_age:
+                    return nonce
+        return None
+
+    def _get_nonce(self, url: str, new_nonce_url: str) -> str:
+        nonce = self._pop_nonce()
+        if nonce is not None:
+            return nonce
+        with self._stats_lock:
+            self.stats["nonce_requests"] += 1
+        if new_nonce_url is None:
+            response = self.head(url)
+        else:
+            response = self._check_response(self.head(new_nonce_url), content_type=None)
+        if self.REPLAY_NONCE_HEADER not in response.headers:
+            raise acme_errors.MissingNonce(response)
+        nonce = self._pop_nonce()
+        if nonce is None:
+            # 在取出之前被其他线程用掉，重新请求
+            return self._get_nonce(url, new_nonce_url)
+        return nonce
+
+    def prefetch_nonces(self, count: int, new_nonce_url: str, max_workers: int = 4) -> int:
+        """
+        在并发请求之前预取 nonce，使后续的签名请求无需再单独请求 newNonce。
+        :param count: 期望池中至少拥有的 nonce 数量。
+        :param new_nonce_url: ACME 目录中的 newNonce 地址。
+        :param max_workers: 并发预取的线程数。
+        :return: 实际预取的数量。
+        """
+        with self._nonce_lock:
+            missing = count - len(self._nonce_pool)
+        if missing <= 0:
+            return 0
+
+        def fetch(_):
+            with self._stats_lock:
+                self.stats["nonce_requests"] += 1
+            return self._harvest_nonce(self.head(new_nonce_url))
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, missing)), thread_name_prefix="nonce") as executor:
+            fetched = sum(1 for ok in executor.map(fetch, range(missing)) if ok)
+        logger.info(f"[ACME网络]预取 nonce {fetched} 个。")
+        return fetched
+
+
+class DirectoryCache:
+    """
+    ACME 目录的本地缓存。目录内容在 TTL 内直接从缓存文件读取，避免每次运行都请求目录。
+    """
+    def __init__(self, cache_path: str, ttl: int = 86400):
+        """
+        初始化 DirectoryCache。
+        :param cache_path: 缓存文件路径，按目录 URL 保存多个目录。
+        :param ttl: 缓存有效期（秒），为 0 时不使用缓存。
+        """
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self._served_from_cache = set() # 本进程中从缓存读取的目录 URL
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"[ACME网络]读取目录缓存失败，位置：{self.cache_path}，错误：{e}")
+            return {}
+
+    def get(self, directory_url: str, net: acme_client_module.ClientNetwork) -> messages.Directory:
+        """
+        获取 ACME 目录，缓存有效时不发起网络请求。
+        :param directory_url: ACME 目录 URL。
+        :param net: 用于请求目录的 ClientNetwork。
+        :return: ACME 目录对象。
+        """
+        cache = self._load() if self.ttl > 0 else {}
+        entry = cache.get(directory_url)
+        if entry and time.time() - entry.get("fetched_at", 0) < self.ttl:
+            logger.info(f"[ACME网络]使用缓存的 ACME 目录：{directory_url}")
+            self._served_from_cache.add(directory_url)
+            return messages.Directory.from_json(entry["directory"])
+
+        directory_json = net.get(directory_url).json()
+        if self.ttl > 0:
+            cache[directory_url] = {"fetched_at": time.time(), "directory": directory_json}
+            try:
+                write_file_atomic(self.cache_path, json.dumps(cache, ensure_ascii=False).encode("utf-8"))
+            except Exception as e:
+                logger.warning(f"[ACME网络]保存目录缓存失败，位置：{self.cache_path}，错误：{e}")
+        return messages.Directory.from_json(directory_json)
+
+    def invalidate(self, directory_url: str) -> None:
+        """
+        删除指定目录 URL 的缓存（例如服务器返回目录中的地址无效时）。
+        """
+        self._served_from_cache.discard(directory_url)
+        cache = self._load()
+        if cache.pop(directory_url, None) is not None:
+            write_file_atomic(self.cache_path, json.dumps(cache, ensure_ascii=False).encode("utf-8"))
+
+    def invalidate_after_failure(self, directory_url: str, error: Exception) -> bool:
+        """
+        目录中的端点（newAccount、newOrder、revokeCert 等）请求失败时调用。
+        如果本进程使用的目录来自缓存，并且失败不是 CA 对请求内容的正常拒绝（ACME 错误文档，malformed 除外），
+        说明缓存的端点地址可能已失效，删除缓存，之后初始化的客户端重新获取目录。
+        :param directory_url: ACME 目录 URL。
+        :param error: 请求失败的异常。
+        :return: 删除了缓存返回 True。
+        """
+        if directory_url not in self._served_from_cache:
+            return False
+        if isinstance(error, messages.Error) and error.code != "malformed":
+            return False
+        logger.warning(f"[ACME网络]使用缓存目录中的端点请求失败，删除目录缓存：{directory_url}，错误：{error}")
+        try:
+            self.invalidate(directory_url)
+        except Exception as e:
+            logger.warning(f"[ACME网络]删除目录缓存失败，位置：{self.cache_path}，错误：{e}")
+        return True
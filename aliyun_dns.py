@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 # This file is auto-generated, don't edit it. Thanks.
-from typing import List, Dict, Any, Optional
+import threading
+from typing import List, Dict, Any, Optional, Set, Tuple
 
 from alibabacloud_alidns20150109.client import Client as Alidns20150109Client
 # from alibabacloud_credentials.client import Client as CredentialClient # 不再需要CredentialClient
@@ -9,36 +10,69 @@ from alibabacloud_alidns20150109 import models as alidns_20150109_models
 from alibabacloud_tea_util import models as util_models
 from loguru import logger
 
+from api_metrics import ApiMetrics
+from cassette import Cassette
+from rate_limiter import RateLimiter
+
 class AliyunDNSManager:
     """
     阿里云 DNS 解析记录管理类
     """
-    def __init__(self, access_key_id: str, access_key_secret: str, endpoint: str):
+    def __init__(self, access_key_id: str, access_key_secret: str, endpoint: str, metrics: Optional[ApiMetrics] = None,
+                 cassette: Optional[Cassette] = None, rate: float = 0):
         """
         初始化 AliyunDNSManager.
         :param access_key_id: 阿里云 AccessKey ID.
         :param access_key_secret: 阿里云 AccessKey Secret.
         :param endpoint: 阿里云 API Endpoint.
+        :param metrics: (可选) API 调用统计，按 Action 记录调用次数和耗时.
+        :param cassette: (可选) 录制/回放所有 API 调用，用于离线回归测试.
+        :param rate: (可选) 每秒最多发送的 API 请求数（阿里云按 AccessKey 限流），为 0 时不限速.
         """
         if not all([access_key_id, access_key_secret, endpoint]):
             raise ValueError("AccessKey ID, Secret 和 Endpoint 不能为空。")
         self.access_key_id = access_key_id
         self.access_key_secret = access_key_secret
         self.endpoint = endpoint
+        self.metrics = metrics if metrics is not None else ApiMetrics()
+        self.cassette = cassette
+        # 解析记录索引：{域名: {(主机记录, 类型): [记录字典, ...]}}，用于批量写入时避免逐条查询
+        self._record_index: Dict[str, Dict[Tuple[str, str], List[Dict[str, Any]]]] = {}
+        # 每个域名索引的查询范围：{域名: (主机记录关键字, 类型)}，None 表示不限
+        self._index_scope: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        self._index_lock = threading.Lock()
+        self.limiter = RateLimiter(rate, burst=max(1, int(rate)))
+        self._client: Optional[Alidns20150109Client] = None
+        self._client_lock = threading.Lock()
         logger.info("AliyunDNSManager 初始化成功。")
 
     def create_client(self) -> Alidns20150109Client:
         """
         使用提供的凭证初始化阿里云 DNS 客户端。
+        客户端在首次调用时创建，之后复用（保持 HTTP 连接），不再为每次 API 调用重新创建。
         @return: Alidns20150109Client
         @throws Exception
         """
-        config = open_api_models.Config(
-            access_key_id=self.access_key_id,
-            access_key_secret=self.access_key_secret
-        )
-        config.endpoint = self.endpoint
-        return Alidns20150109Client(config)
+        with self._client_lock:
+            if self._client is None:
+                config = open_api_models.Config(
+                    access_key_id=self.access_key_id,
+                    access_key_secret=self.access_key_secret
+                )
+                config.endpoint = self.endpoint
+                client = Alidns20150109Client(config)
+                if self.cassette is not None:
+                    client = self.cassette.wrap_aliyun_client(client)
+                self._client = client
+            return self._client
+
+    def _track(self, action: str):
+        """
+        按账号限速后统计一次 API 调用。
+        :param action: API 的 Action 名称
+        """
+        self.limiter.acquire()
+        return self.metrics.track("aliyun_dns", action)
 
     def add_record(
         self,
@@ -78,7 +112,8 @@ class AliyunDNSManager:
         record_info = f"域名={domain_name}, 主机={rr}, 类型={record_type}, 值={value}, TTL={ttl}, 优先级={priority if priority is not None else 'N/A'}, 线路={line}"
 
         try:
-            response = client.add_domain_record_with_options(add_domain_record_request, runtime)
+            with self._track("AddDomainRecord"):
+                response = client.add_domain_record_with_options(add_domain_record_request, runtime)
             logger.info(f"[添加解析]添加解析记录成功: {record_info}, RecordId={response.body.record_id}")
             return response.body.record_id
         except Exception as error:
@@ -112,13 +147,39 @@ class AliyunDNSManager:
 
 
         try:
-            response = client.delete_sub_domain_records_with_options(delete_sub_domain_records_request, runtime)
+            with self._track("DeleteSubDomainRecords"):
+                response = client.delete_sub_domain_records_with_options(delete_sub_domain_records_request, runtime)
             total_count = int(response.body.total_count)
+            self.forget_records(domain_name, rr, record_type)
             logger.info(f"[删除解析]删除子域名解析记录成功: {record_info}, 删除了 {total_count} 条记录。")
         except Exception as error:
             logger.error(f"[删除解析]删除子域名解析记录失败: {record_info}, 错误={error.message}")
             raise  # 重新抛出异常，以便调用者处理
 
+    def delete_record(self, record_id: str, domain_name: str = None) -> None:
+        """
+        根据 RecordId 删除单条解析记录。
+        :param record_id: 解析记录的 ID
+        :param domain_name: (可选) 记录所在的域名，用于同步更新解析记录索引
+        :raises Exception: 如果删除失败则抛出异常
+        """
+        client = self.create_client()
+        delete_domain_record_request = alidns_20150109_models.DeleteDomainRecordRequest(
+            lang='zh',  # 设置请求和接收消息的语言类型为中文
+            record_id=record_id
+        )
+        runtime = util_models.RuntimeOptions()
+        record_info = f"RecordId={record_id}, 域名={domain_name if domain_name else 'N/A'}"
+
+        try:
+            with self._track("DeleteDomainRecord"):
+                client.delete_domain_record_with_options(delete_domain_record_request, runtime)
+            self.forget_record_id(record_id, domain_name)
+            logger.info(f"[删除解析]删除解析记录成功: {record_info}")
+        except Exception as error:
+            logger.error(f"[删除解析]删除解析记录失败: {record_info}, 错误={getattr(error, 'message', error)}")
+            raise  # 重新抛出异常，以便调用者处理
+
     def update_record(
         self,
         record_id: str,
@@ -161,7 +222,8 @@ class AliyunDNSManager:
             # 注意：此方法直接通过 record_id 更新，不直接知道 domain_name。
             # 如果需要 domain_name，需要先查询 record_id 获取其所在的 domain_name，但通常 upsert_record 会提供更完整的上下文。
 
-            client.update_domain_record_with_options(update_domain_record_request, runtime)
+            with self._track("UpdateDomainRecord"):
+                client.update_domain_record_with_options(update_domain_record_request, runtime)
             logger.info(f"[更新解析]更新解析记录成功: {record_info}")
 
         except Exception as error:
@@ -222,7 +284,8 @@ class AliyunDNSManager:
         runtime = util_models.RuntimeOptions()
         record_info = f"域名={domain_name}, 主机关键字={rr_key_word if rr_key_word else 'N/A'}, 类型关键字={type_key_word if type_key_word else 'N/A'}, 值关键字={value_key_word if value_key_word else 'N/A'}, 页面大小={page_size if page_size else '默认'}, 页码={page_number if page_number else '默认'}"
         try:
-            response = client.describe_domain_records_with_options(describe_domain_records_request, runtime)
+            with self._track("DescribeDomainRecords"):
+                response = client.describe_domain_records_with_options(describe_domain_records_request, runtime)
             records = [record.to_map() for record in response.body.domain_records.record] if response.body.domain_records and response.body.domain_records.record else []
             result = {
                 "TotalCount": int(response.body.total_count) if response.body.total_count else 0,
@@ -363,3 +426,208 @@ class AliyunDNSManager:
             logger.error(f"[添加或更新解析]添加或更新解析记录失败: {record_info}, 错误={e}")
             raise # 重新抛出异常
 
+
+    def describe_domain(self, domain_name: str, timeout: int = 5000) -> Dict[str, Any]:
+        """
+        查询主域名信息，用于在申请证书之前确认凭证有效且域名已添加到当前阿里云账号中
+        :param domain_name: 域名名称
+        :param timeout: 连接和读取的超时时间（毫秒），默认为 5000
+        :return: 域名信息字典
+        :raises Exception: 如果凭证无效、域名不存在或查询失败则抛出异常
+        """
+        client = self.create_client()
+        describe_domain_info_request = alidns_20150109_models.DescribeDomainInfoRequest(
+            lang='zh',  # 设置请求和接收消息的语言类型为中文
+            domain_name=domain_name
+        )
+        runtime = util_models.RuntimeOptions(connect_timeout=timeout, read_timeout=timeout)
+        try:
+            with self._track("DescribeDomainInfo"):
+                response = client.describe_domain_info_with_options(describe_domain_info_request, runtime)
+            logger.info(f"[域名查询]查询域名信息成功: 域名={domain_name}, DomainId={response.body.domain_id}")
+            return response.body.to_map()
+        except Exception as error:
+            logger.error(f"[域名查询]查询域名信息失败: 域名={domain_name}, 错误={getattr(error, 'message', error)}")
+            raise  # 重新抛出异常，以便调用者处理
+
+    def list_domains(self, page_size: int = 100) -> List[str]:
+        """
+        分页获取当前阿里云账号下的所有主域名（托管区域）
+        :param page_size: 每页行数，最大值 100
+        :return: 主域名列表
+        :raises Exception: 如果查询失败则抛出异常
+        """
+        client = self.create_client()
+        runtime = util_models.RuntimeOptions()
+        domains = []
+        page_number = 1
+        try:
+            while True:
+                describe_domains_request = alidns_20150109_models.DescribeDomainsRequest(
+                    lang='zh',  # 设置请求和接收消息的语言类型为中文
+                    page_number=page_number,
+                    page_size=page_size
+                )
+                with self._track("DescribeDomains"):
+                    response = client.describe_domains_with_options(describe_domains_request, runtime)
+                page = response.body.domains.domain if response.body.domains and response.body.domains.domain else []
+                domains.extend(domain.domain_name for domain in page)
+                if not page or len(domains) >= int(response.body.total_count or 0):
+                    break
+                page_number += 1
+            logger.info(f"[域名查询]查询主域名列表成功, 共 {len(domains)} 个域名。")
+            return domains
+        except Exception as error:
+            logger.error(f"[域名查询]查询主域名列表失败: 错误={getattr(error, 'message', error)}")
+            raise  # 重新抛出异常，以便调用者处理
+
+    def list_all_records(
+        self,
+        domain_name: str,
+        rr_key_word: str = None,
+        record_type: str = None,
+        page_size: int = 500
+    ) -> List[Dict[str, Any]]:
+        """
+        分页获取指定主域名下所有匹配的解析记录。
+        :param domain_name: 域名名称
+        :param rr_key_word: 主机记录的关键字（前后模糊匹配）
+        :param record_type: 解析记录类型，例如 TXT
+        :param page_size: 每页行数，最大值 500
+        :return: 解析记录字典列表
+        :raises Exception: 如果查询失败则抛出异常
+        """
+        records = []
+        page_number = 1
+        while True:
+            result = self.list_records(
+                domain_name=domain_name,
+                page_number=page_number,
+                page_size=page_size,
+                rr_key_word=rr_key_word,
+                record_type=record_type
+            )
+            records.extend(result["DomainRecords"])
+            if not result["DomainRecords"] or len(records) >= result["TotalCount"]:
+                return records
+            page_number += 1
+
+    def load_record_index(
+        self,
+        domain_name: str,
+        rr_key_word: str = None,
+        record_type: str = None,
+        refresh: bool = False
+    ) -> Dict[Tuple[str, str], List[Dict[str, Any]]]:
+        """
+        加载指定主域名的解析记录索引。索引只在首次调用或 refresh=True 时查询 API，之后的写入会同步更新索引。
+        已加载的索引范围不包含本次请求的范围时（例如之前按关键字加载，本次不限关键字），重新查询。
+        :param domain_name: 域名名称
+        :param rr_key_word: 主机记录的关键字，用于限定索引范围，例如 _acme-challenge
+        :param record_type: 解析记录类型，例如 TXT
+        :param refresh: 是否强制重新查询
+        :return: {(主机记录, 类型): [记录字典, ...]}
+        :raises Exception: 如果查询失败则抛出异常
+        """
+        with self._index_lock:
+            scope = self._index_scope.get(domain_name)
+            if not refresh and domain_name in self._record_index and scope[0] in (None, rr_key_word) \
+                    and scope[1] in (None, record_type):
+                return self._record_index[domain_name]
+
+        index: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for record in self.list_all_records(domain_name, rr_key_word=rr_key_word, record_type=record_type):
+            index.setdefault((record.get("RR"), record.get("Type")), []).append(record)
+
+        with self._index_lock:
+            self._record_index[domain_name] = index
+            self._index_scope[domain_name] = (rr_key_word, record_type)
+        logger.info(f"[记录索引]加载解析记录索引成功: 域名={domain_name}, 共 {sum(len(v) for v in index.values())} 条记录。")
+        return index
+
+    def batch_upsert_txt_records(
+        self,
+        domain_name: str,
+        values_by_rr: Dict[str, List[str]],
+        ttl: int = None
+    ) -> Tuple[Dict[str, Dict[str, str]], Set[str]]:
+        """
+        基于解析记录索引批量写入 TXT 记录。
+        同一主机记录下可以同时存在多个值（例如通配符域名和主域名的挑战值），已存在的值不会重复写入。
+        已存在的值可能由另一个运行写入（例如预热与续期拿到同一个待验证的授权），调用者不应清理它们。
+        :param domain_name: 域名名称
+        :param values_by_rr: {主机记录: [记录值, ...]}
+        :param ttl: 解析生效时间
+        :return: ({主机记录: {记录值: RecordId}}, 本次新增的 RecordId 集合)，前者包含本次写入或已存在的记录 ID
+        :raises Exception: 如果写入失败则抛出异常
+        """
+        # 挑战委派的验证区域中，主机记录是 CNAME 目标去掉区域后的部分（例如 www.example.com），
+        # 不以 _acme-challenge 开头，此时不按关键字过滤，否则已存在的值查询不到，重复写入会被拒绝
+        challenge_rrs = all(rr == "_acme-challenge" or rr.startswith("_acme-challenge.") for rr in values_by_rr)
+        index = self.load_record_index(domain_name, rr_key_word="_acme-challenge" if challenge_rrs else None,
+                                       record_type="TXT")
+        record_ids: Dict[str, Dict[str, str]] = {}
+        created: Set[str] = set()
+
+        for rr, values in values_by_rr.items():
+            with self._index_lock:
+                existing = list(index.get((rr, "TXT"), []))
+            existing_values = {record.get("Value"): record.get("RecordId") for record in existing}
+            record_ids[rr] = {}
+
+            for value in dict.fromkeys(values):
+                if value in existing_values:
+                    record_ids[rr][value] = existing_values[value]
+                    continue
+                try:
+                    record_id = self.add_record(
+                        domain_name=domain_name,
+                        rr=rr,
+                        record_type="TXT",
+                        value=value,
+                        ttl=ttl if ttl is not None else 600
+                    )
+                    created.add(record_id)
+                except Exception as error:
+                    # 索引加载后，其他进程写入了相同的值：按已存在的记录处理
+                    if getattr(error, "code", None) != "DomainRecordDuplicate":
+                        raise
+                    record_id = self.check_record(domain_name, rr, "TXT", value=value)
+                    if record_id is None:
+                        raise
+                    logger.info(f"[批量解析]记录已由其他运行写入: 域名={domain_name}, 主机={rr}, RecordId={record_id}")
+                record_ids[rr][value] = record_id
+                with self._index_lock:
+                    index.setdefault((rr, "TXT"), []).append({"RR": rr, "Type": "TXT", "Value": value, "RecordId": record_id})
+
+        logger.info(f"[批量解析]批量写入 TXT 记录完成: 域名={domain_name}, 主机记录 {len(values_by_rr)} 个, 新增 {len(created)} 条记录。")
+        return record_ids, created
+
+    def forget_records(self, domain_name: str, rr: str, record_type: str = None) -> None:
+        """
+        从解析记录索引中移除指定主机记录（删除记录后调用，保持索引与实际记录一致）。
+        :param domain_name: 域名名称
+        :param rr: 主机记录
+        :param record_type: 解析记录类型，不填则移除所有类型
+        """
+        with self._index_lock:
+            index = self._record_index.get(domain_name)
+            if not index:
+                return
+            for key in [k for k in index if k[0] == rr and (record_type is None or k[1] == record_type)]:
+                del index[key]
+
+    def forget_record_id(self, record_id: str, domain_name: str = None) -> None:
+        """
+        从解析记录索引中移除指定 RecordId 的记录。
+        :param record_id: 解析记录的 ID
+        :param domain_name: (可选) 记录所在的域名，不填则在所有域名的索引中查找
+        """
+        with self._index_lock:
+            indexes = [self._record_index[domain_name]] if domain_name in self._record_index else (
+                [] if domain_name else list(self._record_index.values()))
+            for index in indexes:
+                for key in list(index):
+                    index[key] = [r for r in index[key] if r.get("RecordId") != record_id]
+                    if not index[key]:
+                        del index[key]
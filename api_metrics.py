@@ -0,0 +1,99 @@
+import re
+import time
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+
+class ApiMetrics:
+    """
+    外部 API 调用统计：按服务和操作（阿里云 Action、ACME 端点）记录调用次数、失败次数和耗时。
+    线程安全，可在多个客户端之间共享同一个实例。
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Dict[str, Dict[str, float]]] = {}
+
+    def record(self, service: str, action: str, elapsed: float, ok: bool = True) -> None:
+        """
+        记录一次调用。
+        :param service: 服务名称，例如 aliyun_dns、acme。
+        :param action: 操作名称，例如 AddDomainRecord、newOrder。
+        :param elapsed: 耗时（秒）。
+        :param ok: 调用是否成功。
+        """
+        with self._lock:
+            entry = self._calls.setdefault(service, {}).setdefault(
+                action, {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+            elapsed_ms = elapsed * 1000
+            entry["count"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            if not ok:
+                entry["errors"] += 1
+
+    @contextmanager
+    def track(self, service: str, action: str):
+        """
+        统计上下文中的一次调用，发生异常时记为失败。
+        """
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.record(service, action, time.perf_counter() - start, ok)
+
+    def total(self, service: str, action: Optional[str] = None) -> int:
+        """
+        返回指定服务（及操作）的调用总次数。
+        """
+        with self._lock:
+            actions = self._calls.get(service, {})
+            if action is not None:
+                return int(actions.get(action, {}).get("count", 0))
+            return int(sum(entry["count"] for entry in actions.values()))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        返回统计信息的副本，用于写入运行报告。
+        """
+        with self._lock:
+            result = {}
+            for service, actions in self._calls.items():
+                result[service] = {
+                    action: dict(entry, total_ms=round(entry["total_ms"], 1), max_ms=round(entry["max_ms"], 1))
+                    for action, entry in actions.items()
+                }
+                result[service]["_total"] = int(sum(entry["count"] for entry in actions.values()))
+            return result
+
+
+# ACME 资源 URL 路径中的关键字与端点名称的对应关系（Let's Encrypt / Boulder / Pebble 的路径风格）
+_ACME_PATH_PATTERNS = [
+    (re.compile(r"/(authz|authz-v3|authorization)s?/"), "authorization"),
+    (re.compile(r"/(chall|chall-v3|challenge)s?/"), "challenge"),
+    (re.compile(r"/finali[sz]e/"), "finalize"),
+    (re.compile(r"/(order|my-order)s?/"), "order"),
+    (re.compile(r"/(cert|certificate)s?/"), "certificate"),
+    (re.compile(r"/(acct|account)s?/"), "account"),
+    (re.compile(r"/renewal-?info"), "renewalInfo"),
+]
+
+
+def classify_acme_url(url: str, directory_urls: Dict[str, str]) -> str:
+    """
+    将 ACME 请求的 URL 归类为端点名称。
+    :param url: 请求 URL。
+    :param directory_urls: {URL: 端点名称}，来自 ACME 目录（newNonce、newOrder 等）。
+    :return: 端点名称，无法识别时返回 "other"。
+    """
+    if url in directory_urls:
+        return directory_urls[url]
+    path = urlparse(url).path
+    for pattern, name in _ACME_PATH_PATTERNS:
+        if pattern.search(path):
+            return name
+    return "other"
@@ -0,0 +1,100 @@
+import time
+import queue
+import threading
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+
+
+class PreflightError(Exception):
+    """
+    启动阶段的致命预检错误（例如阿里云凭证无效、区域不存在、ACME 服务器不可用）。
+    """
+    def __init__(self, task: str, error: BaseException):
+        super().__init__(f"{task}: {error}")
+        self.task = task
+        self.error = error
+
+
+class Bootstrap:
+    """
+    并行执行启动阶段的准备工作（ACME 目录和账户、DNS 凭证和区域预检、密钥生成、证书清单扫描等）。
+    任何一项致命任务失败时立即抛出 PreflightError，不等待其他任务结束，从而在创建订单之前尽快失败；
+    非致命任务失败只记录警告。
+    """
+    def __init__(self, max_workers: int = 8, profiler: Optional[Any] = None):
+        """
+        初始化 Bootstrap。
+        :param max_workers: 最大并发任务数。
+        :param profiler: (可选) PhaseProfiler 对象。任务在工作线程中执行，主线程的分析器看不到，
+                         因此每个任务在自己的线程中作为子阶段 bootstrap.<任务名> 分析。
+        """
+        self.max_workers = max_workers
+        self.profiler = profiler
+        self._tasks: List[Tuple[str, Callable[[], Any], bool]] = []
+        self.timings: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, name: str, func: Callable[[], Any], fatal: bool = True) -> None:
+        """
+        添加一个任务。
+        :param name: 任务名称，用于日志和运行报告。
+        :param func: 无参数的任务函数。
+        :param fatal: 任务失败时是否中止启动。
+        """
+        self._tasks.append((name, func, fatal))
+
+    def _run_task(self, name: str, func: Callable[[], Any]) -> Any:
+        start = time.perf_counter()
+        phase = self.profiler.phase(f"bootstrap.{name}", parent="bootstrap") if self.profiler else nullcontext()
+        try:
+            with phase:
+                return func()
+        finally:
+            self.timings[name] = {"elapsed_ms": round((time.perf_counter() - start) * 1000, 1)}
+
+    def run(self) -> Dict[str, Any]:
+        """
+        并行执行所有任务。
+        任务在守护线程中执行：预检失败时不等待仍在运行的任务（例如卡在网络请求上的任务），也不会阻止进程退出；
+        尚未开始的任务不再执行。
+        :return: {任务名称: 返回值}，失败的非致命任务不包含在内。
+        :raises PreflightError: 第一个失败的致命任务。
+        """
+        start = time.perf_counter()
+        results = {}
+        tasks = queue.Queue()
+        for task in self._tasks:
+            tasks.put(task)
+        outcomes = queue.Queue()
+        stopped = threading.Event()
+
+        def worker():
+            while not stopped.is_set():
+                try:
+                    name, func, fatal = tasks.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    outcomes.put((name, fatal, self._run_task(name, func), None))
+                except BaseException as e:
+                    if fatal:
+                        stopped.set()
+                    outcomes.put((name, fatal, None, e))
+
+        for i in range(max(1, min(self.max_workers, len(self._tasks)))):
+            threading.Thread(target=worker, name=f"bootstrap_{i}", daemon=True).start()
+        try:
+            for _ in range(len(self._tasks)):
+                name, fatal, result, error = outcomes.get()
+                if error is None:
+                    results[name] = result
+                    continue
+                self.timings.setdefault(name, {})["error"] = str(error)
+                if fatal:
+                    logger.error(f"[启动]预检失败，中止启动：{name}，错误：{error}")
+                    raise PreflightError(name, error)
+                logger.warning(f"[启动]非致命任务失败：{name}，错误：{error}")
+        finally:
+            stopped.set()
+        logger.info(f"[启动]启动阶段完成，共 {len(self._tasks)} 项任务，耗时 {time.perf_counter() - start:.2f} 秒。")
+        return results
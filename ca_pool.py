@@ -0,0 +1,274 @@
+import os
+import re
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from cryptography.hazmat.primitives import serialization
+from loguru import logger
+
+from file_utils import write_file_atomic
+from key_manager import KeyManager
+from locks import FileLockBackend, LockManager
+
+CA_POLICY_FAILOVER = "failover" # 按顺序尝试，当前 CA 失败或超过期限后取消并切换到下一个
+CA_POLICY_HEDGE = "hedge"       # 当前 CA 在指定时间内未完成时，同时向下一个 CA 申请，先完成者胜出
+CA_POLICIES = (CA_POLICY_FAILOVER, CA_POLICY_HEDGE)
+
+
+class AccountCache:
+    """
+    按 CA 缓存 ACME 账户（账户私钥和注册信息），避免每次运行都注册新账户。
+    使用 EAB 的 CA（例如 ZeroSSL）每次注册都会消耗 EAB 凭证，缓存账户后只需注册一次。
+    轮换账户密钥时需要持有 lock 返回的跨进程锁，避免多个进程同时轮换同一个账户。
+    """
+    def __init__(self, cache_dir: str, password: str = None):
+        """
+        初始化 AccountCache。
+        :param cache_dir: 缓存目录，每个 CA 一个 <名称>.key 和 <名称>.json 文件。
+        :param password: (可选) 账户私钥的加密密码。
+        """
+        self.cache_dir = cache_dir
+        self.password = password
+        self._lock_manager = None
+        self._guard = threading.Lock()
+
+    def _safe_name(self, ca_name: str) -> str:
+        return re.sub(r"[^A-Za-z0-9._-]", "_", ca_name)
+
+    def _paths(self, ca_name: str) -> Tuple[str, str]:
+        safe_name = self._safe_name(ca_name)
+        return os.path.join(self.cache_dir, f"{safe_name}.key"), os.path.join(self.cache_dir, f"{safe_name}.json")
+
+    def load(self, ca_name: str, directory_url: str) -> Optional[Tuple[Any, Dict[str, Any]]]:
+        """
+        读取缓存的账户。
+        :return: (账户私钥, 注册信息 JSON)；不存在、目录 URL 不一致或读取失败时返回 None。
+        """
+        key_path, regr_path = self._paths(ca_name)
+        try:
+            with open(regr_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("directory_url") != directory_url:
+                return None
+            return KeyManager.load_account_key(key_path, self.password), data["regr"]
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"[多 CA]读取 {ca_name} 的账户缓存失败，将重新注册。错误：{e}")
+            return None
+
+    def lock(self, ca_name: str):
+        """
+        返回 CA 账户的跨进程锁（缓存目录下的 <名称>.lock），用法：with account_cache.lock(ca_name): ...
+        :raises LockTimeoutError: 在超时时间内未能获取锁。
+        """
+        with self._guard:
+            if self._lock_manager is None:
+                self._lock_manager = LockManager(FileLockBackend(self.cache_dir))
+        return self._lock_manager.lock(self._safe_name(ca_name))
+
+    def save(self, ca_name: str, directory_url: str, key: Any, regr: Dict[str, Any]) -> None:
+        """
+        保存账户私钥和注册信息。
+        """
+        key_path, regr_path = self._paths(ca_name)
+        encryption = (serialization.BestAvailableEncryption(self.password.encode("utf-8"))
+                      if self.password else serialization.NoEncryption())
+        try:
+            write_file_atomic(key_path, key.private_bytes(
+                serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, encryption), mode=0o600)
+            write_file_atomic(regr_path, json.dumps(
+                {"directory_url": directory_url, "regr": regr}, ensure_ascii=False).encode("utf-8"), mode=0o600)
+        except Exception as e:
+            logger.warning(f"[多 CA]保存 {ca_name} 的账户缓存失败：{e}")
+
+
+class CaHealth:
+    """
+    记录每个 CA 的成功/失败次数和签发耗时（指数加权平均），用于调整尝试顺序：
+    最近失败且之后没有成功过的 CA 会被排到后面，直到冷却时间结束。
+    """
+    def __init__(self, path: str, cooldown: float = 3600):
+        """
+        初始化 CaHealth。
+        :param path: 健康状态文件路径。
+        :param cooldown: 失败后被降级的时间（秒）。
+        """
+        self.path = path
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self._data: Dict[str, Dict[str, Any]] = json.load(f)
+        except FileNotFoundError:
+            self._data = {}
+        except Exception as e:
+            logger.warning(f"[多 CA]读取 CA 健康状态失败，位置：{path}，错误：{e}")
+            self._data = {}
+
+    def record(self, ca_name: str, ok: bool, elapsed: float, error: str = None) -> None:
+        """
+        记录一次签发尝试的结果并保存。
+        """
+        with self._lock:
+            entry = self._data.setdefault(ca_name, {"successes": 0, "failures": 0, "latency_ewma": None,
+                                                    "last_success_at": 0, "last_failure_at": 0, "last_error": None})
+            if ok:
+                entry["successes"] += 1
+                entry["last_success_at"] = time.time()
+                previous = entry["latency_ewma"]
+                entry["latency_ewma"] = round(elapsed if previous is None else 0.3 * elapsed + 0.7 * previous, 2)
+            else:
+                entry["failures"] += 1
+                entry["last_failure_at"] = time.time()
+                entry["last_error"] = error
+            data = json.dumps(self._data, ensure_ascii=False).encode("utf-8")
+        try:
+            write_file_atomic(self.path, data)
+        except Exception as e:
+            logger.warning(f"[多 CA]保存 CA 健康状态失败，位置：{self.path}，错误：{e}")
+
+    def is_degraded(self, ca_name: str) -> bool:
+        entry = self._data.get(ca_name)
+        if not entry:
+            return False
+        return (entry["last_failure_at"] > entry["last_success_at"]
+                and time.time() - entry["last_failure_at"] < self.cooldown)
+
+    def ordered(self, cas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        按配置顺序返回 CA 列表，处于降级状态的 CA 排在后面。
+        """
+        with self._lock:
+            return sorted(cas, key=lambda ca: self.is_degraded(ca["name"]))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return json.loads(json.dumps(self._data))
+
+
+class IssuanceRace:
+    """
+    多个 CA 同时签发时的协调者：第一个调用 claim 的 CA 胜出，其他 CA 会收到取消信号。
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.winner: Optional[str] = None
+        self.cancel_events: Dict[str, threading.Event] = {}
+
+    def register(self, ca_name: str) -> threading.Event:
+        with self._lock:
+            return self.cancel_events.setdefault(ca_name, threading.Event())
+
+    def claim(self, ca_name: str) -> bool:
+        """
+        在保存证书之前调用。返回 True 表示本 CA 胜出，可以保存证书。
+        """
+        with self._lock:
+            if self.winner is None:
+                self.winner = ca_name
+                for name, event in self.cancel_events.items():
+                    if name != ca_name:
+                        event.set()
+            return self.winner == ca_name
+
+    def cancel(self, ca_name: str) -> None:
+        with self._lock:
+            event = self.cancel_events.get(ca_name)
+        if event is not None:
+            event.set()
+
+
+class MultiCaIssuer:
+    """
+    按选择策略向多个 CA 申请证书。
+    - failover：按顺序尝试，当前 CA 失败或超过 deadline 秒仍未完成时取消它并切换到下一个；
+    - hedge：当前 CA 在 hedge_delay 秒内未完成时，同时向下一个 CA 申请（不取消当前 CA），先完成者胜出。
+    """
+    def __init__(self, cas: List[Dict[str, Any]], policy: str = CA_POLICY_FAILOVER, deadline: float = 600,
+                 hedge_delay: float = 120, health: Optional[CaHealth] = None):
+        """
+        初始化 MultiCaIssuer。
+        :param cas: CA 列表，每项包含 name、directory_url，以及可选的 eab_kid、eab_hmac_key。
+        :param policy: 选择策略，failover 或 hedge。
+        :param deadline: failover 策略下单个 CA 的最长时间（秒）。
+        :param hedge_delay: hedge 策略下启动下一个 CA 之前的等待时间（秒）。
+        :param health: (可选) CA 健康状态，用于调整尝试顺序并记录结果。
+        """
+        if policy not in CA_POLICIES:
+            raise ValueError(f"未知的 CA 选择策略：{policy}，可选值为 {', '.join(CA_POLICIES)}。")
+        self.cas = cas
+        self.policy = policy
+        self.deadline = deadline
+        self.hedge_delay = hedge_delay
+        self.health = health
+
+    def issue(self, attempt: Callable[[Dict[str, Any], IssuanceRace], bool]) -> Optional[str]:
+        """
+        执行签发。
+        :param attempt: 向单个 CA 申请证书的函数，参数为 (CA 配置, IssuanceRace)。
+                        函数应在保存证书之前调用 race.claim(CA 名称)，并在 race.cancel_events[CA 名称] 被设置时尽快放弃。
+        :return: 胜出的 CA 名称；全部失败时返回 None。
+        """
+        cas = self.health.ordered(self.cas) if self.health is not None else list(self.cas)
+        race = IssuanceRace()
+        pending = list(cas)
+        running: Dict[Any, Tuple[Dict[str, Any], float]] = {}
+
+        def run(ca):
+            try:
+                return attempt(ca, race), None
+            except Exception as e:
+                return False, str(e)
+
+        timed_out = set() # failover 策略下因超时被取消的尝试，结束时不再重复记录
+        last_launch = [0.0]
+        with ThreadPoolExecutor(max_workers=len(cas), thread_name_prefix="ca") as executor:
+            def launch():
+                ca = pending.pop(0)
+                race.register(ca["name"])
+                logger.info(f"[多 CA]开始向 {ca['name']} 申请证书：{ca['directory_url']}")
+                running[executor.submit(run, ca)] = (ca, time.monotonic())
+                last_launch[0] = time.monotonic()
+
+            launch()
+            while running:
+                timeout = None
+                if pending:
+                    limit = self.deadline if self.policy == CA_POLICY_FAILOVER else self.hedge_delay
+                    timeout = max(0, last_launch[0] + limit - time.monotonic())
+                done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    ca, start = running.pop(future)
+                    ok, error = future.result()
+                    ok = ok and race.winner == ca["name"]
+                    # 因其他 CA 胜出而被取消、或已按超时记录过的尝试不再记录
+                    if self.health is not None and future not in timed_out and (ok or race.winner is None):
+                        self.health.record(ca["name"], ok, time.monotonic() - start, error or (None if ok else "签发失败"))
+                    if ok:
+                        logger.info(f"[多 CA]{ca['name']} 签发成功，耗时 {time.monotonic() - start:.1f} 秒。")
+                        return ca["name"]
+                    if race.winner is None and future not in timed_out:
+                        logger.warning(f"[多 CA]{ca['name']} 签发失败：{error or '请查看以上日志'}")
+                        active = [f for f in running if f not in timed_out]
+                        if pending and (not active or self.policy == CA_POLICY_HEDGE):
+                            launch()
+
+                if not done and pending:
+                    if self.policy == CA_POLICY_FAILOVER:
+                        for future, (ca, start) in running.items():
+                            if future in timed_out:
+                                continue
+                            logger.warning(f"[多 CA]{ca['name']} 超过 {self.deadline} 秒仍未完成，取消并切换到下一个 CA。")
+                            race.cancel(ca["name"])
+                            timed_out.add(future)
+                            if self.health is not None:
+                                self.health.record(ca["name"], False, time.monotonic() - start, "超时")
+                    else:
+                        logger.info(f"[多 CA]{self.hedge_delay} 秒内未完成，同时向下一个 CA 申请。")
+                    launch()
+
+        return race.winner
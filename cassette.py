@@ -0,0 +1,207 @@
+import json
+import time
+import base64
+import threading
+from datetime import timedelta
+from collections import deque
+from typing import Any, Dict
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from loguru import logger
+from alibabacloud_alidns20150109 import models as alidns_20150109_models
+from Tea.exceptions import TeaException
+
+from file_utils import write_file_atomic
+
+CASSETTE_RECORD = "record"
+CASSETTE_REPLAY = "replay"
+CASSETTE_MODES = (CASSETTE_RECORD, CASSETTE_REPLAY)
+
+# 录制时不保存的 HTTP 头（小写）
+REDACTED_HEADERS = ("authorization", "cookie", "set-cookie", "proxy-authorization")
+
+
+class CassetteMismatchError(Exception):
+    """
+    回放时请求在录制文件（cassette）中找不到对应的响应时抛出。
+    """
+
+
+class Cassette:
+    """
+    ACME、阿里云 DNS 和 DoH 流量的录制/回放。
+    录制模式下真实请求照常发送，响应（不含请求体中的 JWS 签名和敏感 HTTP 头）按顺序写入 cassette 文件；
+    回放模式下不访问网络，按 (方法, URL) 或阿里云 API 名称依次返回录制的响应。
+    回放时可以按录制的耗时等待（speed=1），也可以按比例压缩（例如 speed=0 不等待），
+    从而在没有网络的机器上对完整的申请流程做请求次数和 CPU 耗时的回归测试。
+    """
+    VERSION = 1
+
+    def __init__(self, path: str, mode: str, speed: float = 0.0):
+        """
+        初始化 Cassette。
+        :param path: cassette 文件路径（JSON）。
+        :param mode: "record" 或 "replay"。
+        :param speed: 回放时的延迟系数：1 表示保留录制的耗时，0 表示不等待；同时作用于流程中的轮询等待。
+        """
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"未知的 cassette 模式：{mode}，可选值为 {', '.join(CASSETTE_MODES)}。")
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._interactions = []
+        self._queues: Dict[str, deque] = {}
+        self.replayed = 0
+        if mode == CASSETTE_REPLAY:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != self.VERSION:
+                raise ValueError(f"不支持的 cassette 版本：{data.get('version')}")
+            for interaction in data["interactions"]:
+                self._queues.setdefault(interaction["key"], deque()).append(interaction)
+            logger.info(f"[录制回放]已加载 cassette：{path}，共 {len(data['interactions'])} 条交互。")
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == CASSETTE_RECORD
+
+    def _append(self, interaction: Dict[str, Any]) -> None:
+        with self._lock:
+            self._interactions.append(interaction)
+
+    def _next(self, key: str) -> Dict[str, Any]:
+        with self._lock:
+            queue = self._queues.get(key)
+            if not queue:
+                raise CassetteMismatchError(f"cassette 中没有与请求匹配的交互：{key}")
+            self.replayed += 1
+            interaction = queue.popleft()
+        if self.speed > 0 and interaction.get("elapsed"):
+            time.sleep(interaction["elapsed"] * self.speed)
+        return interaction
+
+    def sleep(self, seconds: float) -> None:
+        """
+        流程中的固定等待（例如轮询间隔）。回放时按 speed 缩放，录制时照常等待。
+        """
+        time.sleep(seconds if self.recording else seconds * self.speed)
+
+    def mount(self, session: requests.Session, pool_size: int = 10) -> None:
+        """
+        将录制/回放适配器挂载到 requests 会话上。
+        """
+        adapter = CassetteAdapter(self, pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+    def wrap_aliyun_client(self, client: Any) -> "AliyunClientRecorder":
+        """
+        包装阿里云 SDK 客户端，录制或回放所有 *_with_options 调用。
+        """
+        return AliyunClientRecorder(client, self)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        返回录制/回放的统计信息。回放结束后仍未使用的交互说明本次运行比录制时少发送了请求。
+        """
+        with self._lock:
+            if self.recording:
+                return {"mode": self.mode, "recorded": len(self._interactions)}
+            return {"mode": self.mode, "replayed": self.replayed,
+                    "unused": sum(len(queue) for queue in self._queues.values())}
+
+    def save(self) -> None:
+        """
+        录制模式下将交互写入 cassette 文件。
+        """
+        if not self.recording:
+            return
+        with self._lock:
+            data = {"version": self.VERSION, "recorded_at": time.time(), "interactions": list(self._interactions)}
+        write_file_atomic(self.path, json.dumps(data, ensure_ascii=False, indent=1).encode("utf-8"))
+        logger.info(f"[录制回放]已保存 {len(data['interactions'])} 条交互到：{self.path}")
+
+
+def _encode_body(content: bytes) -> Dict[str, str]:
+    try:
+        return {"body": content.decode("utf-8"), "body_encoding": "utf-8"}
+    except UnicodeDecodeError:
+        return {"body": base64.b64encode(content).decode("ascii"), "body_encoding": "base64"}
+
+
+def _decode_body(interaction: Dict[str, Any]) -> bytes:
+    if interaction.get("body_encoding") == "base64":
+        return base64.b64decode(interaction["body"])
+    return interaction.get("body", "").encode("utf-8")
+
+
+class CassetteAdapter(HTTPAdapter):
+    """
+    requests 传输适配器：录制模式下转发真实请求并保存响应，回放模式下直接返回录制的响应。
+    """
+    def __init__(self, cassette: Cassette, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.cassette = cassette
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:
+        key = f"http {request.method} {request.url}"
+        if self.cassette.recording:
+            start = time.perf_counter()
+            response = super().send(request, **kwargs)
+            elapsed = time.perf_counter() - start
+            headers = {k: v for k, v in response.headers.items() if k.lower() not in REDACTED_HEADERS}
+            self.cassette._append(dict(
+                {"key": key, "status": response.status_code, "headers": headers, "elapsed": round(elapsed, 4)},
+                **_encode_body(response.content)
+            ))
+            return response
+
+        interaction = self.cassette._next(key)
+        response = requests.Response()
+        response.status_code = interaction["status"]
+        response.headers = CaseInsensitiveDict(interaction["headers"])
+        response._content = _decode_body(interaction)
+        response.url = request.url
+        response.request = request
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.reason = "Replayed"
+        response.elapsed = timedelta(seconds=interaction.get("elapsed", 0))
+        response.connection = self
+        return response
+
+
+class AliyunClientRecorder:
+    """
+    阿里云 SDK 客户端的录制/回放代理。只拦截 *_with_options 方法，响应以 to_map() 的形式保存，
+    回放时通过同名模型类的 from_map() 还原；SDK 抛出的错误也会按 code 和 message 录制和回放。
+    """
+    def __init__(self, client: Any, cassette: Cassette):
+        self._client = client
+        self._cassette = cassette
+
+    def __getattr__(self, name: str) -> Any:
+        if not name.endswith("_with_options"):
+            return getattr(self._client, name)
+        key = f"aliyun {name}"
+
+        def call(*args: Any, **kwargs: Any) -> Any:
+            if self._cassette.recording:
+                start = time.perf_counter()
+                try:
+                    response = getattr(self._client, name)(*args, **kwargs)
+                except TeaException as e:
+                    self._cassette._append({"key": key, "elapsed": round(time.perf_counter() - start, 4),
+                                            "error": {"code": e.code, "message": e.message}})
+                    raise
+                self._cassette._append({"key": key, "elapsed": round(time.perf_counter() - start, 4),
+                                        "response_type": type(response).__name__, "response": response.to_map()})
+                return response
+
+            interaction = self._cassette._next(key)
+            if "error" in interaction:
+                raise TeaException(interaction["error"])
+            return getattr(alidns_20150109_models, interaction["response_type"])().from_map(interaction["response"])
+
+        return call
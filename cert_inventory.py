@@ -0,0 +1,265 @@
+import os
+import json
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional
+from loguru import logger
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa, ec, ed25519, ed448
+
+from file_utils import write_file_atomic
+
+INDEX_VERSION = 1
+CERT_SUFFIXES = (".crt", ".pem", ".cer")
+KEY_SUFFIXES = (".key",)
+
+
+def _key_type(key) -> str:
+    """
+    返回密钥类型的描述，例如 RSA-3072、EC-secp256r1。
+    """
+    if isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+        return f"RSA-{key.key_size}"
+    if isinstance(key, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey)):
+        return f"EC-{key.curve.name}"
+    if isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+        return "Ed25519"
+    if isinstance(key, (ed448.Ed448PrivateKey, ed448.Ed448PublicKey)):
+        return "Ed448"
+    return type(key).__name__
+
+
+def _spki_fingerprint(public_key) -> str:
+    """
+    计算公钥 (SubjectPublicKeyInfo) 的 SHA-256 指纹，用于将证书与私钥文件对应起来。
+    """
+    digest = hashes.Hash(hashes.SHA256())
+    digest.update(public_key.public_bytes(
+        serialization.Encoding.DER,
+        serialization.PublicFormat.SubjectPublicKeyInfo
+    ))
+    return digest.finalize().hex()
+
+
+def parse_certificate_metadata(pem_data: bytes) -> Dict[str, Any]:
+    """
+    解析 PEM 证书（或证书链）中的终端证书，并提取元数据。
+    Args:
+        pem_data (bytes): PEM 编码的证书或证书链。
+    Returns:
+        Dict[str, Any]: 包含 SANs、过期时间、颁发者、密钥类型和指纹等信息的字典。
+    Raises:
+        ValueError: 如果内容中不包含任何证书。
+    """
+    certs = x509.load_pem_x509_certificates(pem_data)
+    if not certs:
+        raise ValueError("未找到任何证书。")
+    leaf = certs[0]
+
+    try:
+        sans = leaf.extensions.get_extension_for_class(x509.SubjectAlternativeName).value.get_values_for_type(x509.DNSName)
+    except x509.ExtensionNotFound:
+        sans = []
+
+    return {
+        "kind": "certificate",
+        "subject": leaf.subject.rfc4514_string(),
+        "issuer": leaf.issuer.rfc4514_string(),
+        "sans": sans,
+        "serial": format(leaf.serial_number, "x"),
+        "not_before": leaf.not_valid_before_utc.timestamp(),
+        "not_after": leaf.not_valid_after_utc.timestamp(),
+        "key_type": _key_type(leaf.public_key()),
+        "fingerprint_sha256": leaf.fingerprint(hashes.SHA256()).hex(),
+        "spki_sha256": _spki_fingerprint(leaf.public_key()),
+        "chain_length": len(certs),
+    }
+
+
+def parse_key_metadata(pem_data: bytes, password: str = None) -> Dict[str, Any]:
+    """
+    解析 PEM 私钥并提取元数据。
+    Args:
+        pem_data (bytes): PEM 编码的私钥。
+        password (str, optional): 私钥密码（如果私钥已加密）。
+    Returns:
+        Dict[str, Any]: 包含密钥类型和公钥指纹的字典。
+    """
+    key = serialization.load_pem_private_key(
+        pem_data,
+        password=password.encode('utf-8') if password else None,
+    )
+    return {
+        "kind": "key",
+        "key_type": _key_type(key),
+        "spki_sha256": _spki_fingerprint(key.public_key()),
+    }
+
+
+class CertInventory:
+    """
+    证书与密钥清单索引。
+    首次扫描时解析 CERT_PATH 和 KEY_PATH 下的所有文件，并将元数据按文件路径、修改时间和大小缓存到索引文件中；
+    之后的扫描只重新解析发生变化的文件。
+    """
+    def __init__(self, cert_path: str, key_path: str, index_path: str, password: str = None):
+        """
+        初始化 CertInventory。
+        :param cert_path: 证书存储目录。
+        :param key_path: 私钥存储目录。
+        :param index_path: 索引文件路径。
+        :param password: 私钥的加密密码（如果有）。
+        """
+        self.cert_path = cert_path
+        self.key_path = key_path
+        self.index_path = index_path
+        self.password = password
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._load_index()
+
+    def _load_index(self) -> None:
+        """
+        从索引文件加载已缓存的元数据。索引不存在或版本不匹配时从空索引开始。
+        """
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"[证书清单]读取索引文件失败，将重新扫描，位置：{self.index_path}，错误：{e}")
+            return
+
+        if data.get("version") != INDEX_VERSION:
+            logger.info("[证书清单]索引版本不匹配，将重新扫描。")
+            return
+        self.entries = data.get("entries", {})
+
+    def _save_index(self) -> None:
+        """
+        将元数据原子地写回索引文件。
+        """
+        data = {"version": INDEX_VERSION, "entries": self.entries}
+        content = json.dumps(data, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        try:
+            write_file_atomic(self.index_path, content, mode=0o600)
+        except Exception as e:
+            logger.warning(f"[证书清单]保存索引文件失败，位置：{self.index_path}，错误：{e}")
+
+    def _iter_files(self, directory: str, suffixes: tuple):
+        """
+        遍历目录下所有指定后缀的文件（跳过隐藏文件）。
+        """
+        if not directory or not os.path.isdir(directory):
+            return
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for name in files:
+                if not name.startswith(".") and name.endswith(suffixes):
+                    yield os.path.join(root, name)
+
+    def _parse_file(self, file_path: str, kind: str) -> Dict[str, Any]:
+        """
+        解析单个文件，解析失败时记录错误信息而不是中断整个扫描。
+        """
+        try:
+            with open(file_path, "rb") as f:
+                data = f.read()
+            if kind == "certificate":
+                return parse_certificate_metadata(data)
+            return parse_key_metadata(data, self.password)
+        except Exception as e:
+            logger.warning(f"[证书清单]解析文件失败，位置：{file_path}，错误：{e}")
+            return {"kind": kind, "error": str(e)}
+
+    def scan(self) -> Dict[str, int]:
+        """
+        扫描证书和私钥目录，只重新解析新增或发生变化（修改时间或大小不同）的文件，并删除已不存在文件的条目。
+        :return: 扫描统计信息，包含 parsed、cached 和 removed 三个计数。
+        """
+        start = time.perf_counter()
+        stats = {"parsed": 0, "cached": 0, "removed": 0}
+        seen = set()
+
+        sources = [(self.cert_path, CERT_SUFFIXES, "certificate"), (self.key_path, KEY_SUFFIXES, "key")]
+        for directory, suffixes, kind in sources:
+            for file_path in self._iter_files(directory, suffixes):
+                try:
+                    st = os.stat(file_path)
+                except OSError:
+                    continue
+                seen.add(file_path)
+
+                entry = self.entries.get(file_path)
+                if entry and entry.get("mtime_ns") == st.st_mtime_ns and entry.get("size") == st.st_size:
+                    stats["cached"] += 1
+                    continue
+
+                metadata = self._parse_file(file_path, kind)
+                metadata["mtime_ns"] = st.st_mtime_ns
+                metadata["size"] = st.st_size
+                self.entries[file_path] = metadata
+                stats["parsed"] += 1
+
+        for file_path in [p for p in self.entries if p not in seen]:
+            del self.entries[file_path]
+            stats["removed"] += 1
+
+        if stats["parsed"] or stats["removed"]:
+            self._save_index()
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"[证书清单]扫描完成，解析 {stats['parsed']} 个，使用缓存 {stats['cached']} 个，移除 {stats['removed']} 个，耗时 {elapsed_ms:.1f} 毫秒。")
+        return stats
+
+    def certificates(self) -> List[Dict[str, Any]]:
+        """
+        返回所有已解析证书的元数据（包含 path 字段）。同一张终端证书同时存在于证书文件和证书链文件时只返回一次，
+        证书链文件的路径保存在 chain_path 字段中（没有证书链文件时与 path 相同）。
+        """
+        result = {}
+        chain_paths = {}
+        for file_path, entry in sorted(self.entries.items()):
+            if entry.get("kind") != "certificate" or "error" in entry:
+                continue
+            fingerprint = entry["fingerprint_sha256"]
+            # 优先使用较短（不含证书链）的文件作为代表
+            if fingerprint not in result or entry.get("chain_length", 1) < result[fingerprint].get("chain_length", 1):
+                result[fingerprint] = dict(entry, path=file_path)
+            # 证书链文件使用最长的那个
+            if fingerprint not in chain_paths or entry.get("chain_length", 1) > self.entries[chain_paths[fingerprint]].get("chain_length", 1):
+                chain_paths[fingerprint] = file_path
+        for fingerprint, cert in result.items():
+            cert["chain_path"] = chain_paths[fingerprint]
+
+        keys_by_spki = {
+            entry["spki_sha256"]: file_path
+            for file_path, entry in self.entries.items()
+            if entry.get("kind") == "key" and "spki_sha256" in entry
+        }
+        for cert in result.values():
+            cert["key_path"] = keys_by_spki.get(cert["spki_sha256"])
+        return list(result.values())
+
+    def find_by_path(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """
+        根据文件路径返回缓存的元数据，不存在时返回 None。
+        """
+        return self.entries.get(file_path)
+
+    def expiring_within(self, days: int) -> List[Dict[str, Any]]:
+        """
+        返回在指定天数内过期（包括已过期）的证书，按过期时间升序排列。
+        :param days: 天数。
+        """
+        deadline = time.time() + days * 86400
+        expiring = [cert for cert in self.certificates() if cert["not_after"] <= deadline]
+        return sorted(expiring, key=lambda cert: cert["not_after"])
+
+
+def format_expiry(timestamp: float) -> str:
+    """
+    将过期时间戳格式化为 UTC 时间字符串。
+    """
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
@@ -0,0 +1,179 @@
+import json
+import time
+import threading
+from typing import Any, Callable, Dict, List, Optional
+from cryptography import x509
+from cryptography.x509.oid import NameOID, ExtensionOID
+from cryptography.hazmat.primitives import serialization
+from loguru import logger
+
+from file_utils import write_file_atomic
+
+CHAIN_POLICY_DEFAULT = "default"
+CHAIN_POLICY_SHORTEST = "shortest"
+CHAIN_POLICIES = (CHAIN_POLICY_DEFAULT, CHAIN_POLICY_SHORTEST)
+
+
+def _common_name(name: x509.Name) -> Optional[str]:
+    attributes = name.get_attributes_for_oid(NameOID.COMMON_NAME)
+    return attributes[0].value if attributes else None
+
+
+def chain_size(certs: List[x509.Certificate]) -> int:
+    """
+    证书链在 TLS 握手中占用的字节数（各证书 DER 编码长度之和，服务器按证书链文件原样发送）。
+    """
+    return sum(len(cert.public_bytes(serialization.Encoding.DER)) for cert in certs)
+
+
+def issuer_key(leaf: x509.Certificate) -> str:
+    """
+    返回终端证书的签发者标识：签发者名称和 Authority Key Identifier。
+    同一个中间证书签发的证书共享同一组可选证书链，因此选择结果按此缓存。
+    """
+    try:
+        aki = leaf.extensions.get_extension_for_oid(ExtensionOID.AUTHORITY_KEY_IDENTIFIER).value.key_identifier
+    except x509.ExtensionNotFound:
+        aki = None
+    return f"{leaf.issuer.rfc4514_string()}|{aki.hex() if aki else ''}"
+
+
+class ChainSelector:
+    """
+    证书链选择器。
+    CA 除默认证书链外，还可能通过 Link: rel="alternate" 提供其他证书链（例如不含交叉签名中间证书的短链）。
+    选择器获取所有可选证书链，优先选择顶端证书的签发者（或自身）名称与 preferred_root 一致的证书链，
+    否则按策略选择默认证书链或握手字节数最少的证书链。选择结果（选中的中间证书）按签发者缓存，
+    之后同一签发者签发的证书直接使用缓存的中间证书拼接，不再请求可选证书链。
+    """
+    def __init__(self, cache_path: str, policy: str = CHAIN_POLICY_SHORTEST, preferred_root: str = None,
+                 ttl: float = 7 * 86400):
+        """
+        初始化 ChainSelector。
+        :param cache_path: 选择结果缓存文件路径。
+        :param policy: 没有匹配 preferred_root 的证书链时的选择策略：default（默认证书链）或 shortest（字节数最少）。
+        :param preferred_root: (可选) 首选的根证书名称（Common Name），例如 "ISRG Root X1"。
+        :param ttl: 缓存的有效期（秒），到期后重新获取可选证书链，以便发现 CA 的证书链变化。
+        """
+        if policy not in CHAIN_POLICIES:
+            raise ValueError(f"未知的证书链选择策略：{policy}，可选值为 {', '.join(CHAIN_POLICIES)}。")
+        self.cache_path = cache_path
+        self.policy = policy
+        self.preferred_root = preferred_root
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._stats: List[Dict[str, Any]] = []
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                self._cache = json.load(f)
+        except FileNotFoundError:
+            self._cache = {}
+        except Exception as e:
+            logger.warning(f"[证书链选择]读取缓存失败，将重新创建，位置：{cache_path}，错误：{e}")
+            self._cache = {}
+
+    @property
+    def _settings(self) -> str:
+        return f"{self.policy}|{self.preferred_root or ''}"
+
+    def _matches_root(self, certs: List[x509.Certificate]) -> bool:
+        top = certs[-1]
+        return self.preferred_root in (_common_name(top.issuer), _common_name(top.subject))
+
+    def _choose(self, chains: List[List[x509.Certificate]]) -> List[x509.Certificate]:
+        if self.preferred_root:
+            for certs in chains:
+                if self._matches_root(certs):
+                    return certs
+            logger.info(f"[证书链选择]没有以 {self.preferred_root} 为根的证书链，按 {self.policy} 策略选择。")
+        if self.policy == CHAIN_POLICY_SHORTEST:
+            # 字节数相同时保留默认证书链（列表中的第一条）
+            return min(chains, key=chain_size)
+        return chains[0]
+
+    def _from_cache(self, key: str, leaf: x509.Certificate) -> Optional[List[x509.Certificate]]:
+        with self._lock:
+            entry = self._cache.get(key)
+        if not entry or entry.get("settings") != self._settings or entry.get("expires_at", 0) < time.time():
+            return None
+        try:
+            intermediates = [x509.load_pem_x509_certificate(pem.encode("ascii")) for pem in entry["intermediates"]]
+            if intermediates:
+                # 缓存的中间证书必须能验证新的终端证书，并且仍在有效期内
+                leaf.verify_directly_issued_by(intermediates[0])
+                if min(cert.not_valid_after_utc.timestamp() for cert in intermediates) < time.time():
+                    return None
+            return intermediates
+        except Exception as e:
+            logger.warning(f"[证书链选择]缓存的中间证书不可用，重新获取可选证书链：{e}")
+            return None
+
+    def _save_cache(self, key: str, intermediates: List[x509.Certificate]) -> None:
+        with self._lock:
+            self._cache[key] = {
+                "settings": self._settings,
+                "intermediates": [cert.public_bytes(serialization.Encoding.PEM).decode("ascii") for cert in intermediates],
+                "expires_at": time.time() + self.ttl,
+            }
+            content = json.dumps(self._cache, ensure_ascii=False, indent=1).encode("utf-8")
+        try:
+            write_file_atomic(self.cache_path, content)
+        except Exception as e:
+            logger.warning(f"[证书链选择]保存缓存失败，位置：{self.cache_path}，错误：{e}")
+
+    def select(self, default_chain_pem: str, fetch_alternatives: Callable[[], List[str]]) -> str:
+        """
+        选择证书链。
+        :param default_chain_pem: CA 返回的默认证书链。
+        :param fetch_alternatives: 获取可选证书链（PEM 字符串列表）的函数，只在缓存未命中时调用。
+        :return: 选中的证书链（PEM）。选择失败时返回默认证书链。
+        """
+        default = x509.load_pem_x509_certificates(default_chain_pem.encode("ascii"))
+        leaf = default[0]
+        key = issuer_key(leaf)
+        stats = {"issuer": leaf.issuer.rfc4514_string(), "cached": False, "alternatives": 0,
+                 "default_bytes": chain_size(default)}
+
+        intermediates = self._from_cache(key, leaf)
+        if intermediates is not None:
+            stats["cached"] = True
+            selected = [leaf] + intermediates
+        else:
+            try:
+                chains = [default]
+                for pem in fetch_alternatives():
+                    certs = x509.load_pem_x509_certificates(pem.encode("ascii"))
+                    if certs and certs[0] == leaf:
+                        chains.append(certs)
+                stats["alternatives"] = len(chains) - 1
+                selected = self._choose(chains)
+                self._save_cache(key, selected[1:])
+            except Exception as e:
+                logger.warning(f"[证书链选择]获取可选证书链失败，使用默认证书链：{e}")
+                selected = default
+
+        stats["selected_bytes"] = chain_size(selected)
+        stats["saved_bytes"] = stats["default_bytes"] - stats["selected_bytes"]
+        stats["root"] = _common_name(selected[-1].issuer)
+        with self._lock:
+            self._stats.append(stats)
+        if stats["saved_bytes"]:
+            logger.info(f"[证书链选择]选择以 {stats['root']} 为根的证书链，每次握手减少 {stats['saved_bytes']} 字节"
+                        f"（{stats['default_bytes']} -> {stats['selected_bytes']}）。")
+        if selected == default:
+            return default_chain_pem
+        return "".join(cert.public_bytes(serialization.Encoding.PEM).decode("ascii") for cert in selected)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        返回本次运行的选择结果，写入运行报告。
+        """
+        with self._lock:
+            stats = list(self._stats)
+        return {
+            "policy": self.policy,
+            "preferred_root": self.preferred_root,
+            "certificates": stats,
+            "cache_hits": sum(1 for s in stats if s["cached"]),
+            "saved_bytes": sum(s["saved_bytes"] for s in stats),
+        }
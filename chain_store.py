@@ -0,0 +1,150 @@
+import os
+import json
+import time
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from loguru import logger
+
+from file_utils import write_file_atomic
+from locks import FileLockBackend, LockManager
+
+MANIFEST_VERSION = 1
+MANIFEST_LOCK_KEY = "manifest"
+
+
+def split_chain(chain_pem: bytes) -> Tuple[x509.Certificate, List[x509.Certificate]]:
+    """
+    将 PEM 证书链拆分为终端证书和中间证书列表。
+    :raises ValueError: 内容中不包含任何证书。
+    """
+    certs = x509.load_pem_x509_certificates(chain_pem)
+    if not certs:
+        raise ValueError("未找到任何证书。")
+    return certs[0], certs[1:]
+
+
+def _fingerprint(cert: x509.Certificate) -> str:
+    return cert.fingerprint(hashes.SHA256()).hex()
+
+
+class ChainStore:
+    """
+    中间证书的内容寻址存储。
+    每个中间证书按 SHA-256 指纹只保存一份（<store_dir>/objects/<指纹>.pem），各证书的证书链文件由终端证书和存储中的
+    中间证书拼接而成；manifest.json 记录每个证书链文件由哪张终端证书和哪些中间证书组成，
+    同步和部署时只需要传输终端证书和目标端尚不存在的中间证书。存储中的对象一经写入不再修改，可以安全地并发读取；
+    清单的更新在存储目录下的文件锁（manifest.lock）中进行，共享同一存储目录的多个进程不会丢失彼此的条目。
+    """
+    def __init__(self, store_dir: str):
+        """
+        初始化 ChainStore。
+        :param store_dir: 存储目录。
+        """
+        self.store_dir = store_dir
+        self.objects_dir = os.path.join(store_dir, "objects")
+        self.manifest_path = os.path.join(store_dir, "manifest.json")
+        self._lock = threading.Lock()
+        self._manifest_lock = LockManager(FileLockBackend(store_dir))
+
+    def object_path(self, fingerprint: str) -> str:
+        return os.path.join(self.objects_dir, f"{fingerprint}.pem")
+
+    def put(self, cert: x509.Certificate) -> Tuple[str, bool]:
+        """
+        保存一张中间证书。
+        :return: (指纹, 是否为新写入的对象)。
+        """
+        fingerprint = _fingerprint(cert)
+        path = self.object_path(fingerprint)
+        if os.path.exists(path):
+            return fingerprint, False
+        write_file_atomic(path, cert.public_bytes(serialization.Encoding.PEM), mode=0o644)
+        logger.info(f"[证书链存储]新增中间证书：{cert.subject.rfc4514_string()}，指纹：{fingerprint}")
+        return fingerprint, True
+
+    def get(self, fingerprint: str) -> bytes:
+        with open(self.object_path(fingerprint), "rb") as f:
+            return f.read()
+
+    def assemble(self, leaf_pem: bytes, fingerprints: List[str]) -> bytes:
+        """
+        使用终端证书和存储中的中间证书拼接出完整的证书链。
+        """
+        return leaf_pem + b"".join(self.get(fingerprint) for fingerprint in fingerprints)
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                return data
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"[证书链存储]读取清单失败，将重新创建，位置：{self.manifest_path}，错误：{e}")
+        return {"version": MANIFEST_VERSION, "certificates": {}, "intermediates": {}}
+
+    def manifest(self) -> Dict[str, Any]:
+        """
+        返回当前清单：{"certificates": {证书链路径: {...}}, "intermediates": {指纹: {...}}}。
+        """
+        with self._lock:
+            return self._load_manifest()
+
+    def store_chain(self, chain_pem: bytes, certificate_chain_path: str, certificate_path: str = None) -> bytes:
+        """
+        将证书链中的中间证书存入存储，并在清单中记录该证书链文件的组成。
+        :param chain_pem: ACME 服务器返回的完整证书链。
+        :param certificate_chain_path: 证书链文件路径（清单中的键）。
+        :param certificate_path: (可选) 终端证书文件路径。
+        :return: 拼接后的完整证书链，应写入 certificate_chain_path。
+        """
+        leaf, intermediates = split_chain(chain_pem)
+        leaf_pem = leaf.public_bytes(serialization.Encoding.PEM)
+        fingerprints = []
+        added = []
+        for cert in intermediates:
+            fingerprint, is_new = self.put(cert)
+            fingerprints.append(fingerprint)
+            if is_new:
+                added.append(fingerprint)
+
+        with self._lock, self._manifest_lock.lock(MANIFEST_LOCK_KEY):
+            # 每次更新前重新读取清单，合并其他进程写入的条目
+            data = self._load_manifest()
+            data["certificates"][os.path.abspath(certificate_chain_path)] = {
+                "certificate_path": os.path.abspath(certificate_path) if certificate_path else None,
+                "leaf_sha256": _fingerprint(leaf),
+                "intermediates": fingerprints,
+                "updated_at": time.time(),
+            }
+            for cert, fingerprint in zip(intermediates, fingerprints):
+                data["intermediates"].setdefault(fingerprint, {
+                    "subject": cert.subject.rfc4514_string(),
+                    "not_after": cert.not_valid_after_utc.timestamp(),
+                })
+            write_file_atomic(self.manifest_path, json.dumps(data, ensure_ascii=False, indent=1, sort_keys=True).encode("utf-8"))
+
+        if added:
+            logger.info(f"[证书链存储]{certificate_chain_path} 引入了 {len(added)} 个新的中间证书。")
+        return self.assemble(leaf_pem, fingerprints)
+
+    def sync(self, dest_dir: str, fingerprints: Optional[List[str]] = None) -> List[str]:
+        """
+        将中间证书同步到另一个存储目录（例如部署目标），只复制目标端尚不存在的对象（对象按内容命名，存在即相同）。
+        :param dest_dir: 目标存储目录。
+        :param fingerprints: (可选) 只同步这些中间证书，默认同步清单中的所有中间证书。
+        :return: 实际复制的指纹列表。
+        """
+        if fingerprints is None:
+            fingerprints = list(self.manifest()["intermediates"])
+        dest = ChainStore(dest_dir)
+        copied = []
+        for fingerprint in fingerprints:
+            if os.path.exists(dest.object_path(fingerprint)):
+                continue
+            write_file_atomic(dest.object_path(fingerprint), self.get(fingerprint), mode=0o644)
+            copied.append(fingerprint)
+        return copied
@@ -0,0 +1,98 @@
+import time
+import threading
+from typing import Dict, Optional, Tuple
+import requests
+from loguru import logger
+
+# DNS 记录类型编号（RFC 1035）
+DNS_TYPE_CNAME = 5
+CHALLENGE_PREFIX = "_acme-challenge"
+
+
+class ChallengeDelegation:
+    """
+    ACME 挑战记录的 CNAME 委派解析器。
+    当 `_acme-challenge.<域名>` 通过 CNAME 指向专用的验证区域时，挑战 TXT 记录只需写入该验证区域，
+    从而不再需要操作各个生产区域，也不需要这些区域的凭证。
+    CNAME 通过 DNS over HTTPS (JSON 接口) 查询，并按记录的 TTL 缓存。
+    """
+    def __init__(self, challenge_zone: str, resolver_url: str = "https://dns.alidns.com/resolve",
+                 timeout: float = 5, min_cache_ttl: int = 300):
+        """
+        初始化 ChallengeDelegation。
+        :param challenge_zone: 专用验证区域，例如 "acme-validation.example.net"。
+        :param resolver_url: 支持 JSON 格式的 DNS over HTTPS 查询地址。
+        :param timeout: 单次查询的超时时间（秒）。
+        :param min_cache_ttl: 最短缓存时间（秒），避免 TTL 很小的记录被频繁查询。
+        """
+        if not challenge_zone:
+            raise ValueError("验证区域不能为空。")
+        self.challenge_zone = challenge_zone.strip(".").lower()
+        self.resolver_url = resolver_url
+        self.timeout = timeout
+        self.min_cache_ttl = min_cache_ttl
+        self._cache: Dict[str, Tuple[Optional[str], float]] = {}
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+
+    def resolve_cname(self, fqdn: str) -> Optional[str]:
+        """
+        查询指定名称的 CNAME 目标（带缓存）。
+        :param fqdn: 需要查询的完整域名。
+        :return: CNAME 目标（不含末尾的点，小写）；不存在 CNAME 时返回 None。
+        :raises requests.RequestException: 查询失败时抛出。
+        """
+        fqdn = fqdn.strip(".").lower()
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(fqdn)
+            if cached and cached[1] > now:
+                return cached[0]
+
+        response = self._session.get(
+            self.resolver_url,
+            params={"name": fqdn, "type": DNS_TYPE_CNAME},
+            headers={"Accept": "application/dns-json"},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        target = None
+        ttl = self.min_cache_ttl
+        for answer in data.get("Answer") or []:
+            if answer.get("type") == DNS_TYPE_CNAME and answer.get("name", "").strip(".").lower() == fqdn:
+                target = answer["data"].strip(".").lower()
+                ttl = max(int(answer.get("TTL", 0)), self.min_cache_ttl)
+                break
+
+        with self._lock:
+            self._cache[fqdn] = (target, now + ttl)
+        return target
+
+    def resolve(self, domain: str) -> Optional[Tuple[str, str]]:
+        """
+        解析指定域名的挑战记录是否已委派到验证区域。
+        :param domain: 需要验证的域名，例如 "www.example.com" 或 "*.example.com"。
+        :return: (RR, 验证区域) 元组；未委派或委派到其他区域时返回 None。
+        """
+        name = domain[2:] if domain.startswith("*.") else domain
+        fqdn = f"{CHALLENGE_PREFIX}.{name}"
+        try:
+            target = self.resolve_cname(fqdn)
+        except Exception as e:
+            logger.warning(f"[挑战委派]查询 {fqdn} 的 CNAME 失败，错误：{e}")
+            return None
+
+        if not target:
+            logger.info(f"[挑战委派]{fqdn} 未配置 CNAME 委派。")
+            return None
+
+        suffix = f".{self.challenge_zone}"
+        if not target.endswith(suffix):
+            logger.warning(f"[挑战委派]{fqdn} 的 CNAME 目标 {target} 不在验证区域 {self.challenge_zone} 中。")
+            return None
+
+        rr = target[:-len(suffix)]
+        logger.info(f"[挑战委派]{fqdn} 已委派到 {target}，RR='{rr}'，区域='{self.challenge_zone}'。")
+        return rr, self.challenge_zone
@@ -21,6 +21,12 @@ ACME_DIRECTORY_URL = "https://acme-staging-v02.api.letsencrypt.org/directory" #
 # 解释：您注册 ACME 账户时使用的邮箱地址。Let's Encrypt 可能会通过此邮箱发送关于证书过期、重要服务通知等邮件。
 ACME_CONTACT_EMAIL = "xiaoshae@gmail.com"
 
+# ACME 目录缓存有效期，单位为秒 (默认: 86400，设置为 0 时不缓存)
+# 解释：ACME 目录内容很少变化，缓存后每次运行可以少一次目录请求。缓存文件默认保存在 KEY_PATH 下的 .acme_directory.json。
+# ACME_DIRECTORY_CACHE_TTL = 86400
+# ACME 请求的 HTTP 连接池大小 (默认: 10)。所有请求复用同一个长连接会话，并发请求较多时可以适当调大。
+# ACME_HTTP_POOL_SIZE = 10
+
 
 # --- 2. 证书配置 ---
 # 需要申请证书的域名列表。第一个域名将作为证书的主域名。
@@ -36,6 +42,22 @@ DOMAINS = [
 ]
 
 
+# 域名清单 (可选，用于 `python main.py plan`)
+# 解释：需要管理的所有域名。规划器会按区域和部署目标将它们打包成尽可能少的证书（每张最多 SAN_PLAN_MAX_SANS 个 SAN），
+# 计划保存在 SAN_PLAN_PATH 中；之后新增或删除域名时只有受影响的证书需要重新签发。
+# 每一项可以是域名字符串，也可以是 {"name": 域名, "target": 部署目标} 字典。
+# HOSTNAME_INVENTORY = [
+#     "www.example.com",
+#     {"name": "api.example.com", "target": "nginx-edge"},
+# ]
+# 每张证书最多包含的 SAN 数量 (默认: 100，Let's Encrypt 的上限)
+# SAN_PLAN_MAX_SANS = 100
+# 同一父域名下的兄弟域名达到该数量时合并为通配符域名 (默认: None，不合并)
+# SAN_PLAN_WILDCARD_THRESHOLD = 3
+# 计划文件路径 (默认: CERT_PATH 目录下的 ".san_plan.json")
+# SAN_PLAN_PATH = "./certs/.san_plan.json"
+
+
 # --- 3. DNS 服务商配置 (以阿里云为例) ---
 # 用于验证域名所有权的 DNS 服务商 API 凭证。
 # 解释：这些是用于通过 DNS 记录验证您对域名的所有权的凭据。
@@ -47,6 +69,32 @@ ALIYUN_ACCESS_KEY_ID = os.environ.get('ALIYUN_ACCESS_KEY_ID')
 ALIYUN_ACCESS_KEY_SECRET = os.environ.get('ALIYUN_ACCESS_KEY_SECRET')
 ALIYUN_DNS_ENDPOINT = "alidns.cn-beijing.aliyuncs.com"  # 阿里云 API 端点，例如: 'alidns.cn-beijing.aliyuncs.com'
 
+# 挑战记录委派的验证区域 (可选，默认: 不使用委派)
+# 解释：如果将 `_acme-challenge.<域名>` 通过 CNAME 指向专用验证区域中的记录，例如：
+#   _acme-challenge.www.example.com.  CNAME  www.example.com.acme-validation.example.net.
+# 则所有挑战 TXT 记录都只会写入该验证区域（按区域批量写入），不再修改各个生产区域，
+# 阿里云凭证也只需要拥有验证区域的权限。未配置 CNAME 的域名仍写入其自身所在的区域。
+# ACME_CHALLENGE_ZONE = "acme-validation.example.net"
+# 挑战 TXT 记录的 TTL，单位为秒 (默认: 600)。阿里云免费版最小 TTL 为 600，付费版可设置更小的值。
+# ACME_CHALLENGE_TTL = 600
+# 用于查询 CNAME 委派的 DNS over HTTPS (JSON) 地址 (默认: 阿里云公共 DNS)
+# DNS_RESOLVER_URL = "https://dns.alidns.com/resolve"
+
+# HTTP-01 挑战 (可选，默认: 全部使用 DNS-01)
+# 解释：HTTP-01 不需要修改 DNS 记录，也不需要等待 DNS 传播，通常几秒内即可完成验证，但不能用于通配符域名，
+# 并且 ACME 服务器必须能通过 80 端口访问到该域名。通配符域名始终使用 DNS-01，两类挑战会并行验证。
+# 挑战类型策略 (默认: "dns-01")，"auto" 表示非通配符域名使用 HTTP-01
+# CHALLENGE_POLICY = "auto"
+# 按域名指定挑战类型，优先于 CHALLENGE_POLICY (默认: {})
+# CHALLENGE_TYPE_OVERRIDES = {"internal.example.com": "dns-01"}
+# HTTP-01 应答方式 (默认: None，不使用 HTTP-01)
+# "standalone": 使用内置的 HTTP 应答器监听 HTTP01_HOST:HTTP01_PORT（需要 80 端口空闲或已转发到该端口）
+# "webroot":    将挑战文件写入现有 Web 服务器的站点根目录 HTTP01_WEBROOT 下的 .well-known/acme-challenge/
+# HTTP01_MODE = "standalone"
+# HTTP01_HOST = "0.0.0.0"
+# HTTP01_PORT = 80
+# HTTP01_WEBROOT = "/var/www/html"
+
 
 # --- 4. 邮件通知配置 ---
 # 是否在证书申请成功后发送邮件通知。
@@ -84,12 +132,20 @@ SMTP_PORT = 587
 # 默认: "./certs"
 # 解释：用于存储生成的证书文件（包括主证书和证书链）的本地目录路径。
 # CERT_PATH = "./certs"
+# 证书清单索引文件路径 (默认: KEY_PATH 目录下的 ".inventory.json")
+# 解释：缓存 CERT_PATH 和 KEY_PATH 下所有证书和私钥的解析结果（SANs、过期时间、颁发者、密钥类型、指纹）。
+# 之后的扫描只重新解析发生变化的文件，使 `python main.py status --days 30` 等查询可以在毫秒级完成。
+# INVENTORY_INDEX_PATH = "./keys/.inventory.json"
 
 # B. 生成的密钥和证书文件名
 # 如果不配置，将根据第一个域名自动生成。例如，域名为 example.com，则生成 example.com.key, example.com.crt 等。
 # ACME 账户私钥文件名 (默认: "account.key")
 # 解释：存储 ACME 账户私钥的文件名。这个私钥用于标识您的 ACME 账户，请妥善保管。
 # ACCOUNT_KEY_NAME = "account.key"
+# ACME 账户密钥类型 (默认: "rsa"，RSA 3072 / RS256)："ec" 使用 P-256 / ES256，每个 ACME 请求的签名开销小得多，
+# 适合并发轮询大量授权的场景。启用 ACME_ACCOUNT_CACHE 时，缓存的 RSA 账户会在下次运行时通过密钥轮换 (keyChange)
+# 自动迁移到 EC 密钥，账户和已有的授权保持不变（轮换失败时继续使用原密钥）；也可以运行 python main.py rollover-account 手动轮换。
+# ACME_ACCOUNT_KEY_TYPE = "ec"
 # 证书私钥文件名 (默认: 根据域名生成)
 # 解释：存储新生成证书的私钥文件名。这个私钥非常重要，必须与证书文件配对使用。
 # CERT_KEY_NAME = "private.key"
@@ -108,4 +164,212 @@ SMTP_PORT = 587
 # 解释：一个可选密码，用于加密生成的证书私钥。如果设置为 `None` 或空字符串，则私钥将不加密。
 # 如果您需要额外的安全层，可以设置密码。请注意，加密后的私钥在每次使用时都需要提供密码。
 # COMMON_PASSWORD = None
+# 证书私钥复用策略 (默认: "new")
+# 解释：决定续期时是否复用 KEY_PATH 中已有的证书私钥（使用 COMMON_PASSWORD 解密）。
+# - "new"：每次都生成新的证书私钥。
+# - "max_age"：复用现有私钥，直到其使用时间超过 CERT_KEY_MAX_AGE_DAYS 天后再轮换。
+# - "forever"：始终复用现有私钥。适用于固定公钥的场景（如 TLSA/DANE 记录），避免每次续期都需要更新记录。
+# 如果现有私钥的类型或位数（曲线）与 CERT_KEY_TYPE、CERT_KEY_SIZE（CERT_EC_CURVE）不一致，则会生成新私钥。
+# CERT_KEY_REUSE_POLICY = "max_age"
+# 证书私钥的轮换周期，单位为天 (默认: 90)，仅在 CERT_KEY_REUSE_POLICY = "max_age" 时生效。
+# CERT_KEY_MAX_AGE_DAYS = 90
+# 证书私钥类型 (默认: "rsa")，可选 "rsa" 或 "ec" (ECDSA)
+# CERT_KEY_TYPE = "rsa"
+# ECDSA 曲线 (默认: "secp256r1")，可选 "secp256r1" 或 "secp384r1"，仅在使用 ECDSA 私钥时生效。
+# CERT_EC_CURVE = "secp256r1"
+# 双算法签发 (默认: False)
+# 解释：启用后，每次运行为同一组域名同时申请 ECDSA 和 RSA 两张证书，服务器可以向支持 ECDSA 的客户端提供更小、更快的证书，
+# 同时向旧客户端提供 RSA 证书。挑战只执行一次，第二个订单复用已通过验证的授权，两个订单并行最终确定。
+# 第二张证书使用与 CERT_KEY_TYPE 相反的类型，文件名在扩展名之前加上 "-ecdsa" 或 "-rsa" 后缀，
+# 例如 example.com.crt 和 example.com-ecdsa.crt。
+# CERT_DUAL_ALGORITHM = True
+
+
+# D. 部署钩子
+# 证书保存后复制到的本地目标目录及重载命令 (默认: 不部署)
+# 解释：每个目标是一个字典：
+# - `name`：目标名称，仅用于日志。
+# - `directory`：证书私钥、证书和证书链文件会被复制到此目录（文件名保持不变）。
+# - `reload_command`：(可选) 目标目录中有文件发生变化后执行的命令，例如 "systemctl reload nginx"。
+# - `domains`：(可选) 该目标服务的域名列表，不填则表示服务所有证书。
+# - `timeout`：(可选) 复制文件和执行重载命令的总超时时间（秒）。
+# 各目标并发执行；同一批次中同一目标只会重载一次，文件内容未变化时不会重载。
+# DEPLOY_TARGETS = [
+#     {"name": "nginx", "directory": "/etc/nginx/certs", "reload_command": "systemctl reload nginx", "timeout": 30},
+# ]
+# 部署钩子的最大并发目标数 (默认: 8)
+# DEPLOY_MAX_WORKERS = 8
+
+# E. 并发运行
+# 多个运行（例如多个分片，或 cron 运行期间的手动运行）同时操作同一区域时，挑战记录的写入和清理按“区域 + 主机记录”加锁，
+# 并且只清理本次运行发布的记录值。每次运行的日志写入 LOG_DIR 下独立的 main_run-<运行 ID>.log 文件。
+# 运行报告目录 (默认: "./reports")，每次运行生成一个 run-<运行 ID>.json，包含 ACME 请求往返次数等统计信息
+# REPORT_DIR = "./reports"
+# 日志目录 (默认: "./logs")
+# LOG_DIR = "./logs"
+# 文件锁目录 (默认: "./locks")，运行 journal 保存在其中的 runs 子目录
+# LOCK_DIR = "./locks"
+# 获取锁的超时时间，单位为秒 (默认: 120)
+# LOCK_TIMEOUT = 120
+# 自定义锁后端 (默认: None，使用 LOCK_DIR 中的文件锁，只能协调同一台主机上的进程)
+# 解释：多主机部署时，可以传入实现了 locks.LockBackend 接口（acquire/release）的对象，例如基于 Redis 的实现。
+# LOCK_BACKEND = None
+
+# F. 日志
+# 所有日志处理器都通过后台线程异步写入，不会阻塞证书申请流程。
+# 日志级别 (默认: "INFO")
+# LOG_LEVEL = "INFO"
+# 是否将每次轮询挑战状态的日志降为 DEBUG 级别 (默认: False)。证书数量较多时建议开启，日志量不再随轮询次数增长。
+# LOG_QUIET_POLLING = True
+# 结构化 JSON 日志文件路径 (默认: None，不输出)。每行一条 JSON 记录，包含 cert（当前证书）和 run_id 等上下文字段。
+# LOG_JSON_PATH = "./logs/acme.jsonl"
+# JSON 日志的轮转大小、保留文件数和压缩格式 (默认: "20 MB"、10、"gz")
+# LOG_ROTATION = "20 MB"
+# LOG_RETENTION = 10
+# LOG_COMPRESSION = "gz"
+
+# G. 配额预测
+# 每次运行前估算本次将消耗的订单数、新授权数和阿里云 DNS API 调用次数，并结合配额台账中各时间窗口内已消耗的数量，
+# 判断是否会超出配额。每次运行的实际 API 调用次数（按服务和操作统计）写入运行报告的 api_calls 字段。
+# 准入时在台账中为本次运行预留预计消耗，运行结束后替换为实际消耗，因此同时启动的多个分片不会重复使用同一部分配额。
+# 配额配置 (默认: 只限制订单数，每 3 小时 300 个，即 Let's Encrypt 每个账户的新订单限制)
+# 解释：键为 orders、new_authorizations 或 dns_api_calls，limit 为上限，window 为时间窗口（秒）。
+# QUOTAS = {
+#     "orders": {"limit": 300, "window": 10800},
+#     "new_authorizations": {"limit": 1000, "window": 3600},
+#     "dns_api_calls": {"limit": 5000, "window": 3600},
+# }
+# 超出配额时的处理方式 (默认: "refuse")
+# "refuse": 记录错误并视为运行失败（会发送失败通知邮件）
+# "defer":  记录警告并跳过本次申请，留给下一次运行
+# QUOTA_ACTION = "refuse"
+# 配额台账文件路径 (默认: KEY_PATH 目录下的 ".quota_ledger.json")
+# QUOTA_LEDGER_PATH = "./keys/.quota_ledger.json"
+
+# H. 录制/回放 (用于离线回归测试)
+# 录制模式下照常申请证书，同时将 ACME、阿里云 DNS 和 DoH 的响应（不含请求签名和 Cookie 等敏感头）保存到 cassette 文件；
+# 回放模式下不访问网络，按顺序返回录制的响应，可用于在没有网络的机器上比较请求次数（运行报告中的 acme_network、api_calls）和耗时。
+# 注意：回放时会照常写入密钥和证书文件，请将 KEY_PATH、CERT_PATH 指向临时目录；回放的请求不计入配额台账。
+# 模式 (默认: None，不录制也不回放)，可选 "record" 或 "replay"
+# CASSETTE_MODE = "record"
+# cassette 文件路径 (默认: "./cassettes/acme.json")
+# CASSETTE_PATH = "./cassettes/acme.json"
+# 回放时的延迟系数 (默认: 0.0)。1.0 表示按录制的耗时等待，0.0 表示不等待；同样作用于挑战状态轮询的等待间隔。
+# CASSETTE_SPEED = 0.0
+
+# I. 批量吊销 (python main.py revoke)
+# 吊销请求使用证书自身的私钥签名，因此证书私钥必须保存在 KEY_PATH 中。每张证书吊销成功后会立即排队，使用新的私钥重新签发并覆盖原文件。
+# 示例：python main.py revoke --all --reason keyCompromise
+# 吊销的最大并发数 (默认: 8)
+# REVOKE_MAX_WORKERS = 8
+# 每秒最多发送的吊销请求数 (默认: 5)，遇到 rateLimited 错误时还会按指数退避重试
+# REVOKE_RATE = 5
+# 重新签发的最大并发数 (默认: 4)
+# REPLACE_MAX_WORKERS = 4
+
+# J. 多 CA
+# 配置多个 CA 后，按 CA_SELECTION_POLICY 选择 CA（不再使用 ACME_DIRECTORY_URL）。每个 CA 的账户会缓存在 ACCOUNT_CACHE_DIR 中，
+# 每次签发的成功/失败和耗时记录在 CA_HEALTH_PATH 中，最近失败的 CA 在 CA_FAILURE_COOLDOWN 秒内会被排到后面。
+# 需要 External Account Binding 的 CA（例如 ZeroSSL、Google Trust Services）请填写 eab_kid 和 eab_hmac_key。
+# ACME_CAS = [
+#     {"name": "letsencrypt", "directory_url": "https://acme-v02.api.letsencrypt.org/directory"},
+#     {"name": "zerossl", "directory_url": "https://acme.zerossl.com/v2/DV90",
+#      "eab_kid": os.environ.get('ZEROSSL_EAB_KID'), "eab_hmac_key": os.environ.get('ZEROSSL_EAB_HMAC_KEY')},
+# ]
+# CA 选择策略 (默认: "failover")
+# "failover": 按顺序尝试，当前 CA 失败或超过 CA_FAILOVER_DEADLINE 秒仍未完成时取消并切换到下一个 CA
+# "hedge":    当前 CA 在 CA_HEDGE_DELAY 秒内未完成时，同时向下一个 CA 申请，先完成者胜出，其他 CA 的申请会被取消
+# CA_SELECTION_POLICY = "failover"
+# CA_FAILOVER_DEADLINE = 600
+# CA_HEDGE_DELAY = 120
+# CA_FAILURE_COOLDOWN = 3600
+# 账户缓存目录 (默认: KEY_PATH 目录下的 "accounts")，CA 健康状态文件 (默认: KEY_PATH 目录下的 ".ca_health.json")
+# ACCOUNT_CACHE_DIR = "./keys/accounts"
+# CA_HEALTH_PATH = "./keys/.ca_health.json"
+
+# K. 分片运行 (python main.py --shard i/N)
+# 将 SAN 打包计划中的证书按主域名所在区域的稳定哈希分配到 N 个分片，每个并行任务（或主机）只签发自己分片的证书，
+# 证书文件以计划中的证书 ID 命名（例如 example.com_default_001.crt）。证书数量超过平均值的大区域会按主域名分散到多个分片。
+# 每个分片的运行报告单独保存为 run-<运行 ID>-shard-<i>of<N>.json，可以使用 python main.py merge-reports 合并。
+# 分片内签发证书的最大并发数 (默认: 4)
+# SHARD_MAX_WORKERS = 4
+
+# L. 部署后 TLS 端点校验
+# 证书保存并部署后，并发连接以下端点，对证书中的每个域名分别以其作为 SNI 完成 TLS 握手，
+# 比较服务器返回的证书指纹与新证书是否一致，并在运行报告 (tls_verification) 中记录不一致的端点和握手耗时。
+# 通配符域名没有确定的 SNI，会被跳过。每项可以是 "host:port" 字符串（默认端口 443），
+# 也可以是 {"address": "host:port", "domains": [...]} 字典，domains 表示该端点只服务这些域名。
+# VERIFY_ENDPOINTS = [
+#     "203.0.113.10:443",
+#     {"address": "[2001:db8::10]:8443", "domains": ["api.example.com"]},
+# ]
+# 同时进行的握手数量上限 (默认: 200)，单次握手超时时间，单位为秒 (默认: 5)
+# VERIFY_CONCURRENCY = 200
+# VERIFY_TIMEOUT = 5
+# 证书不一致或连接失败时的最大尝试次数 (默认: 3) 和重试间隔，单位为秒 (默认: 2)，用于等待服务器完成重载
+# VERIFY_ATTEMPTS = 3
+# VERIFY_RETRY_DELAY = 2
+
+# M. 账户复用和授权预热 (python main.py prewarm)
+# 复用缓存的 ACME 账户 (默认: False，每次运行使用新账户)。账户私钥和注册信息保存在 ACCOUNT_CACHE_DIR 中。
+# ACME_ACCOUNT_CACHE = True
+# 预热：在续期窗口之前（建议在业务低峰时段通过 cron 运行）完成即将到期证书中所有域名的 DNS 验证，
+# 续期时授权已经有效，只需要创建订单并最终确定，通常几秒内即可完成。授权属于 ACME 账户，因此需要启用 ACME_ACCOUNT_CACHE。
+# CA 支持 newAuthz 时使用预授权，否则创建一个只完成验证、不最终确定的订单（计入订单配额）。
+# Let's Encrypt 的授权有效期为 30 天，因此预热时间应早于续期时间不超过 30 天。
+# 示例 (每天凌晨 3 点)：0 3 * * * python main.py prewarm
+# 预热多少天内到期的证书 (默认: 35)，预热的最大并发证书数 (默认: 4)
+# PREWARM_DAYS = 35
+# PREWARM_MAX_WORKERS = 4
+
+# N. 中间证书存储
+# 启用后中间证书按 SHA-256 指纹只保存一份（CHAIN_STORE_DIR/objects/<指纹>.pem），每张证书的证书链文件由终端证书和存储中的
+# 中间证书拼接而成，内容与 CA 返回的证书链相同；CHAIN_STORE_DIR/manifest.json 记录每个证书链文件的组成。
+# 部署目标设置 "chain_store": True 时，中间证书只同步到目标目录下 .chains 中尚不存在的部分，证书链文件在目标端拼接，
+# 续期时只需要传输终端证书。
+# CHAIN_STORE = True
+# 存储目录 (默认: CERT_PATH 目录下的 ".chains"，以 . 开头的目录不会被证书清单扫描)
+# CHAIN_STORE_DIR = "./certs/.chains"
+
+# O. 性能分析 (python main.py --profile)
+# 性能分析结果目录 (默认: REPORT_DIR 目录下的 "profiles")，每次运行的结果保存在以运行 ID 命名的子目录中
+# PROFILE_DIR = "./reports/profiles"
+
+# P. 残留挑战记录清理 (python main.py sweep)
+# 失败或被强制终止的运行可能在区域中留下 _acme-challenge TXT 记录。清理时遍历账号下的所有区域
+# （以及 ACME_CHALLENGE_ZONE 中的所有 TXT 记录）：属于仍在进行的运行的记录不会删除；属于已结束运行的 journal 的记录直接删除；
+# 其他来源不明的记录在最后修改时间超过 STALE_RECORD_MAX_AGE 秒后删除。
+# 在每次证书申请的启动阶段自动清理一次 (默认: False；分片运行时不会自动清理，请单独运行 sweep 命令)
+# STALE_SWEEP_ON_START = True
+# 来源不明的记录视为残留的时间，单位为秒 (默认: 3600)
+# STALE_RECORD_MAX_AGE = 3600
+# 每秒最多发送的删除请求数 (默认: 5)，查询和删除的最大并发数 (默认: 4)
+# STALE_SWEEP_RATE = 5
+# STALE_SWEEP_MAX_WORKERS = 4
+
+# Q. 证书链选择
+# CA 除默认证书链外，还可能通过 Link: rel="alternate" 提供其他证书链（例如不含交叉签名中间证书的短链，每次 TLS 握手可减少约 1 KB）。
+# 选择策略 (默认: "default"，使用 CA 的默认证书链)："shortest" 选择握手字节数最少的证书链
+# CHAIN_SELECTION = "shortest"
+# 首选的根证书名称 (默认: None)，存在以该根证书结尾的证书链时优先选择，否则按 CHAIN_SELECTION 选择
+# 注意：较短的证书链可能不被旧设备信任，请确认客户端的根证书库后再启用。
+# CHAIN_PREFERRED_ROOT = "ISRG Root X1"
+# 选择结果按签发者缓存 7 天，期间同一签发者签发的证书不再请求可选证书链；运行报告的 chain_selection 部分记录每次握手减少的字节数。
+# 缓存文件 (默认: KEY_PATH 目录下的 ".chain_selection.json")
+# CHAIN_SELECTION_CACHE_PATH = "./keys/.chain_selection.json"
 
+# R. 多个阿里云账号 (按区域路由)
+# 区域分布在多个阿里云账号下时，按区域配置所属账号。每个 AccessKey 使用独立的长期客户端、限速器和解析记录索引，
+# 批量签发时各区域的挑战记录并行写入，互不占用其他账号的 API 配额。路由表以外的区域使用上方的默认账号
+# （ALIYUN_ACCESS_KEY_ID / ALIYUN_ACCESS_KEY_SECRET）；配置了 ALIYUN_DNS_ACCOUNTS 时默认账号可以留空。
+# 同一个区域只能配置在一个账号下。"zones" 为空时，首次使用时查询该账号下的所有区域；"endpoint" 默认为 ALIYUN_DNS_ENDPOINT。
+# ALIYUN_DNS_ACCOUNTS = {
+#     "team-a": {
+#         "access_key_id": os.environ.get('ALIYUN_TEAM_A_ACCESS_KEY_ID'),
+#         "access_key_secret": os.environ.get('ALIYUN_TEAM_A_ACCESS_KEY_SECRET'),
+#         "zones": ["example.com", "example.net"],
+#         "rate": 10,
+#     },
+# }
+# 每个账号每秒最多发送的 API 请求数 (默认: 0，不限速)，账号配置中的 "rate" 优先
+# ALIYUN_DNS_RATE = 10
@@ -0,0 +1,169 @@
+import os
+import time
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any
+from loguru import logger
+
+from file_utils import write_file_atomic
+from chain_store import ChainStore
+
+# 重载未成功完成时保留在目标目录中的标记文件，下次部署时即使文件未变化也会重新执行重载
+PENDING_RELOAD_MARKER = ".pending-reload"
+
+# 目标目录中保存中间证书的存储目录（以 . 开头，不会被证书清单扫描）
+CHAIN_STORE_DIR_NAME = ".chains"
+
+
+class DeployHookRunner:
+    """
+    部署钩子执行器。
+    将证书文件复制到多个本地目标目录，并为每个目标执行重载命令。
+    各目标之间通过有界线程池并发执行；同一批次中由同一个目标服务的多张证书只会触发一次重载。
+    """
+    def __init__(self, targets: List[Dict[str, Any]], max_workers: int = 8, default_timeout: int = 60,
+                 chain_store: ChainStore = None):
+        """
+        初始化 DeployHookRunner。
+        :param targets: 部署目标配置列表，每个目标是包含以下键的字典：
+                        name (str): 目标名称。
+                        directory (str): 证书文件复制到的目录。
+                        reload_command (str | list, 可选): 文件发生变化后执行的重载命令。
+                        domains (list, 可选): 该目标服务的域名，不填则表示服务所有证书。
+                        timeout (int, 可选): 该目标的超时时间（秒），默认为 default_timeout。
+                        chain_store (bool, 可选): 为 True 时中间证书只同步到目标目录下的 .chains 存储中尚不存在的部分，
+                                                  证书链文件在目标端由终端证书和存储中的中间证书拼接而成。
+        :param max_workers: 并发执行的最大目标数。
+        :param default_timeout: 默认的单个目标超时时间（秒）。
+        :param chain_store: (可选) 本地的证书链存储，目标启用 chain_store 时使用。
+        """
+        for target in targets:
+            if not target.get("name") or not target.get("directory"):
+                raise ValueError(f"部署目标配置不完整，name 和 directory 不能为空：{target}")
+        self.targets = targets
+        self.max_workers = max(1, max_workers)
+        self.default_timeout = default_timeout
+        self.chain_store = chain_store
+        self._chains: Dict[str, Dict[str, Any]] = {}
+
+    def _serves(self, target: Dict[str, Any], certificate: Dict[str, Any]) -> bool:
+        """
+        判断目标是否服务于指定证书（目标的域名列表与证书域名存在交集）。
+        """
+        target_domains = target.get("domains")
+        if not target_domains:
+            return True
+        return bool(set(target_domains) & set(certificate.get("domains", [])))
+
+    def _run_reload(self, target: Dict[str, Any], timeout: float) -> None:
+        """
+        执行目标的重载命令。字符串命令通过 shell 执行，列表命令直接执行。
+        :raises subprocess.TimeoutExpired: 命令超时。
+        :raises subprocess.CalledProcessError: 命令返回非零退出码。
+        """
+        command = target["reload_command"]
+        subprocess.run(
+            command,
+            shell=isinstance(command, str),
+            check=True,
+            timeout=timeout,
+            capture_output=True
+        )
+
+    def _read_chain(self, target: Dict[str, Any], entry: Dict[str, Any]) -> bytes:
+        """
+        将证书链用到的中间证书同步到目标目录下的 .chains 存储（只复制目标端尚不存在的对象），
+        再由终端证书和目标端存储中的中间证书拼接出证书链。
+        """
+        dest_store = os.path.join(target["directory"], CHAIN_STORE_DIR_NAME)
+        copied = self.chain_store.sync(dest_store, entry["intermediates"])
+        if copied:
+            logger.info(f"[部署钩子]目标 {target['name']} 新增 {len(copied)} 个中间证书。")
+        with open(entry["certificate_path"], "rb") as f:
+            leaf = f.read()
+        return ChainStore(dest_store).assemble(leaf, entry["intermediates"])
+
+    def _deploy_target(self, target: Dict[str, Any], certificates: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        部署单个目标：复制该目标服务的所有证书文件，如有文件变化则执行一次重载。
+        :return: 部署结果字典，包含 name、success、changed_files、reloaded、elapsed 和 error。
+        """
+        name = target["name"]
+        timeout = target.get("timeout", self.default_timeout)
+        deadline = time.monotonic() + timeout
+        result = {"name": name, "success": False, "changed_files": [], "reloaded": False, "elapsed": 0.0, "error": None}
+        start = time.monotonic()
+
+        try:
+            for certificate in certificates:
+                if not self._serves(target, certificate):
+                    continue
+                for source_path in certificate["files"]:
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f"复制文件超时（{timeout} 秒）。")
+                    entry = self._chains.get(os.path.abspath(source_path)) if target.get("chain_store") else None
+                    if entry and entry.get("certificate_path"):
+                        data = self._read_chain(target, entry)
+                    else:
+                        with open(source_path, "rb") as f:
+                            data = f.read()
+                    mode = os.stat(source_path).st_mode & 0o777
+                    dest_path = os.path.join(target["directory"], os.path.basename(source_path))
+                    if write_file_atomic(dest_path, data, mode=mode):
+                        result["changed_files"].append(dest_path)
+
+            marker_path = os.path.join(target["directory"], PENDING_RELOAD_MARKER)
+            if result["changed_files"] and target.get("reload_command"):
+                # 先写入标记，重载失败或进程被中断时下次部署会补做重载
+                with open(marker_path, "w", encoding="utf-8") as f:
+                    f.write("\n".join(result["changed_files"]))
+            if target.get("reload_command") and os.path.exists(marker_path):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"执行重载命令前已超时（{timeout} 秒）。")
+                self._run_reload(target, remaining)
+                os.remove(marker_path)
+                result["reloaded"] = True
+                logger.info(f"[部署钩子]目标 {name} 重载成功，共 {len(result['changed_files'])} 个文件发生变化。")
+            elif not result["changed_files"]:
+                logger.info(f"[部署钩子]目标 {name} 的文件均未变化，跳过重载。")
+
+            result["success"] = True
+        except subprocess.CalledProcessError as e:
+            stderr = e.stderr.decode("utf-8", errors="replace").strip() if e.stderr else ""
+            result["error"] = f"重载命令返回 {e.returncode}：{stderr}"
+        except subprocess.TimeoutExpired:
+            result["error"] = f"重载命令超时（{timeout} 秒）。"
+        except Exception as e:
+            result["error"] = str(e)
+        finally:
+            result["elapsed"] = time.monotonic() - start
+
+        if result["error"]:
+            logger.error(f"[部署钩子]目标 {name} 部署失败，错误：{result['error']}")
+        return result
+
+    def deploy(self, certificates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        将一批证书并发部署到所有目标。
+        :param certificates: 证书列表，每项为包含 domains (list) 和 files (list，需要复制的文件路径) 的字典。
+        :return: 每个目标的部署结果列表。
+        """
+        if not self.targets or not certificates:
+            return []
+
+        self._chains = self.chain_store.manifest()["certificates"] if self.chain_store else {}
+        logger.info(f"[部署钩子]开始部署 {len(certificates)} 张证书到 {len(self.targets)} 个目标，并发数 {self.max_workers}。")
+        results = []
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="deploy") as executor:
+            futures = [executor.submit(self._deploy_target, target, certificates) for target in self.targets]
+            for future in as_completed(futures):
+                results.append(future.result())
+
+        failed = [r["name"] for r in results if not r["success"]]
+        reloaded = sum(1 for r in results if r["reloaded"])
+        if failed:
+            logger.warning(f"[部署钩子]部署完成，{len(failed)} 个目标失败：{', '.join(failed)}；重载 {reloaded} 个目标。")
+        else:
+            logger.info(f"[部署钩子]所有目标部署完成，重载 {reloaded} 个目标。")
+        return results
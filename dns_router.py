@@ -0,0 +1,159 @@
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+from loguru import logger
+
+from aliyun_dns import AliyunDNSManager
+
+
+def _normalize(zone: str) -> str:
+    return (zone or "").strip(".").lower()
+
+
+class AliyunDNSRouter:
+    """
+    按区域路由的阿里云 DNS 管理器。
+    区域分布在多个阿里云账号下时，每个 AccessKey 对应一个 AliyunDNSManager，各自持有长期复用的客户端、
+    限速器（阿里云按 AccessKey 限流）和解析记录索引，不同账号的区域可以同时写入而互不占用配额。
+    路由器提供与 AliyunDNSManager 相同的方法，按 domain_name 转发给对应账号的管理器；
+    没有在路由表中的区域转发给默认账号的管理器。
+    """
+    def __init__(self, default: Optional[AliyunDNSManager] = None,
+                 accounts: Optional[Dict[str, Tuple[AliyunDNSManager, List[str]]]] = None):
+        """
+        初始化 AliyunDNSRouter。
+        :param default: (可选) 默认账号的管理器，处理路由表以外的区域。
+        :param accounts: (可选) {账号名称: (管理器, [区域, ...])}。区域列表为空时，首次路由时通过 list_domains 查询该账号下的区域。
+        :raises ValueError: 同一个区域配置在多个账号下，或既没有默认账号也没有其他账号时抛出。
+        """
+        accounts = accounts or {}
+        if default is None and not accounts:
+            raise ValueError("至少需要配置一个阿里云账号。")
+        self.default = default
+        self.managers: Dict[str, AliyunDNSManager] = {name: manager for name, (manager, _) in accounts.items()}
+        self._routes: Dict[str, str] = {}
+        self._undiscovered = [name for name, (_, zones) in accounts.items() if not zones]
+        self._lock = threading.Lock()
+        for name, (_, zones) in accounts.items():
+            for zone in zones:
+                zone = _normalize(zone)
+                if zone in self._routes and self._routes[zone] != name:
+                    raise ValueError(f"区域 {zone} 同时配置在账号 {self._routes[zone]} 和 {name} 下。")
+                self._routes[zone] = name
+        # 所有管理器共享同一个 API 调用统计和 cassette
+        primary = default if default is not None else next(iter(self.managers.values()))
+        self.metrics = primary.metrics
+        self.cassette = primary.cassette
+        logger.info(f"[区域路由]已配置 {len(self.managers)} 个阿里云账号，{len(self._routes)} 个区域。")
+
+    def _discover(self) -> None:
+        """
+        查询未列出区域的账号下的所有区域，加入路由表。查询失败的账号在下次路由时重试。
+        """
+        with self._lock:
+            pending, self._undiscovered = self._undiscovered, []
+        failed = []
+        for name in pending:
+            try:
+                zones = self.managers[name].list_domains()
+            except Exception as e:
+                logger.warning(f"[区域路由]查询账号 {name} 下的区域失败：{getattr(e, 'message', e)}")
+                failed.append(name)
+                continue
+            with self._lock:
+                for zone in zones:
+                    self._routes.setdefault(_normalize(zone), name)
+            logger.info(f"[区域路由]账号 {name} 下共有 {len(zones)} 个区域。")
+        if failed:
+            with self._lock:
+                self._undiscovered.extend(failed)
+
+    def _lookup(self, zone: str) -> Optional[str]:
+        with self._lock:
+            return self._routes.get(_normalize(zone))
+
+    def account_for(self, domain_name: str) -> Optional[str]:
+        """
+        返回区域所属的账号名称；由默认账号处理时返回 None。
+        """
+        name = self._lookup(domain_name)
+        if name is None and self._undiscovered:
+            self._discover()
+            name = self._lookup(domain_name)
+        return name
+
+    def manager_for(self, domain_name: str) -> AliyunDNSManager:
+        """
+        返回处理指定区域的管理器。
+        :raises ValueError: 区域不在路由表中且没有配置默认账号时抛出。
+        """
+        name = self.account_for(domain_name)
+        if name is not None:
+            return self.managers[name]
+        if self.default is None:
+            raise ValueError(f"区域 {domain_name} 不属于任何已配置的阿里云账号。")
+        return self.default
+
+    def _all_managers(self) -> List[AliyunDNSManager]:
+        managers = list(self.managers.values())
+        return managers + [self.default] if self.default is not None else managers
+
+    def add_record(self, domain_name: str, *args, **kwargs) -> str:
+        return self.manager_for(domain_name).add_record(domain_name, *args, **kwargs)
+
+    def delete_sub_records(self, domain_name: str, *args, **kwargs) -> None:
+        return self.manager_for(domain_name).delete_sub_records(domain_name, *args, **kwargs)
+
+    def delete_record(self, record_id: str, domain_name: str = None) -> None:
+        if domain_name is None:
+            if self.default is None:
+                raise ValueError(f"删除解析记录 {record_id} 时必须指定区域。")
+            return self.default.delete_record(record_id)
+        return self.manager_for(domain_name).delete_record(record_id, domain_name=domain_name)
+
+    def update_record(self, record_id: str, *args, domain_name: str = None, **kwargs) -> None:
+        """
+        UpdateDomainRecord 只按 RecordId 定位记录，需要通过 domain_name 确定账号，不指定时使用默认账号。
+        """
+        manager = self.manager_for(domain_name) if domain_name else self.default
+        if manager is None:
+            raise ValueError(f"更新解析记录 {record_id} 时必须指定区域。")
+        return manager.update_record(record_id, *args, **kwargs)
+
+    def list_records(self, domain_name: str, *args, **kwargs) -> Dict[str, Any]:
+        return self.manager_for(domain_name).list_records(domain_name, *args, **kwargs)
+
+    def check_record(self, domain_name: str, *args, **kwargs) -> Optional[str]:
+        return self.manager_for(domain_name).check_record(domain_name, *args, **kwargs)
+
+    def upsert_record(self, domain_name: str, *args, **kwargs) -> Optional[str]:
+        return self.manager_for(domain_name).upsert_record(domain_name, *args, **kwargs)
+
+    def describe_domain(self, domain_name: str, *args, **kwargs) -> Dict[str, Any]:
+        return self.manager_for(domain_name).describe_domain(domain_name, *args, **kwargs)
+
+    def list_all_records(self, domain_name: str, *args, **kwargs) -> List[Dict[str, Any]]:
+        return self.manager_for(domain_name).list_all_records(domain_name, *args, **kwargs)
+
+    def load_record_index(self, domain_name: str, *args, **kwargs):
+        return self.manager_for(domain_name).load_record_index(domain_name, *args, **kwargs)
+
+    def batch_upsert_txt_records(self, domain_name: str, *args, **kwargs) -> Tuple[Dict[str, Dict[str, str]], Set[str]]:
+        return self.manager_for(domain_name).batch_upsert_txt_records(domain_name, *args, **kwargs)
+
+    def forget_records(self, domain_name: str, *args, **kwargs) -> None:
+        return self.manager_for(domain_name).forget_records(domain_name, *args, **kwargs)
+
+    def forget_record_id(self, record_id: str, domain_name: str = None) -> None:
+        managers = [self.manager_for(domain_name)] if domain_name else self._all_managers()
+        for manager in managers:
+            manager.forget_record_id(record_id, domain_name)
+
+    def list_domains(self, *args, **kwargs) -> List[str]:
+        """
+        返回所有账号下的区域（去重）。
+        """
+        domains: Dict[str, str] = {}
+        for manager in self._all_managers():
+            for domain in manager.list_domains(*args, **kwargs):
+                domains.setdefault(_normalize(domain), domain)
+        return list(domains.values())
@@ -0,0 +1,83 @@
+import os
+import hashlib
+import tempfile
+from typing import Optional
+from loguru import logger
+
+
+def file_digest(file_path: str) -> Optional[str]:
+    """
+    计算文件内容的 SHA-256 摘要。
+    Args:
+        file_path (str): 文件路径。
+    Returns:
+        Optional[str]: 十六进制摘要；文件不存在或无法读取时返回 None。
+    """
+    try:
+        with open(file_path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def _fsync_directory(directory: str) -> None:
+    """
+    对目录执行 fsync，确保 rename 操作本身已落盘。部分平台（如 Windows）不支持，忽略即可。
+    """
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_file_atomic(file_path: str, data: bytes, mode: int = None) -> bool:
+    """
+    原子地写入文件：先写入同目录下的临时文件并 fsync，再通过 rename 替换目标文件。
+    如果目标文件内容的哈希与新内容一致，则跳过写入，避免触发不必要的文件监听和服务重载。
+    Args:
+        file_path (str): 目标文件路径。
+        data (bytes): 需要写入的内容。
+        mode (int, optional): 文件权限，例如 0o600。不指定时沿用已有文件的权限，新文件默认 0o644。
+    Returns:
+        bool: 文件内容发生变化并已写入返回 True，内容未变化跳过写入返回 False。
+    Raises:
+        OSError: 写入或替换文件失败时抛出。
+    """
+    if file_digest(file_path) == hashlib.sha256(data).hexdigest():
+        logger.info(f"[原子写入]文件内容未变化，跳过写入：{file_path}。")
+        return False
+
+    directory = os.path.dirname(file_path) or "."
+    os.makedirs(directory, exist_ok=True)
+
+    if mode is None:
+        try:
+            mode = os.stat(file_path).st_mode & 0o777
+        except OSError:
+            mode = 0o644
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(file_path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        # 写入失败时清理临时文件，目标文件保持原样
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    _fsync_directory(directory)
+    logger.info(f"[原子写入]文件已更新：{file_path}。")
+    return True
@@ -0,0 +1,179 @@
+import os
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+from loguru import logger
+
+from file_utils import write_file_atomic
+
+CHALLENGE_DNS01 = "dns-01"
+CHALLENGE_HTTP01 = "http-01"
+CHALLENGE_TYPES = (CHALLENGE_DNS01, CHALLENGE_HTTP01)
+
+# 挑战类型策略：dns-01 表示全部使用 DNS-01；auto 表示非通配符域名使用 HTTP-01，通配符域名使用 DNS-01
+CHALLENGE_POLICY_DNS = "dns-01"
+CHALLENGE_POLICY_AUTO = "auto"
+CHALLENGE_POLICIES = (CHALLENGE_POLICY_DNS, CHALLENGE_POLICY_AUTO)
+
+HTTP01_PATH_PREFIX = "/.well-known/acme-challenge/"
+
+
+class Http01Responder(ABC):
+    """
+    HTTP-01 挑战应答器接口：发布和撤回 token 对应的 key authorization。
+    """
+    def start(self) -> None:
+        """
+        开始应答。start 和 stop 成对调用；多个签发流程并发使用同一个应答器时，最后一次 stop 才真正停止。
+        """
+
+    def stop(self) -> None:
+        """
+        停止应答，与 start 成对调用。
+        """
+
+    @abstractmethod
+    def add(self, token: str, key_authorization: str) -> None:
+        """
+        发布 token 对应的 key authorization。
+        """
+
+    @abstractmethod
+    def remove(self, token: str) -> None:
+        """
+        撤回 token。
+        """
+
+
+class StandaloneHttp01Responder(Http01Responder):
+    """
+    内置的 asyncio HTTP 应答器，在后台线程的事件循环中监听端口，
+    只响应 GET/HEAD /.well-known/acme-challenge/<token>，其他路径返回 404。
+    start/stop 按引用计数：并发的签发流程（批量吊销后的重新签发、多 CA 同时签发、分片、预热）共享同一个应答器，
+    先完成的流程调用 stop 时不会关闭其他流程仍在使用的监听。
+    """
+    def __init__(self, host: str = "0.0.0.0", port: int = 80, read_timeout: float = 10):
+        """
+        初始化 StandaloneHttp01Responder。
+        :param host: 监听地址。
+        :param port: 监听端口。ACME 服务器总是访问 80 端口，其他端口需要通过端口转发或反向代理；为 0 时随机选择（用于本地测试）。
+        :param read_timeout: 读取请求的超时时间（秒）。
+        """
+        self.host = host
+        self.port = port
+        self.read_timeout = read_timeout
+        self._tokens: Dict[str, str] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._error: Optional[Exception] = None
+        self._users = 0 # 尚未调用 stop 的 start 次数
+        self._lifecycle_lock = threading.Lock()
+
+    def add(self, token: str, key_authorization: str) -> None:
+        self._tokens[token] = key_authorization
+
+    def remove(self, token: str) -> None:
+        self._tokens.pop(token, None)
+
+    def start(self) -> None:
+        with self._lifecycle_lock:
+            if self._users == 0:
+                self._start_server()
+            self._users += 1
+
+    def stop(self) -> None:
+        with self._lifecycle_lock:
+            if self._users == 0:
+                return
+            self._users -= 1
+            if self._users == 0:
+                self._stop_server()
+
+    def _start_server(self) -> None:
+        self._ready.clear()
+        self._error = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="http01-responder", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            self._thread.join()
+            self._thread = None
+            raise self._error
+        logger.info(f"[HTTP-01]应答器已启动，监听 {self.host}:{self.port}。")
+
+    def _stop_server(self) -> None:
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = None
+        logger.info("[HTTP-01]应答器已停止。")
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        try:
+            server = self._loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+        except Exception as e:
+            self._error = e
+            self._loop.close()
+            self._ready.set()
+            return
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            server.close()
+            self._loop.run_until_complete(server.wait_closed())
+            self._loop.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), self.read_timeout)
+            while True: # 忽略请求头
+                line = await asyncio.wait_for(reader.readline(), self.read_timeout)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+
+            parts = request_line.decode("latin-1").split()
+            method = parts[0] if parts else ""
+            status, reason, body = 404, "Not Found", b"Not Found"
+            if len(parts) >= 2 and method in ("GET", "HEAD") and parts[1].startswith(HTTP01_PATH_PREFIX):
+                key_authorization = self._tokens.get(parts[1][len(HTTP01_PATH_PREFIX):])
+                if key_authorization is not None:
+                    status, reason, body = 200, "OK", key_authorization.encode("ascii")
+            logger.debug(f"[HTTP-01]{writer.get_extra_info('peername')} {request_line.strip()!r} -> {status}")
+
+            head = (f"HTTP/1.1 {status} {reason}\r\nContent-Type: text/plain\r\n"
+                    f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n").encode("ascii")
+            writer.write(head if method == "HEAD" else head + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+class WebrootHttp01Responder(Http01Responder):
+    """
+    将 key authorization 写入现有 Web 服务器的站点根目录（<webroot>/.well-known/acme-challenge/<token>）。
+    """
+    def __init__(self, webroot: str):
+        """
+        初始化 WebrootHttp01Responder。
+        :param webroot: 站点根目录。
+        """
+        self.webroot = webroot
+        self.challenge_dir = os.path.join(webroot, *HTTP01_PATH_PREFIX.strip("/").split("/"))
+
+    def add(self, token: str, key_authorization: str) -> None:
+        write_file_atomic(os.path.join(self.challenge_dir, token), key_authorization.encode("ascii"), mode=0o644)
+
+    def remove(self, token: str) -> None:
+        try:
+            os.remove(os.path.join(self.challenge_dir, token))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"[HTTP-01]删除挑战文件失败：{token}，错误：{e}")
@@ -1,23 +1,63 @@
 import os
+import time
 from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import rsa
-from josepy.jwk import JWKRSA
+from cryptography.hazmat.primitives.asymmetric import rsa, ec
+import josepy as jose
 from cryptography import x509
 from cryptography.x509.oid import NameOID
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.backends import default_backend
-from typing import List
+from typing import List, Optional, Tuple
 from loguru import logger
+from file_utils import write_file_atomic
+
+# 证书私钥复用策略
+KEY_REUSE_NEW = "new"            # 每次都生成新的证书私钥
+KEY_REUSE_MAX_AGE = "max_age"    # 复用现有私钥，直到其使用时间超过指定天数
+KEY_REUSE_FOREVER = "forever"    # 始终复用现有私钥
+KEY_REUSE_POLICIES = (KEY_REUSE_NEW, KEY_REUSE_MAX_AGE, KEY_REUSE_FOREVER)
+
+# 证书私钥类型
+KEY_TYPE_RSA = "rsa"
+KEY_TYPE_EC = "ec"
+KEY_TYPES = (KEY_TYPE_RSA, KEY_TYPE_EC)
+EC_CURVES = {"secp256r1": ec.SECP256R1, "secp384r1": ec.SECP384R1}
+
+_EC_ALGORITHMS = {"secp256r1": jose.ES256, "secp384r1": jose.ES384, "secp521r1": jose.ES512}
+
+
+def jwk_for_private_key(private_key) -> Tuple[jose.JWK, jose.JWASignature]:
+    """
+    根据私钥类型返回 JWK 和对应的签名算法（RSA 使用 RS256，EC 按曲线使用 ES256/ES384/ES512）。
+    :raises TypeError: 不支持的私钥类型。
+    """
+    if isinstance(private_key, rsa.RSAPrivateKey):
+        return jose.JWKRSA(key=private_key), jose.RS256
+    if isinstance(private_key, ec.EllipticCurvePrivateKey) and private_key.curve.name in _EC_ALGORITHMS:
+        return jose.JWKEC(key=private_key), _EC_ALGORITHMS[private_key.curve.name]
+    raise TypeError(f"不支持的私钥类型：{type(private_key).__name__}")
+
 
 class KeyManager:
-    def __init__(self):
+    def __init__(self, account_key=None, account_key_type: str = KEY_TYPE_RSA):
+        """
+        Args:
+            account_key (optional): 已有的账户私钥，例如在同一进程中并发申请多张证书时共享同一个账户。不指定时生成新的账户密钥。
+            account_key_type (str, optional): 新生成的账户密钥类型，rsa（RSA 3072，RS256）或 ec（P-256，ES256）。
+                ES256 签名比 RSA 3072 快一个数量级以上，并发轮询大量授权时可以明显减少 CPU 时间。
+        """
         self._account_key = None
         self._cert_key = None
         self._certificate_chain = None
+        self._certificate = None # 终端证书的缓存，随证书链一起更新
+        self._changed_files = []
 
-        # 账户密钥对（始终新生成）
-        self._account_key = self._generate_key()
-        logger.info("[账户密钥] 生成账户密钥成功。")
+        # 账户密钥对（未指定时新生成）
+        if account_key is not None:
+            self._account_key = account_key
+        else:
+            self._account_key = self.generate_account_key(account_key_type)
+            logger.info(f"[账户密钥] 生成账户密钥成功，类型：{account_key_type}。")
 
     def _generate_key(self,key_size=3072):
         return rsa.generate_private_key(
@@ -25,16 +65,78 @@ class KeyManager:
             key_size=key_size,
         )
 
+    @staticmethod
+    def generate_account_key(key_type: str = KEY_TYPE_RSA):
+        """
+        生成账户私钥。
+        Args:
+            key_type (str): rsa（RSA 3072）或 ec（P-256）。
+        Returns:
+            新的账户私钥。
+        """
+        if key_type == KEY_TYPE_EC:
+            return ec.generate_private_key(ec.SECP256R1())
+        if key_type == KEY_TYPE_RSA:
+            return rsa.generate_private_key(public_exponent=65537, key_size=3072)
+        raise ValueError(f"不支持的账户密钥类型：{key_type}，可选值为 {', '.join(KEY_TYPES)}。")
+
+    @staticmethod
+    def load_account_key(file_path: str, password: str = None):
+        """
+        从文件加载账户私钥（RSA 或 EC）。
+        Args:
+            file_path (str): 私钥文件路径。
+            password (str, optional): 私钥的加密密码。
+        Returns:
+            账户私钥。
+        Raises:
+            TypeError: 私钥类型不能用于签名 ACME 请求。
+        """
+        with open(file_path, "rb") as f:
+            key = serialization.load_pem_private_key(f.read(), password=password.encode('utf-8') if password else None)
+        jwk_for_private_key(key)
+        return key
+
+    def _key_file_matches(self, key, file_path, password=None) -> bool:
+        """
+        辅助函数：判断指定文件中是否已保存了相同的私钥。
+        加密后的 PEM 每次序列化都会使用新的盐值，因此需要解密后比较密钥本身，而不是比较文件内容。
+        Returns:
+            bool: 文件存在且其中的私钥与 key 相同返回 True，否则返回 False。
+        """
+        if not os.path.exists(file_path):
+            return False
+        try:
+            with open(file_path, "rb") as f:
+                existing_key = serialization.load_pem_private_key(
+                    f.read(),
+                    password=password.encode('utf-8') if password else None,
+                )
+        except Exception:
+            return False
+
+        unencrypted = dict(
+            encoding=serialization.Encoding.DER,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+        return existing_key.private_bytes(**unencrypted) == key.private_bytes(**unencrypted)
+
     def _save_key_to_file(self, key, file_path, password=None) -> bool:
         """
-        辅助函数：保存私钥到指定文件，并支持密码加密。
+        辅助函数：原子地保存私钥到指定文件，并支持密码加密。
+        如果文件中已是相同的私钥，则跳过写入。
         Returns:
-            bool: 保存成功返回 True，否则返回 False。
+            bool: 保存成功（包括无需写入）返回 True，否则返回 False。
         """
         if not key:
             logger.warning(f"[保存密钥]跳过保存密钥到 {file_path}: 密钥为空。")
             return False
 
+        if self._key_file_matches(key, file_path, password):
+            logger.info(f"[保存密钥]密钥未变化，跳过写入，位置：{file_path}。")
+            return True
+
         encoding = serialization.Encoding.PEM
         format = serialization.PrivateFormat.PKCS8
         encryption_algorithm = serialization.NoEncryption()
@@ -42,23 +144,48 @@ class KeyManager:
             encryption_algorithm = serialization.BestAvailableEncryption(password.encode('utf-8'))
 
         try:
-            # 确保目录存在
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            with open(file_path, "wb") as f:
-                f.write(key.private_bytes(
-                    encoding=encoding,
-                    format=format,
-                    encryption_algorithm=encryption_algorithm
-                ))
+            key_bytes = key.private_bytes(
+                encoding=encoding,
+                format=format,
+                encryption_algorithm=encryption_algorithm
+            )
+            if write_file_atomic(file_path, key_bytes, mode=0o600):
+                self._changed_files.append(file_path)
             logger.info(f"[保存密钥]保存密钥成功，位置：{file_path}。")
             return True
         except Exception as e:
             logger.error(f"[保存密钥]保存密钥失败，位置：{file_path}，错误：{e}")
             return False
 
+    def _save_certificate_to_file(self, data, file_path, description) -> bool:
+        """
+        辅助函数：原子地保存证书内容到指定文件，内容未变化时跳过写入。
+        Returns:
+            bool: 保存成功（包括无需写入）返回 True，否则返回 False。
+        """
+        try:
+            if write_file_atomic(file_path, data, mode=0o644):
+                self._changed_files.append(file_path)
+            logger.info(f"[保存证书]保存{description}成功，位置：{file_path}。")
+            return True
+        except Exception as e:
+            logger.error(f"[保存证书]保存{description}失败，位置：{file_path}，错误：{e}")
+            return False
+
     @property
     def account_jwk(self):
-        return JWKRSA(key=self._account_key)
+        return jwk_for_private_key(self._account_key)[0]
+
+    @property
+    def account_alg(self):
+        """
+        账户密钥对应的 JWS 签名算法（RS256 或 ES256）。
+        """
+        return jwk_for_private_key(self._account_key)[1]
+
+    @property
+    def account_key_type(self) -> str:
+        return KEY_TYPE_EC if isinstance(self._account_key, ec.EllipticCurvePrivateKey) else KEY_TYPE_RSA
 
     @property
     def cert_public(self):
@@ -74,13 +201,17 @@ class KeyManager:
     def certificate(self):
         """
         从证书链中提取并返回终端用户证书。
+        解析结果会被缓存，直到证书链被重新设置。
         """
         if not self._certificate_chain:
             return None
+        if self._certificate is not None:
+            return self._certificate
         try:
             certs = x509.load_pem_x509_certificates(self._certificate_chain)
             if certs:
-                return certs[0].public_bytes(serialization.Encoding.PEM)
+                self._certificate = certs[0].public_bytes(serialization.Encoding.PEM)
+                return self._certificate
             return None
         except Exception as e:
             logger.error(f"从证书链中提取终端证书失败: {e}")
@@ -93,15 +224,46 @@ class KeyManager:
     @certificate_chain.setter
     def certificate_chain(self, cert_data):
         self._certificate_chain = cert_data
+        self._certificate = None
+
+    @property
+    def changed_files(self) -> List[str]:
+        """
+        最近一次 save_keys_and_certificate 调用中内容实际发生变化的文件路径列表。
+        下游的重载操作可以据此判断是否需要执行。
+        """
+        return list(self._changed_files)
 
-    def generate_new_cert_key(self, key_size=3072):
+    def generate_new_cert_key(self, key_size=3072, key_type=KEY_TYPE_RSA, curve="secp256r1"):
         """
-        生成新的数字证书密钥对（仅支持 RSA）。
+        生成新的数字证书密钥对（RSA 或 ECDSA）。
         Args:
-            key_size (int): RSA 密钥的位数，例如 2048, 4096。
+            key_size (int): RSA 密钥的位数，例如 2048, 4096。仅在 key_type 为 "rsa" 时生效。
+            key_type (str): 密钥类型，"rsa" 或 "ec"。
+            curve (str): ECDSA 曲线名称，"secp256r1" 或 "secp384r1"。仅在 key_type 为 "ec" 时生效。
+        Raises:
+            ValueError: 如果密钥类型或曲线不受支持。
         """
-        self._cert_key = self._generate_key(key_size=key_size)
-        logger.info("[证书密钥] 生成新证书密钥成功。")
+        if key_type == KEY_TYPE_EC:
+            if curve not in EC_CURVES:
+                raise ValueError(f"不支持的 ECDSA 曲线：{curve}，可选值为 {', '.join(EC_CURVES)}。")
+            self._cert_key = ec.generate_private_key(EC_CURVES[curve]())
+        elif key_type == KEY_TYPE_RSA:
+            self._cert_key = self._generate_key(key_size=key_size)
+        else:
+            raise ValueError(f"不支持的密钥类型：{key_type}，可选值为 {', '.join(KEY_TYPES)}。")
+        logger.info(f"[证书密钥] 生成新证书密钥成功（{key_type}）。")
+
+    @staticmethod
+    def key_matches_type(key, key_type=KEY_TYPE_RSA, key_size=3072, curve="secp256r1") -> bool:
+        """
+        判断私钥是否符合指定的类型和参数（RSA 位数或 ECDSA 曲线）。
+        """
+        if key_type == KEY_TYPE_RSA:
+            return isinstance(key, rsa.RSAPrivateKey) and key.key_size == key_size
+        if key_type == KEY_TYPE_EC:
+            return isinstance(key, ec.EllipticCurvePrivateKey) and key.curve.name == curve
+        return False
 
     def load_cert_key_from_file(self, file_path, password=None):
         """
@@ -132,11 +294,25 @@ class KeyManager:
             self._cert_key = None
             return False
 
+    @staticmethod
+    def key_file_age_days(file_path) -> Optional[float]:
+        """
+        返回私钥文件的使用天数。
+        私钥只在内容变化时才会被重写（见 _save_key_to_file），因此文件的修改时间即为该私钥的生成时间。
+        Args:
+            file_path (str): 私钥文件的路径。
+        Returns:
+            Optional[float]: 私钥的使用天数；文件不存在时返回 None。
+        """
+        try:
+            return (time.time() - os.path.getmtime(file_path)) / 86400
+        except OSError:
+            return None
+
     def generate_csr(self, domains: List[str]):
         """
         使用内部证书私钥生成 CSR 文件。
-        此函数将用于 ACME 订单的创建。
-        注意：此实现目前仅支持 RSA 密钥。
+        此函数将用于 ACME 订单的创建。支持 RSA 和 ECDSA 密钥。
         Args:
             domains (List[str]): 包含所有需要申请证书的域名的列表，例如 ["example.com", "*.example.com"]。
                                  第一个域名将作为 Common Name (CN)，所有域名将作为 Subject Alternative Names (SANs)。
@@ -146,16 +322,15 @@ class KeyManager:
             cryptography.x509.CertificateSigningRequest: 生成的 CSR 对象。
         Raises:
             ValueError: 如果证书私钥不存在或域名列表为空。
-            TypeError: 如果证书私钥不是 RSA 类型。
+            TypeError: 如果证书私钥既不是 RSA 也不是 ECDSA 类型。
         """
         if not self._cert_key:
             logger.error("[生成CSR]证书私钥不存在，无法生成 CSR。请先生成或加载证书私钥。")
             raise ValueError("CSR 生成失败，请检查证书私钥是否存在。")
 
-        # 检查是否为 RSA 密钥，因为原始的 generate_csr 仅支持 RSA
-        if not isinstance(self._cert_key, rsa.RSAPrivateKey):
-            logger.error("[生成CSR]目前 generate_csr 方法仅支持 RSA 证书私钥。")
-            raise TypeError("CSR 生成失败，请检查证书私钥是否为 RSA 类型。")
+        if not isinstance(self._cert_key, (rsa.RSAPrivateKey, ec.EllipticCurvePrivateKey)):
+            logger.error("[生成CSR]generate_csr 方法仅支持 RSA 和 ECDSA 证书私钥。")
+            raise TypeError("CSR 生成失败，请检查证书私钥是否为 RSA 或 ECDSA 类型。")
 
         if not domains:
             logger.error("[生成CSR]域名列表为空，无法生成 CSR。")
@@ -184,7 +359,7 @@ class KeyManager:
 
     def save_keys_and_certificate(self, account_key_path: str, cert_key_path: str,
                                   certificate_path: str, certificate_chain_path: str,
-                                  common_password: str = None) -> bool:
+                                  common_password: str = None, chain_store=None) -> bool:
         """
         保存账户私钥、证书私钥、终端数字证书和数字证书链到指定文件。
         Args:
@@ -193,10 +368,13 @@ class KeyManager:
             certificate_path (str): 终端数字证书的保存路径（即证书链中的第一个证书）。
             certificate_chain_path (str): 完整的数字证书链的保存路径。
             common_password (str, optional): 如果指定，将作为账户私钥和证书私钥的统一加密密码。
+            chain_store (ChainStore, optional): 如果指定，中间证书存入该存储，证书链文件由终端证书和存储中的中间证书拼接而成。
         Returns:
             bool: 如果所有文件都保存成功，返回 True，否则返回 False。
+                  实际发生变化的文件可通过 changed_files 属性获取。
         """
         all_success = True
+        self._changed_files = []
 
         # 保存账户私钥
         if self._account_key:
@@ -215,36 +393,33 @@ class KeyManager:
             all_success = False
 
         # 保存终端数字证书
-        cert_saved = False
-        if self.certificate: # 使用 self.certificate 属性获取终端证书
-            try:
-                os.makedirs(os.path.dirname(certificate_path), exist_ok=True)
-                with open(certificate_path, "wb") as f:
-                    f.write(self.certificate) # 保存终端证书
-                logger.info(f"[保存证书]保存终端数字证书成功，位置：{certificate_path}。")
-                cert_saved = True
-            except Exception as e:
-                logger.error(f"[保存证书]保存终端数字证书失败，位置：{certificate_path}，错误：{e}")
+        certificate = self.certificate # 使用 self.certificate 属性获取终端证书
+        if certificate:
+            if not self._save_certificate_to_file(certificate, certificate_path, "终端数字证书"):
+                all_success = False
         else:
             logger.warning("[保存证书]终端数字证书不存在，跳过保存。")
-        if not cert_saved:
             all_success = False
 
         # 保存完整的数字证书链
-        chain_saved = False
         if self._certificate_chain:
-            try:
-                os.makedirs(os.path.dirname(certificate_chain_path), exist_ok=True)
-                with open(certificate_chain_path, "wb") as f:
-                    f.write(self._certificate_chain) # 保存完整的证书链
-                logger.info(f"[保存证书]保存数字证书链成功，位置：{certificate_chain_path}。")
-                chain_saved = True
-            except Exception as e:
-                logger.error(f"[保存证书]保存数字证书链失败，位置：{certificate_chain_path}，错误：{e}")
+            chain = self._certificate_chain
+            if chain_store is not None:
+                try:
+                    chain = chain_store.store_chain(chain, certificate_chain_path, certificate_path)
+                except Exception as e:
+                    # 存储不可用时退回直接保存完整的证书链
+                    logger.warning(f"[保存证书]写入证书链存储失败，直接保存完整证书链，错误：{e}")
+            if not self._save_certificate_to_file(chain, certificate_chain_path, "数字证书链"):
+                all_success = False
         else:
             logger.warning("[保存证书]数字证书链不存在，跳过保存。")
-        if not chain_saved:
             all_success = False
-            
+
+        if self._changed_files:
+            logger.info(f"[保存证书]本次实际发生变化的文件：{', '.join(self._changed_files)}。")
+        else:
+            logger.info("[保存证书]所有文件内容均未变化，无需触发重载。")
+
         return all_success
 
@@ -0,0 +1,135 @@
+import os
+import re
+import time
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Optional
+from loguru import logger
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+    import msvcrt
+
+
+class LockTimeoutError(Exception):
+    """
+    在超时时间内未能获取锁时抛出。
+    """
+
+
+class LockBackend(ABC):
+    """
+    锁后端接口。
+    默认的 FileLockBackend 只能协调同一台主机上的进程；多主机部署时可以实现此接口（例如基于 Redis 或数据库），
+    并通过 LockManager 传入。
+    """
+    @abstractmethod
+    def acquire(self, key: str, timeout: float) -> Any:
+        """
+        获取指定键的锁，返回用于释放锁的句柄。
+        :raises LockTimeoutError: 在超时时间内未能获取锁。
+        """
+
+    @abstractmethod
+    def release(self, handle: Any) -> None:
+        """
+        释放 acquire 返回的锁句柄。
+        """
+
+
+class FileLockBackend(LockBackend):
+    """
+    基于文件的咨询锁后端（POSIX 上使用 flock，Windows 上使用 msvcrt.locking）。
+    进程退出时操作系统会自动释放锁，因此被强制终止的运行不会留下死锁。
+    """
+    def __init__(self, lock_dir: str, poll_interval: float = 0.1):
+        """
+        初始化 FileLockBackend。
+        :param lock_dir: 锁文件所在目录。
+        :param poll_interval: 获取锁失败时的重试间隔（秒）。
+        """
+        self.lock_dir = lock_dir
+        self.poll_interval = poll_interval
+        os.makedirs(lock_dir, exist_ok=True)
+
+    def _lock_path(self, key: str) -> str:
+        safe_key = re.sub(r"[^A-Za-z0-9._-]", "_", key)
+        return os.path.join(self.lock_dir, f"{safe_key}.lock")
+
+    def _try_lock(self, fd: int) -> bool:
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def acquire(self, key: str, timeout: float) -> Any:
+        fd = os.open(self._lock_path(key), os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = time.monotonic() + timeout
+        while not self._try_lock(fd):
+            if time.monotonic() >= deadline:
+                os.close(fd)
+                raise LockTimeoutError(f"获取锁 {key} 超时（{timeout} 秒）。")
+            time.sleep(self.poll_interval)
+        return fd
+
+    def release(self, handle: Any) -> None:
+        try:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+            else:
+                msvcrt.locking(handle, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(handle)
+
+
+class LockManager:
+    """
+    按区域和主机记录 (RR) 加锁，协调并发运行对同一挑战记录的修改。
+    同一进程内的线程之间也会互斥（文件锁本身只在进程之间生效）。
+    """
+    def __init__(self, backend: LockBackend, timeout: float = 120):
+        """
+        初始化 LockManager。
+        :param backend: 锁后端。
+        :param timeout: 获取锁的超时时间（秒）。
+        """
+        self.backend = backend
+        self.timeout = timeout
+        self._thread_locks = {}
+        self._guard = threading.Lock()
+
+    def _thread_lock(self, key: str) -> threading.Lock:
+        with self._guard:
+            return self._thread_locks.setdefault(key, threading.Lock())
+
+    @contextmanager
+    def lock(self, zone: str, rr: Optional[str] = None):
+        """
+        获取区域级（rr 为 None）或主机记录级的锁。
+        :param zone: 区域（主域名）。
+        :param rr: 主机记录，例如 _acme-challenge.www。
+        :raises LockTimeoutError: 在超时时间内未能获取锁。
+        """
+        key = f"{zone}" if rr is None else f"{zone}__{rr}"
+        thread_lock = self._thread_lock(key)
+        if not thread_lock.acquire(timeout=self.timeout):
+            raise LockTimeoutError(f"获取锁 {key} 超时（{self.timeout} 秒）。")
+        try:
+            start = time.monotonic()
+            handle = self.backend.acquire(key, self.timeout)
+            waited = time.monotonic() - start
+            if waited > 1:
+                logger.info(f"[记录锁]等待 {waited:.1f} 秒后获取锁：{key}。")
+            try:
+                yield
+            finally:
+                self.backend.release(handle)
+        finally:
+            thread_lock.release()
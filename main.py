@@ -1,5 +1,11 @@
 import os
 import sys
+import json
+import types
+import argparse
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
 from loguru import logger
 from datetime import datetime
 
@@ -11,9 +17,59 @@ if current_dir not in sys.path:
 import config
 from acme_client import AcmeClient
 from aliyun_dns import AliyunDNSManager
+from dns_router import AliyunDNSRouter
+from challenge_delegation import ChallengeDelegation
 from send_email import send_email_with_attachments
+from cert_inventory import CertInventory, format_expiry
+from deploy_hooks import DeployHookRunner
+from tls_verify import TlsEndpointVerifier
+from key_manager import KEY_REUSE_NEW, KEY_REUSE_POLICIES, KEY_TYPE_RSA, KEY_TYPE_EC, KEY_TYPES, EC_CURVES
+from san_planner import SanPlanner
+from locks import LockManager, FileLockBackend
+from run_journal import RunJournal, create_run_id
+from run_report import RunReport
+from acme_network import DirectoryCache
+from api_metrics import ApiMetrics
+from quota import QuotaForecaster, DEFAULT_QUOTAS
+from cassette import Cassette, CASSETTE_MODES
+from revocation import BulkRevoker, REVOCATION_REASONS
+from ca_pool import AccountCache, CaHealth, MultiCaIssuer, CA_POLICY_FAILOVER, CA_POLICIES
+from bootstrap import Bootstrap, PreflightError
+from sharding import parse_shard, select_shard, merge_reports
+from file_utils import write_file_atomic
+from chain_store import ChainStore
+from profiler import PhaseProfiler
+from stale_sweeper import StaleRecordSweeper
+from chain_selector import ChainSelector, CHAIN_POLICY_DEFAULT, CHAIN_POLICIES
+from http01 import StandaloneHttp01Responder, WebrootHttp01Responder, CHALLENGE_POLICY_DNS, CHALLENGE_POLICIES, CHALLENGE_TYPES
 
-LOG_FILE = "main_run.log"
+LOG_DIR = "./logs"
+
+def _with_suffix(file_path, suffix):
+    """
+    在文件扩展名之前插入后缀，例如 ("a/example.com.crt", "-ecdsa") -> "a/example.com-ecdsa.crt"。
+    """
+    root, ext = os.path.splitext(file_path)
+    return f"{root}{suffix}{ext}"
+
+def _set_secondary_paths(config_obj):
+    """
+    双算法签发：第二张证书使用另一种密钥类型，文件名在扩展名之前加上后缀，例如 example.com.crt -> example.com-ecdsa.crt。
+    """
+    suffix = "-ecdsa" if config_obj.SECONDARY_KEY_TYPE == KEY_TYPE_EC else "-rsa"
+    config_obj.secondary_cert_key_path = _with_suffix(config_obj.cert_key_path, suffix)
+    config_obj.secondary_certificate_path = _with_suffix(config_obj.certificate_path, suffix)
+    config_obj.secondary_certificate_chain_path = _with_suffix(config_obj.certificate_chain_path, suffix)
+
+def _certificate_files(config_obj):
+    """
+    返回本次申请的证书私钥、证书和证书链文件路径；启用双算法签发时包含第二张证书的文件。
+    """
+    files = [config_obj.cert_key_path, config_obj.certificate_path, config_obj.certificate_chain_path]
+    if getattr(config_obj, 'CERT_DUAL_ALGORITHM', False):
+        files += [config_obj.secondary_cert_key_path, config_obj.secondary_certificate_path,
+                  config_obj.secondary_certificate_chain_path]
+    return files
 
 def _initialize_config(config, logger):
     """
@@ -21,9 +77,32 @@ def _initialize_config(config, logger):
 
     如果基本配置有效，则返回 True，否则返回 False。
     """
-    # 检查基本云服务商配置
-    required_aliyun_keys = ['ALIYUN_ACCESS_KEY_ID', 'ALIYUN_ACCESS_KEY_SECRET', 'ALIYUN_DNS_ENDPOINT']
-    if not all(hasattr(config, key) and getattr(config, key) for key in required_aliyun_keys):
+    # 检查按区域路由的阿里云账号配置
+    if not getattr(config, 'ALIYUN_DNS_ACCOUNTS', None):
+        config.ALIYUN_DNS_ACCOUNTS = {}
+
+    routed_zones = {}
+    for name, account in config.ALIYUN_DNS_ACCOUNTS.items():
+        if not account.get('access_key_id') or not account.get('access_key_secret'):
+            logger.error(f"ALIYUN_DNS_ACCOUNTS 中的账号 {name} 缺少 access_key_id 或 access_key_secret。")
+            return False
+        for zone in account.get('zones', []):
+            zone = zone.strip('.').lower()
+            if zone in routed_zones:
+                logger.error(f"ALIYUN_DNS_ACCOUNTS 配置无效: 区域 {zone} 同时配置在账号 {routed_zones[zone]} 和 {name} 下。")
+                return False
+            routed_zones[zone] = name
+
+    if not hasattr(config, 'ALIYUN_DNS_RATE'):
+        config.ALIYUN_DNS_RATE = 0
+
+    # 检查基本云服务商配置（配置了 ALIYUN_DNS_ACCOUNTS 时默认账号可以省略）
+    if not getattr(config, 'ALIYUN_DNS_ENDPOINT', None):
+        logger.error("阿里云配置不完整, 请在 config.py 中配置 ALIYUN_DNS_ENDPOINT。")
+        return False
+
+    default_keys = [getattr(config, key, None) for key in ('ALIYUN_ACCESS_KEY_ID', 'ALIYUN_ACCESS_KEY_SECRET')]
+    if not all(default_keys) and not (config.ALIYUN_DNS_ACCOUNTS and not any(default_keys)):
         logger.error("阿里云配置不完整, 请在 config.py 中配置 ALIYUN_ACCESS_KEY_ID, ALIYUN_ACCESS_KEY_SECRET, ALIYUN_DNS_ENDPOINT。")
         return False
 
@@ -37,20 +116,131 @@ def _initialize_config(config, logger):
         logger.error("ACME 联系邮箱不能为空, 请在 config.py 中配置 ACME_CONTACT_EMAIL。")
         return False
     
+    # 设置锁的默认值（LOCK_BACKEND 为 None 时使用 LOCK_DIR 中的文件锁）
+    if not hasattr(config, 'LOCK_BACKEND'):
+        config.LOCK_BACKEND = None
+
+    if not hasattr(config, 'LOCK_TIMEOUT'):
+        config.LOCK_TIMEOUT = 120
+
+    # 设置配额预测的默认值
+    if not getattr(config, 'QUOTAS', None):
+        config.QUOTAS = DEFAULT_QUOTAS
+
+    if not getattr(config, 'QUOTA_ACTION', None):
+        config.QUOTA_ACTION = "refuse"
+
+    if config.QUOTA_ACTION not in ("refuse", "defer"):
+        logger.error(f"QUOTA_ACTION 配置无效: {config.QUOTA_ACTION}，可选值为 refuse, defer。")
+        return False
+
+    # 设置录制/回放的默认值（CASSETTE_MODE 为 None 时不录制也不回放）
+    if not hasattr(config, 'CASSETTE_MODE'):
+        config.CASSETTE_MODE = None
+
+    if config.CASSETTE_MODE is not None and config.CASSETTE_MODE not in CASSETTE_MODES:
+        logger.error(f"CASSETTE_MODE 配置无效: {config.CASSETTE_MODE}，可选值为 {', '.join(CASSETTE_MODES)}。")
+        return False
+
+    if not getattr(config, 'CASSETTE_PATH', None):
+        config.CASSETTE_PATH = "./cassettes/acme.json"
+
+    if not hasattr(config, 'CASSETTE_SPEED'):
+        config.CASSETTE_SPEED = 0.0
+
+    # 设置日志的默认值
+    if not hasattr(config, 'LOG_QUIET_POLLING'):
+        config.LOG_QUIET_POLLING = False
+
+    # 设置 ACME 网络的默认值
+    if not hasattr(config, 'ACME_DIRECTORY_CACHE_TTL'):
+        config.ACME_DIRECTORY_CACHE_TTL = 86400
+
+    if not getattr(config, 'ACME_DIRECTORY_CACHE_PATH', None):
+        config.ACME_DIRECTORY_CACHE_PATH = os.path.join(config.KEY_PATH, ".acme_directory.json")
+
+    if not hasattr(config, 'ACME_HTTP_POOL_SIZE'):
+        config.ACME_HTTP_POOL_SIZE = 10
+
+    # 设置挑战记录委派和 TTL 的默认值
+    if not hasattr(config, 'ACME_CHALLENGE_ZONE'):
+        config.ACME_CHALLENGE_ZONE = None
+
+    if not hasattr(config, 'ACME_CHALLENGE_TTL'):
+        config.ACME_CHALLENGE_TTL = 600
+
+    if not getattr(config, 'DNS_RESOLVER_URL', None):
+        config.DNS_RESOLVER_URL = "https://dns.alidns.com/resolve"
+
+    # 设置挑战类型策略和 HTTP-01 应答器的默认值
+    if not getattr(config, 'CHALLENGE_POLICY', None):
+        config.CHALLENGE_POLICY = CHALLENGE_POLICY_DNS
+
+    if config.CHALLENGE_POLICY not in CHALLENGE_POLICIES:
+        logger.error(f"CHALLENGE_POLICY 配置无效: {config.CHALLENGE_POLICY}，可选值为 {', '.join(CHALLENGE_POLICIES)}。")
+        return False
+
+    if not hasattr(config, 'CHALLENGE_TYPE_OVERRIDES'):
+        config.CHALLENGE_TYPE_OVERRIDES = {}
+
+    invalid_types = {d: t for d, t in config.CHALLENGE_TYPE_OVERRIDES.items() if t not in CHALLENGE_TYPES}
+    if invalid_types:
+        logger.error(f"CHALLENGE_TYPE_OVERRIDES 配置无效: {invalid_types}，可选值为 {', '.join(CHALLENGE_TYPES)}。")
+        return False
+
+    if not hasattr(config, 'HTTP01_MODE'):
+        config.HTTP01_MODE = None
+
+    if config.HTTP01_MODE not in (None, "standalone", "webroot"):
+        logger.error(f"HTTP01_MODE 配置无效: {config.HTTP01_MODE}，可选值为 standalone, webroot。")
+        return False
+
+    if config.HTTP01_MODE == "webroot" and not getattr(config, 'HTTP01_WEBROOT', None):
+        logger.error("HTTP01_MODE 为 webroot 时必须配置 HTTP01_WEBROOT。")
+        return False
+
+    if not getattr(config, 'HTTP01_HOST', None):
+        config.HTTP01_HOST = "0.0.0.0"
+
+    if not hasattr(config, 'HTTP01_PORT'):
+        config.HTTP01_PORT = 80
+
     # 设置 ACME 目录 URL 的默认值
     if not getattr(config, 'ACME_DIRECTORY_URL', None):
         config.ACME_DIRECTORY_URL = "https://acme-staging-v02.api.letsencrypt.org/directory"
         logger.info(f"ACME_DIRECTORY_URL 未配置，使用默认值: {config.ACME_DIRECTORY_URL}")
 
+    # 设置多 CA 的默认值（ACME_CAS 为空时只使用 ACME_DIRECTORY_URL）
+    if not getattr(config, 'ACME_CAS', None):
+        config.ACME_CAS = []
+
+    for index, ca in enumerate(config.ACME_CAS):
+        if not ca.get('directory_url'):
+            logger.error(f"ACME_CAS 第 {index + 1} 项缺少 directory_url。")
+            return False
+        ca.setdefault('name', f"ca{index + 1}")
+
+    if not getattr(config, 'CA_SELECTION_POLICY', None):
+        config.CA_SELECTION_POLICY = CA_POLICY_FAILOVER
+
+    if config.CA_SELECTION_POLICY not in CA_POLICIES:
+        logger.error(f"CA_SELECTION_POLICY 配置无效: {config.CA_SELECTION_POLICY}，可选值为 {', '.join(CA_POLICIES)}。")
+        return False
+
+    if not hasattr(config, 'CA_FAILOVER_DEADLINE'):
+        config.CA_FAILOVER_DEADLINE = 600
+
+    if not hasattr(config, 'CA_HEDGE_DELAY'):
+        config.CA_HEDGE_DELAY = 120
+
+    if not hasattr(config, 'CA_FAILURE_COOLDOWN'):
+        config.CA_FAILURE_COOLDOWN = 3600
+
     # 设置密钥和证书的默认路径和文件名
     if not hasattr(config, 'ACCOUNT_KEY_NAME'):
         config.ACCOUNT_KEY_NAME = "account.key"
 
-    if not hasattr(config, 'KEY_PATH'):
-        config.KEY_PATH = "./keys"
-    
-    if not hasattr(config, 'CERT_PATH'):
-        config.CERT_PATH = "./certs"
+    _initialize_storage_config(config)
     
     # 根据域名自动生成证书相关文件名
     domain = config.DOMAINS[0]
@@ -71,12 +261,121 @@ def _initialize_config(config, logger):
     config.certificate_path = os.path.join(config.CERT_PATH, config.CERT_NAME)
     config.certificate_chain_path = os.path.join(config.CERT_PATH, config.CERT_CHAIN_NAME)
 
-    # 设置密钥大小和加密密码的默认值
+    # 设置密钥大小的默认值（加密密码的默认值在 _initialize_storage_config 中设置）
     if not hasattr(config, 'CERT_KEY_SIZE'):
         config.CERT_KEY_SIZE = 3072
-    
-    if not hasattr(config, 'COMMON_PASSWORD'):
-        config.COMMON_PASSWORD = None
+
+    # 设置账户密钥类型的默认值
+    if not getattr(config, 'ACME_ACCOUNT_KEY_TYPE', None):
+        config.ACME_ACCOUNT_KEY_TYPE = KEY_TYPE_RSA
+
+    if config.ACME_ACCOUNT_KEY_TYPE not in KEY_TYPES:
+        logger.error(f"ACME_ACCOUNT_KEY_TYPE 配置无效: {config.ACME_ACCOUNT_KEY_TYPE}，可选值为 {', '.join(KEY_TYPES)}。")
+        return False
+
+    # 设置证书私钥复用策略的默认值
+    if not getattr(config, 'CERT_KEY_REUSE_POLICY', None):
+        config.CERT_KEY_REUSE_POLICY = KEY_REUSE_NEW
+
+    if config.CERT_KEY_REUSE_POLICY not in KEY_REUSE_POLICIES:
+        logger.error(f"CERT_KEY_REUSE_POLICY 配置无效: {config.CERT_KEY_REUSE_POLICY}，可选值为 {', '.join(KEY_REUSE_POLICIES)}。")
+        return False
+
+    if not hasattr(config, 'CERT_KEY_MAX_AGE_DAYS'):
+        config.CERT_KEY_MAX_AGE_DAYS = 90
+
+    # 设置证书私钥类型和双算法签发的默认值
+    if not getattr(config, 'CERT_KEY_TYPE', None):
+        config.CERT_KEY_TYPE = KEY_TYPE_RSA
+
+    if config.CERT_KEY_TYPE not in KEY_TYPES:
+        logger.error(f"CERT_KEY_TYPE 配置无效: {config.CERT_KEY_TYPE}，可选值为 {', '.join(KEY_TYPES)}。")
+        return False
+
+    if not getattr(config, 'CERT_EC_CURVE', None):
+        config.CERT_EC_CURVE = "secp256r1"
+
+    if config.CERT_EC_CURVE not in EC_CURVES:
+        logger.error(f"CERT_EC_CURVE 配置无效: {config.CERT_EC_CURVE}，可选值为 {', '.join(EC_CURVES)}。")
+        return False
+
+    if not hasattr(config, 'CERT_DUAL_ALGORITHM'):
+        config.CERT_DUAL_ALGORITHM = False
+
+    if config.CERT_DUAL_ALGORITHM:
+        config.SECONDARY_KEY_TYPE = KEY_TYPE_EC if config.CERT_KEY_TYPE == KEY_TYPE_RSA else KEY_TYPE_RSA
+        _set_secondary_paths(config)
+
+    # 设置部署钩子的默认值
+    if not hasattr(config, 'DEPLOY_TARGETS'):
+        config.DEPLOY_TARGETS = []
+
+    if not hasattr(config, 'DEPLOY_MAX_WORKERS'):
+        config.DEPLOY_MAX_WORKERS = 8
+
+    # 设置部署后 TLS 端点校验的默认值
+    if not hasattr(config, 'VERIFY_ENDPOINTS'):
+        config.VERIFY_ENDPOINTS = []
+
+    if not hasattr(config, 'VERIFY_CONCURRENCY'):
+        config.VERIFY_CONCURRENCY = 200
+
+    if not hasattr(config, 'VERIFY_TIMEOUT'):
+        config.VERIFY_TIMEOUT = 5
+
+    if not hasattr(config, 'VERIFY_ATTEMPTS'):
+        config.VERIFY_ATTEMPTS = 3
+
+    if not hasattr(config, 'VERIFY_RETRY_DELAY'):
+        config.VERIFY_RETRY_DELAY = 2
+
+    # 设置批量吊销的默认值
+    if not hasattr(config, 'REVOKE_MAX_WORKERS'):
+        config.REVOKE_MAX_WORKERS = 8
+
+    if not hasattr(config, 'REVOKE_RATE'):
+        config.REVOKE_RATE = 5
+
+    if not hasattr(config, 'REPLACE_MAX_WORKERS'):
+        config.REPLACE_MAX_WORKERS = 4
+
+    # 设置分片运行的默认值
+    if not hasattr(config, 'SHARD_MAX_WORKERS'):
+        config.SHARD_MAX_WORKERS = 4
+
+    # 设置账户复用和授权预热的默认值
+    if not hasattr(config, 'ACME_ACCOUNT_CACHE'):
+        config.ACME_ACCOUNT_CACHE = False
+
+    if not hasattr(config, 'PREWARM_DAYS'):
+        config.PREWARM_DAYS = 35
+
+    if not hasattr(config, 'PREWARM_MAX_WORKERS'):
+        config.PREWARM_MAX_WORKERS = 4
+
+    # 设置证书链选择的默认值
+    if not getattr(config, 'CHAIN_SELECTION', None):
+        config.CHAIN_SELECTION = CHAIN_POLICY_DEFAULT
+
+    if config.CHAIN_SELECTION not in CHAIN_POLICIES:
+        logger.error(f"CHAIN_SELECTION 配置无效：{config.CHAIN_SELECTION}，可选值为 {', '.join(CHAIN_POLICIES)}。")
+        return False
+
+    if not hasattr(config, 'CHAIN_PREFERRED_ROOT'):
+        config.CHAIN_PREFERRED_ROOT = None
+
+    # 设置残留挑战记录清理的默认值
+    if not hasattr(config, 'STALE_SWEEP_ON_START'):
+        config.STALE_SWEEP_ON_START = False
+
+    if not hasattr(config, 'STALE_RECORD_MAX_AGE'):
+        config.STALE_RECORD_MAX_AGE = 3600
+
+    if not hasattr(config, 'STALE_SWEEP_RATE'):
+        config.STALE_SWEEP_RATE = 5
+
+    if not hasattr(config, 'STALE_SWEEP_MAX_WORKERS'):
+        config.STALE_SWEEP_MAX_WORKERS = 4
 
     # 处理邮件发送配置
     if not hasattr(config, 'SEND_EMAIL'):
@@ -90,6 +389,56 @@ def _initialize_config(config, logger):
     
     return True
 
+def _initialize_storage_config(config):
+    """
+    设置密钥、证书存储目录和证书清单索引的默认值。
+    不依赖云服务商凭证，因此 status 等只读命令也可以单独调用。
+    """
+    if not hasattr(config, 'KEY_PATH'):
+        config.KEY_PATH = "./keys"
+
+    if not hasattr(config, 'CERT_PATH'):
+        config.CERT_PATH = "./certs"
+
+    if not getattr(config, 'INVENTORY_INDEX_PATH', None):
+        config.INVENTORY_INDEX_PATH = os.path.join(config.KEY_PATH, ".inventory.json")
+
+    if not hasattr(config, 'COMMON_PASSWORD'):
+        config.COMMON_PASSWORD = None
+
+    if not getattr(config, 'SAN_PLAN_PATH', None):
+        config.SAN_PLAN_PATH = os.path.join(config.CERT_PATH, ".san_plan.json")
+
+    if not getattr(config, 'REPORT_DIR', None):
+        config.REPORT_DIR = "./reports"
+
+    if not getattr(config, 'LOCK_DIR', None):
+        config.LOCK_DIR = "./locks"
+
+    if not getattr(config, 'PROFILE_DIR', None):
+        config.PROFILE_DIR = os.path.join(config.REPORT_DIR, "profiles")
+
+    if not getattr(config, 'JOURNAL_DIR', None):
+        config.JOURNAL_DIR = os.path.join(config.LOCK_DIR, "runs")
+
+    if not getattr(config, 'ACCOUNT_CACHE_DIR', None):
+        config.ACCOUNT_CACHE_DIR = os.path.join(config.KEY_PATH, "accounts")
+
+    if not getattr(config, 'CA_HEALTH_PATH', None):
+        config.CA_HEALTH_PATH = os.path.join(config.KEY_PATH, ".ca_health.json")
+
+    if not getattr(config, 'CHAIN_SELECTION_CACHE_PATH', None):
+        config.CHAIN_SELECTION_CACHE_PATH = os.path.join(config.KEY_PATH, ".chain_selection.json")
+
+    if not getattr(config, 'QUOTA_LEDGER_PATH', None):
+        config.QUOTA_LEDGER_PATH = os.path.join(config.KEY_PATH, ".quota_ledger.json")
+
+    if not hasattr(config, 'CHAIN_STORE'):
+        config.CHAIN_STORE = False
+
+    if not getattr(config, 'CHAIN_STORE_DIR', None):
+        config.CHAIN_STORE_DIR = os.path.join(config.CERT_PATH, ".chains")
+
 def _read_log_file(log_path, logger):
     """
     读取日志文件内容。
@@ -156,18 +505,14 @@ def _send_notification_email(success, config, logger):
     attachments = []
     if success:
         # 从配置中获取附件路径
-        attachments_to_send = [
-            config.account_key_path,
-            config.cert_key_path,
-            config.certificate_path,
-            config.certificate_chain_path
-        ]
+        attachments_to_send = [config.account_key_path] + _certificate_files(config)
         attachments = [f for f in attachments_to_send if os.path.exists(f)]
         if len(attachments) != len(attachments_to_send):
             logger.warning("一个或多个证书/密钥文件未找到，邮件附件可能不完整。")
     
-    # 读取日志并创建邮件正文
-    log_content = _read_log_file(LOG_FILE, logger)
+    # 等待异步日志写入完成后再读取日志并创建邮件正文
+    logger.complete()
+    log_content = _read_log_file(config.LOG_FILE, logger)
     email_body_html = _create_email_html_body(success, config, log_content)
 
     logger.info(f"准备发送通知邮件 (状态: {status_text})...")
@@ -186,75 +531,345 @@ def _send_notification_email(success, config, logger):
     except Exception as e:
         logger.error(f"发送邮件时发生错误: {e}", exc_info=True)
 
-def _setup_logging(log_file, logger_obj):
+LOG_FORMAT = "{time:YYYY-MM-DD HH:mm:ss.SSS Z} <level>{level}</level> {file.name}/{function} {message}"
+
+def _setup_logging(log_file, logger_obj, config_obj=None):
     """
-    配置 loguru 日志，包括标准输出和文件输出。
+    配置 loguru 日志，包括标准输出、文件输出和可选的结构化 JSON 输出。
+    所有处理器都通过后台线程异步写入（enqueue=True），日志 I/O 和格式化不会阻塞证书申请流程。
     """
+    level = getattr(config_obj, 'LOG_LEVEL', "INFO")
     logger_obj.remove()  # 移除默认的处理器
-    logger_obj.add(sys.stderr, format="{time:YYYY-MM-DD HH:mm:ss.SSS Z} <level>{level}</level> {file.name}/{function} {message}")
+    logger_obj.configure(extra={"cert": "-", "run_id": getattr(config_obj, 'RUN_ID', "-")})
+    logger_obj.add(sys.stderr, level=level, format=LOG_FORMAT, enqueue=True)
     # 将日志也输出到文件，以便在邮件中发送
-    logger_obj.add(log_file, format="{time:YYYY-MM-DD HH:mm:ss.SSS Z} <level>{level}</level> {file.name}/{function} {message}", encoding="utf-8", mode="w")
+    logger_obj.add(log_file, level=level, format=LOG_FORMAT, encoding="utf-8", mode="w", enqueue=True)
+
+    # 结构化 JSON 日志（每行一条记录，包含 cert、run_id 等上下文字段），按大小轮转并压缩
+    json_log_path = getattr(config_obj, 'LOG_JSON_PATH', None)
+    if json_log_path:
+        logger_obj.add(
+            json_log_path,
+            level=level,
+            serialize=True,
+            rotation=getattr(config_obj, 'LOG_ROTATION', "20 MB"),
+            retention=getattr(config_obj, 'LOG_RETENTION', 10),
+            compression=getattr(config_obj, 'LOG_COMPRESSION', "gz"),
+            encoding="utf-8",
+            enqueue=True
+        )
     logger_obj.info("开始执行 ACME 证书申请流程...")
 
-def _initialize_services(config_obj, logger_obj):
+def _create_lock_manager(config_obj):
     """
-    初始化阿里云 DNS 管理器和 ACME 客户端。
-    返回 AliyunDNSManager 和 AcmeClient 实例，如果初始化失败则返回 None, None。
+    创建跨进程锁：LOCK_BACKEND 为 None 时使用 LOCK_DIR 中的文件锁。
     """
-    try:
-        aliyun_manager = AliyunDNSManager(
+    return LockManager(
+        backend=config_obj.LOCK_BACKEND or FileLockBackend(config_obj.LOCK_DIR),
+        timeout=config_obj.LOCK_TIMEOUT
+    )
+
+def _create_dns_manager(config_obj, metrics, cassette):
+    """
+    创建阿里云 DNS 管理器。配置了 ALIYUN_DNS_ACCOUNTS 时返回按区域路由的 AliyunDNSRouter，
+    每个账号使用独立的客户端、限速器和解析记录索引；否则返回默认账号的 AliyunDNSManager。
+    """
+    default = None
+    if getattr(config_obj, 'ALIYUN_ACCESS_KEY_ID', None) and getattr(config_obj, 'ALIYUN_ACCESS_KEY_SECRET', None):
+        default = AliyunDNSManager(
             access_key_id=config_obj.ALIYUN_ACCESS_KEY_ID,
             access_key_secret=config_obj.ALIYUN_ACCESS_KEY_SECRET,
-            endpoint=config_obj.ALIYUN_DNS_ENDPOINT
+            endpoint=config_obj.ALIYUN_DNS_ENDPOINT,
+            metrics=metrics,
+            cassette=cassette,
+            rate=config_obj.ALIYUN_DNS_RATE
         )
+    if not config_obj.ALIYUN_DNS_ACCOUNTS:
+        return default
+
+    accounts = {}
+    for name, account in config_obj.ALIYUN_DNS_ACCOUNTS.items():
+        manager = AliyunDNSManager(
+            access_key_id=account['access_key_id'],
+            access_key_secret=account['access_key_secret'],
+            endpoint=account.get('endpoint') or config_obj.ALIYUN_DNS_ENDPOINT,
+            metrics=metrics,
+            cassette=cassette,
+            rate=account.get('rate', config_obj.ALIYUN_DNS_RATE)
+        )
+        accounts[name] = (manager, account.get('zones', []))
+    return AliyunDNSRouter(default=default, accounts=accounts)
+
+def _initialize_services(config_obj, logger_obj, journal=None):
+    """
+    初始化阿里云 DNS 管理器和 ACME 客户端，两者共享同一个 API 调用统计（acme_client.metrics）。
+    返回 AcmeClient 实例，如果初始化失败则返回 None。
+    """
+    try:
+        metrics = ApiMetrics()
+        cassette = None
+        if config_obj.CASSETTE_MODE:
+            cassette = Cassette(config_obj.CASSETTE_PATH, config_obj.CASSETTE_MODE, speed=config_obj.CASSETTE_SPEED)
+            logger_obj.info(f"已启用 cassette {config_obj.CASSETTE_MODE} 模式：{config_obj.CASSETTE_PATH}")
+        lock_manager = _create_lock_manager(config_obj)
+        aliyun_manager = _create_dns_manager(config_obj, metrics, cassette)
+        challenge_delegation = None
+        if config_obj.ACME_CHALLENGE_ZONE:
+            challenge_delegation = ChallengeDelegation(
+                challenge_zone=config_obj.ACME_CHALLENGE_ZONE,
+                resolver_url=config_obj.DNS_RESOLVER_URL
+            )
+            if cassette is not None:
+                cassette.mount(challenge_delegation._session)
+            logger_obj.info(f"已启用挑战记录委派，验证区域：{config_obj.ACME_CHALLENGE_ZONE}")
+        http01_responder = None
+        if config_obj.HTTP01_MODE == "standalone":
+            http01_responder = StandaloneHttp01Responder(host=config_obj.HTTP01_HOST, port=config_obj.HTTP01_PORT)
+        elif config_obj.HTTP01_MODE == "webroot":
+            http01_responder = WebrootHttp01Responder(config_obj.HTTP01_WEBROOT)
         acme_client = AcmeClient(
             acme_directory_url=config_obj.ACME_DIRECTORY_URL,
-            aliyun_dns_manager=aliyun_manager
+            aliyun_dns_manager=aliyun_manager,
+            challenge_delegation=challenge_delegation,
+            challenge_ttl=config_obj.ACME_CHALLENGE_TTL,
+            lock_manager=lock_manager,
+            journal=journal,
+            directory_cache=DirectoryCache(config_obj.ACME_DIRECTORY_CACHE_PATH, ttl=config_obj.ACME_DIRECTORY_CACHE_TTL),
+            http_pool_size=config_obj.ACME_HTTP_POOL_SIZE,
+            poll_log_level="DEBUG" if config_obj.LOG_QUIET_POLLING else "INFO",
+            metrics=metrics,
+            cassette=cassette,
+            challenge_policy=config_obj.CHALLENGE_POLICY,
+            challenge_overrides=config_obj.CHALLENGE_TYPE_OVERRIDES,
+            http01_responder=http01_responder,
+            chain_selector=_create_chain_selector(config_obj),
+            account_key_type=config_obj.ACME_ACCOUNT_KEY_TYPE
         )
+        if config_obj.ACME_ACCOUNT_CACHE and not config_obj.ACME_CAS:
+            # 复用缓存的 ACME 账户，使预热的授权在续期时仍然有效
+            acme_client = acme_client.for_ca(
+                "default", config_obj.ACME_DIRECTORY_URL,
+                account_cache=AccountCache(config_obj.ACCOUNT_CACHE_DIR, password=config_obj.COMMON_PASSWORD)
+            )
         logger_obj.info("服务初始化成功。")
         return acme_client
     except Exception as e:
         logger_obj.error(f"服务初始化失败: {e}")
         return None
 
-def _execute_acme_process(acme_client_obj, config_obj, logger_obj):
+def _create_chain_selector(config_obj):
+    """
+    根据配置创建证书链选择器。使用默认证书链且未指定首选根证书时返回 None。
+    """
+    if config_obj.CHAIN_SELECTION == CHAIN_POLICY_DEFAULT and not config_obj.CHAIN_PREFERRED_ROOT:
+        return None
+    return ChainSelector(
+        cache_path=config_obj.CHAIN_SELECTION_CACHE_PATH,
+        policy=config_obj.CHAIN_SELECTION,
+        preferred_root=config_obj.CHAIN_PREFERRED_ROOT
+    )
+
+def _run_deploy_hooks(config_obj, logger_obj):
+    """
+    将本次申请的证书部署到所有配置的目标。部署失败不影响证书申请结果。
+    """
+    try:
+        runner = DeployHookRunner(config_obj.DEPLOY_TARGETS, max_workers=config_obj.DEPLOY_MAX_WORKERS,
+                                  chain_store=_chain_store(config_obj))
+        certificates = [{
+            "domains": config_obj.DOMAINS,
+            "files": _certificate_files(config_obj)
+        }]
+        results = runner.deploy(certificates)
+        if not all(result["success"] for result in results):
+            logger_obj.warning("部分部署目标执行失败，请检查日志。")
+    except Exception as e:
+        logger_obj.error(f"执行部署钩子时发生错误: {e}")
+
+def _verify_endpoints(config_obj, logger_obj):
+    """
+    校验 VERIFY_ENDPOINTS 中的端点是否已经在提供新证书。校验结果只写入运行报告，不影响证书申请结果。
+    """
+    try:
+        verifier = TlsEndpointVerifier(
+            concurrency=config_obj.VERIFY_CONCURRENCY,
+            timeout=config_obj.VERIFY_TIMEOUT,
+            attempts=config_obj.VERIFY_ATTEMPTS,
+            retry_delay=config_obj.VERIFY_RETRY_DELAY
+        )
+        certificate_paths = [config_obj.certificate_path]
+        if config_obj.CERT_DUAL_ALGORITHM:
+            certificate_paths.append(config_obj.secondary_certificate_path)
+        summary = verifier.verify(certificate_paths, config_obj.VERIFY_ENDPOINTS, domains=config_obj.DOMAINS)
+        if summary["mismatched"] or summary["errors"]:
+            logger_obj.warning("部分端点仍未提供新证书，请检查部署目标和重载命令。")
+        return summary
+    except Exception as e:
+        logger_obj.error(f"校验 TLS 端点时发生错误: {e}")
+        return {"error": str(e)}
+
+def _create_quota_forecaster(config_obj):
+    """
+    根据配置创建配额预测器。
+    """
+    return QuotaForecaster(
+        ledger_path=config_obj.QUOTA_LEDGER_PATH,
+        quotas=config_obj.QUOTAS,
+        delegated=bool(config_obj.ACME_CHALLENGE_ZONE),
+        lock_manager=_create_lock_manager(config_obj)
+    )
+
+def _record_quota_usage(forecaster, metrics, logger_obj, run_id=None, cassette=None):
+    """
+    将本次运行实际的订单数、授权数（按挑战应答次数统计）和 DNS API 调用次数写入配额台账，替换准入时的预留。
+    回放 cassette 时请求并未真正发送，只删除预留，不计入台账。
+    :return: 实际消耗；回放时返回 None。
+    """
+    if cassette is not None and not cassette.recording:
+        forecaster.release(run_id)
+        return None
+    usage = {
+        "orders": metrics.total("acme", "newOrder"),
+        "new_authorizations": metrics.total("acme", "challenge"),
+        "dns_api_calls": metrics.total("aliyun_dns")
+    }
+    forecaster.record(usage, run_id=run_id)
+    logger_obj.info(f"本次运行实际消耗：{usage}")
+    return usage
+
+def _run_bootstrap(acme_client_obj, config_obj, logger_obj, profiler=None):
+    """
+    启动阶段：并行执行 ACME 目录和账户初始化、阿里云凭证和区域预检、证书私钥准备和证书清单扫描，
+    任何致命预检失败都会在创建订单之前立即中止。多 CA 时 ACME 账户和证书私钥由各 CA 的申请流程自行处理。
+    返回 (证书私钥是否已准备好, 各任务耗时)。
+    :param profiler: (可选) PhaseProfiler，各任务在自己的线程中作为子阶段 bootstrap.<任务名> 分析。
+    :raises PreflightError: 第一个失败的致命预检。
+    """
+    bootstrap = Bootstrap(profiler=profiler)
+    if not config_obj.ACME_CAS:
+        def acme_account():
+            acme_client_obj._init_acme_client()
+            acme_client_obj.register_acme_account(email=config_obj.ACME_CONTACT_EMAIL)
+
+        bootstrap.add("acme_account", acme_account)
+        bootstrap.add("cert_key", lambda: acme_client_obj.prepare_cert_key(
+            cert_key_path=config_obj.cert_key_path,
+            key_size=config_obj.CERT_KEY_SIZE,
+            password=config_obj.COMMON_PASSWORD,
+            reuse_policy=config_obj.CERT_KEY_REUSE_POLICY,
+            max_age_days=config_obj.CERT_KEY_MAX_AGE_DAYS,
+            key_type=config_obj.CERT_KEY_TYPE,
+            ec_curve=config_obj.CERT_EC_CURVE
+        ))
+
+    def dns_zones():
+        # 凭证无效或区域不存在时，DescribeDomainInfo 会立即返回错误
+        zones = acme_client_obj.dns_zones_for(config_obj.DOMAINS)
+        with ThreadPoolExecutor(max_workers=max(1, min(8, len(zones))), thread_name_prefix="preflight") as executor:
+            list(executor.map(acme_client_obj.aliyun_dns_manager.describe_domain, zones))
+        return zones
+
+    bootstrap.add("dns_zones", dns_zones)
+    bootstrap.add("inventory_scan", lambda: _create_inventory(config_obj).scan(), fatal=False)
+    if config_obj.STALE_SWEEP_ON_START:
+        bootstrap.add("stale_sweep", lambda: _create_sweeper(acme_client_obj, config_obj).sweep(), fatal=False)
+    bootstrap.run()
+    return not config_obj.ACME_CAS, bootstrap.timings
+
+def _phase(profiler, name, **kwargs):
+    """
+    返回分析指定阶段的上下文管理器，未启用性能分析时不做任何事。
+    """
+    return profiler.phase(name, **kwargs) if profiler is not None else nullcontext()
+
+def _execute_acme_process(acme_client_obj, config_obj, logger_obj, key_prepared=False, profiler=None):
     """
     执行 ACME 证书申请的核心流程。
+    :param key_prepared: 证书私钥是否已在启动阶段准备好。
+    :param profiler: (可选) PhaseProfiler，按阶段进行性能分析。
     返回 (process_success: bool, cleanup_list: list)。
     """
     cleanup = []
     process_success = False
     try:
         logger_obj.info("开始 ACME 流程...")
+        # 启动阶段已完成时两者都直接返回，账户初始化和注册的分析结果见 bootstrap.acme_account
         acme_client_obj._init_acme_client()
         acme_client_obj.register_acme_account(email=config_obj.ACME_CONTACT_EMAIL)
         
-        order = acme_client_obj.create_acme_order(
-            domains=config_obj.DOMAINS,
-            key_size=config_obj.CERT_KEY_SIZE
-        )
-        
-        challenges_map = acme_client_obj.get_dns_challenges(order)
-        
-        cleanup = acme_client_obj.perform_dns_challenge(challenges_map)
+        with _phase(profiler, "create_acme_order"):
+            order = acme_client_obj.create_acme_order(
+                domains=config_obj.DOMAINS,
+                cert_key_path=config_obj.cert_key_path,
+                key_size=config_obj.CERT_KEY_SIZE,
+                password=config_obj.COMMON_PASSWORD,
+                reuse_policy=config_obj.CERT_KEY_REUSE_POLICY,
+                max_age_days=config_obj.CERT_KEY_MAX_AGE_DAYS,
+                key_type=config_obj.CERT_KEY_TYPE,
+                ec_curve=config_obj.CERT_EC_CURVE,
+                key_prepared=key_prepared
+            )
         
-        cert_retrieved = acme_client_obj.finalize_order_and_fetch_certificate(order, config_obj.DOMAINS)
+        with _phase(profiler, "perform_dns_challenge"):
+            challenges_map = acme_client_obj.get_challenges(order)
+            cleanup = acme_client_obj.perform_challenges(challenges_map)
+
+        secondary = None
+        with _phase(profiler, "finalize"):
+            if config_obj.CERT_DUAL_ALGORITHM:
+                secondary, secondary_order = _create_secondary_order(acme_client_obj, config_obj, cleanup, logger_obj)
+                # 两个订单的授权均已有效，并行最终确定订单并下载证书
+                acme_client_obj.prefetch_nonces(2)
+                with ThreadPoolExecutor(max_workers=2, thread_name_prefix="finalize") as executor:
+                    primary_future = executor.submit(acme_client_obj.finalize_order_and_fetch_certificate, order, config_obj.DOMAINS)
+                    secondary_future = executor.submit(secondary.finalize_order_and_fetch_certificate, secondary_order, config_obj.DOMAINS)
+                    cert_retrieved = primary_future.result() and secondary_future.result()
+            else:
+                cert_retrieved = acme_client_obj.finalize_order_and_fetch_certificate(order, config_obj.DOMAINS)
 
-        if cert_retrieved:
+        if cert_retrieved and not acme_client_obj.claim_result():
+            logger_obj.info("其他 CA 已先完成签发，丢弃本次获取的证书。")
+        elif cert_retrieved:
             logger_obj.info("证书申请成功！")
             
             # 保存密钥和证书
             logger_obj.info("开始保存密钥和证书...")
-            save_success = acme_client_obj.key_manager.save_keys_and_certificate(
-                account_key_path=config_obj.account_key_path,
-                cert_key_path=config_obj.cert_key_path,
-                certificate_path=config_obj.certificate_path,
-                certificate_chain_path=config_obj.certificate_chain_path,
-                common_password=config_obj.COMMON_PASSWORD
-            )
-            
-            if not save_success:
-                 logger_obj.warning("未能成功保存所有密钥和证书文件，请检查日志。")
+            with _phase(profiler, "save"):
+                save_success = acme_client_obj.key_manager.save_keys_and_certificate(
+                    account_key_path=config_obj.account_key_path,
+                    cert_key_path=config_obj.cert_key_path,
+                    certificate_path=config_obj.certificate_path,
+                    certificate_chain_path=config_obj.certificate_chain_path,
+                    common_password=config_obj.COMMON_PASSWORD,
+                    chain_store=_chain_store(config_obj)
+                )
+
+                if secondary is not None:
+                    save_success = secondary.key_manager.save_keys_and_certificate(
+                        account_key_path=config_obj.account_key_path,
+                        cert_key_path=config_obj.secondary_cert_key_path,
+                        certificate_path=config_obj.secondary_certificate_path,
+                        certificate_chain_path=config_obj.secondary_certificate_chain_path,
+                        common_password=config_obj.COMMON_PASSWORD,
+                        chain_store=_chain_store(config_obj)
+                    ) and save_success
+
+                if not save_success:
+                     logger_obj.warning("未能成功保存所有密钥和证书文件，请检查日志。")
+
+                changed_files = acme_client_obj.key_manager.changed_files
+                if secondary is not None:
+                    changed_files += [f for f in secondary.key_manager.changed_files if f not in changed_files]
+                if changed_files:
+                    logger_obj.info(f"本次共有 {len(changed_files)} 个文件发生变化：{', '.join(changed_files)}")
+                    # 刷新证书清单索引，使 status 命令能立即看到新证书
+                    _create_inventory(config_obj).scan()
+                else:
+                    logger_obj.info("密钥和证书文件均未变化。")
+
+            if config_obj.DEPLOY_TARGETS:
+                with _phase(profiler, "deploy"):
+                    _run_deploy_hooks(config_obj, logger_obj)
             
             process_success = True
         else:
@@ -265,12 +880,649 @@ def _execute_acme_process(acme_client_obj, config_obj, logger_obj):
     finally:
         return process_success, cleanup
 
-def main():
+def _create_secondary_order(acme_client_obj, config_obj, cleanup, logger_obj):
+    """
+    双算法签发：为同一组域名创建使用另一种密钥类型的第二个订单。
+    第一个订单的挑战刚刚通过，同一账户的授权会被 ACME 服务器复用，通常不需要再次验证；
+    仍处于待验证状态的授权会在这里完成挑战，新增的 DNS 记录追加到 cleanup 中。
+    返回 (派生的 AcmeClient, 第二个订单)。
+    """
+    logger_obj.info(f"双算法签发：为相同的域名申请 {config_obj.SECONDARY_KEY_TYPE.upper()} 证书...")
+    secondary = acme_client_obj.fork()
+    secondary_order = secondary.create_acme_order(
+        domains=config_obj.DOMAINS,
+        cert_key_path=config_obj.secondary_cert_key_path,
+        key_size=config_obj.CERT_KEY_SIZE,
+        password=config_obj.COMMON_PASSWORD,
+        reuse_policy=config_obj.CERT_KEY_REUSE_POLICY,
+        max_age_days=config_obj.CERT_KEY_MAX_AGE_DAYS,
+        key_type=config_obj.SECONDARY_KEY_TYPE,
+        ec_curve=config_obj.CERT_EC_CURVE
+    )
+    challenges_map = secondary.get_challenges(secondary_order)
+    if challenges_map:
+        logger_obj.info(f"第二个订单仍有 {len(challenges_map)} 个授权需要验证。")
+        cleanup.extend(secondary.perform_challenges(challenges_map))
+    return secondary, secondary_order
+
+def _execute_multi_ca_process(acme_client_obj, config_obj, logger_obj):
+    """
+    按 CA_SELECTION_POLICY 向 ACME_CAS 中的多个 CA 申请证书。每个 CA 的挑战记录在各自的尝试结束时清理。
+    返回 (process_success: bool, 胜出 CA 的 AcmeClient 或 None)。
+    """
+    health = CaHealth(config_obj.CA_HEALTH_PATH, cooldown=config_obj.CA_FAILURE_COOLDOWN)
+    account_cache = AccountCache(config_obj.ACCOUNT_CACHE_DIR, password=config_obj.COMMON_PASSWORD)
+    issuer = MultiCaIssuer(
+        cas=config_obj.ACME_CAS,
+        policy=config_obj.CA_SELECTION_POLICY,
+        deadline=config_obj.CA_FAILOVER_DEADLINE,
+        hedge_delay=config_obj.CA_HEDGE_DELAY,
+        health=health
+    )
+    clients = {}
+
+    def attempt(ca, race):
+        client = acme_client_obj.for_ca(
+            ca["name"], ca["directory_url"], eab_kid=ca.get("eab_kid"), eab_hmac_key=ca.get("eab_hmac_key"),
+            account_cache=account_cache, race=race
+        )
+        clients[ca["name"]] = client
+        with logger_obj.contextualize(ca=ca["name"]):
+            success, cleanup = _execute_acme_process(client, config_obj, logger_obj)
+            if cleanup:
+                client.cleanup_dns_records(cleanup)
+        return success
+
+    winner = issuer.issue(attempt)
+    return winner is not None, clients.get(winner)
+
+# 同一进程中的所有证书（包括分片运行时的并发任务）共用同一个 ChainStore，保证清单更新互斥
+_chain_stores = {}
+_chain_stores_lock = threading.Lock()
+
+def _chain_store(config_obj):
+    """
+    根据配置返回证书链存储，未启用 CHAIN_STORE 时返回 None。
+    """
+    if not config_obj.CHAIN_STORE:
+        return None
+    store_dir = os.path.abspath(config_obj.CHAIN_STORE_DIR)
+    with _chain_stores_lock:
+        if store_dir not in _chain_stores:
+            _chain_stores[store_dir] = ChainStore(store_dir)
+        return _chain_stores[store_dir]
+
+def _create_inventory(config_obj):
+    """
+    根据配置创建证书清单索引。
+    """
+    return CertInventory(
+        cert_path=config_obj.CERT_PATH,
+        key_path=config_obj.KEY_PATH,
+        index_path=config_obj.INVENTORY_INDEX_PATH,
+        password=config_obj.COMMON_PASSWORD
+    )
+
+def _run_status(days, config_obj, logger_obj):
+    """
+    status 命令：扫描证书清单，输出指定天数内过期的证书。
+    """
+    logger_obj.remove()
+    logger_obj.add(sys.stderr, level="WARNING", format=LOG_FORMAT)
+
+    _initialize_storage_config(config_obj)
+    inventory = _create_inventory(config_obj)
+    inventory.scan()
+
+    expiring = inventory.expiring_within(days)
+    total = len(inventory.certificates())
+    print(f"共 {total} 张证书，其中 {len(expiring)} 张将在 {days} 天内过期：")
+    for cert in expiring:
+        print(f"{format_expiry(cert['not_after'])}  {cert['key_type']:<16} {cert['path']}  {', '.join(cert['sans'])}")
+
+def _run_plan(dry_run, config_obj, logger_obj):
+    """
+    plan 命令：根据 HOSTNAME_INVENTORY 增量更新 SAN 打包计划，输出需要（重新）签发的证书。
+    """
+    logger_obj.remove()
+    logger_obj.add(sys.stderr, level="WARNING", format=LOG_FORMAT)
+
+    _initialize_storage_config(config_obj)
+    inventory = getattr(config_obj, 'HOSTNAME_INVENTORY', None)
+    if not inventory:
+        print("HOSTNAME_INVENTORY 未配置，无法规划。")
+        return
+
+    planner = SanPlanner(
+        plan_path=config_obj.SAN_PLAN_PATH,
+        max_sans=getattr(config_obj, 'SAN_PLAN_MAX_SANS', 100),
+        wildcard_threshold=getattr(config_obj, 'SAN_PLAN_WILDCARD_THRESHOLD', None)
+    )
+    result = planner.plan(inventory)
+    if not dry_run:
+        planner.save()
+
+    print(f"共 {len(planner.certificates)} 张证书：新增 {len(result['added'])} 张，变更 {len(result['changed'])} 张，"
+          f"移除 {len(result['removed'])} 张，未变化 {len(result['unchanged'])} 张。")
+    for cert in planner.reissue_list(result):
+        print(f"需要签发  {cert['id']}  ({len(cert['domains'])} 个 SAN)  {', '.join(cert['domains'][:5])}{' ...' if len(cert['domains']) > 5 else ''}")
+    for cert_id in result["removed"]:
+        print(f"已移除    {cert_id}")
+
+def _copy_config(config_obj):
+    """
+    复制配置，用于为单张证书派生独立的配置。
+    """
+    return types.SimpleNamespace(**{k: v for k, v in vars(config_obj).items() if not k.startswith("__")})
+
+def _certificate_config(config_obj, cert):
+    """
+    根据证书清单中的一张证书派生配置：域名和文件路径取自该证书，并始终使用新的证书私钥。
+    """
+    cert_config = _copy_config(config_obj)
+    cert_config.DOMAINS = cert["sans"]
+    cert_config.cert_key_path = cert["key_path"]
+    cert_config.certificate_path = cert["path"]
+    cert_config.certificate_chain_path = cert["chain_path"]
+    cert_config.CERT_KEY_REUSE_POLICY = KEY_REUSE_NEW
+    # 替换证书沿用原证书的密钥类型，且只签发这一张
+    cert_config.CERT_DUAL_ALGORITHM = False
+    key_type, _, key_param = cert.get("key_type", "").partition("-")
+    if key_type == "EC" and key_param in EC_CURVES:
+        cert_config.CERT_KEY_TYPE, cert_config.CERT_EC_CURVE = KEY_TYPE_EC, key_param
+    elif key_type == "RSA":
+        cert_config.CERT_KEY_TYPE, cert_config.CERT_KEY_SIZE = KEY_TYPE_RSA, int(key_param)
+    return cert_config
+
+def _issue_replacement(acme_client_obj, config_obj, cert, logger_obj):
+    """
+    为已吊销的证书重新签发一张使用新私钥的证书，覆盖原来的文件。
+    """
+    forked = acme_client_obj.fork()
+    cert_config = _certificate_config(config_obj, cert)
+    with logger_obj.contextualize(cert=cert["sans"][0]):
+        success, cleanup = _execute_acme_process(forked, cert_config, logger_obj)
+        if cleanup:
+            forked.cleanup_dns_records(cleanup)
+    return {"path": cert["path"], "sans": cert["sans"], "success": success}
+
+def _run_revoke(args, config_obj, logger_obj):
+    """
+    revoke 命令：并发吊销证书，并在每张证书吊销成功后立即排队使用新私钥重新签发。
+    """
+    config_obj.RUN_ID = create_run_id()
+    config_obj.LOG_FILE = os.path.join(getattr(config_obj, 'LOG_DIR', LOG_DIR), f"revoke-{config_obj.RUN_ID}.log")
+    _setup_logging(config_obj.LOG_FILE, logger_obj, config_obj)
+    if not _initialize_config(config_obj, logger_obj):
+        logger_obj.error("配置初始化失败，程序退出。")
+        return
+
+    inventory = _create_inventory(config_obj)
+    inventory.scan()
+    certificates = inventory.certificates()
+    if not args.all:
+        wanted = {os.path.abspath(path) for path in args.paths}
+        certificates = [cert for cert in certificates
+                        if os.path.abspath(cert["path"]) in wanted or os.path.abspath(cert["chain_path"]) in wanted]
+    if not certificates:
+        logger_obj.error("没有找到需要吊销的证书。请指定证书文件路径，或使用 --all 吊销 CERT_PATH 中的所有证书。")
+        return
+
+    report = RunReport(os.path.join(config_obj.REPORT_DIR, f"revoke-{config_obj.RUN_ID}.json"), config_obj.RUN_ID)
+    journal = RunJournal(config_obj.JOURNAL_DIR, config_obj.RUN_ID)
+    acme_client = _initialize_services(config_obj, logger_obj, journal)
+    if acme_client is None:
+        journal.finish()
+        return
+
+    revoker = BulkRevoker(
+        directory_url=config_obj.ACME_DIRECTORY_URL,
+        reason=args.reason,
+        max_workers=config_obj.REVOKE_MAX_WORKERS,
+        rate=config_obj.REVOKE_RATE,
+        password=config_obj.COMMON_PASSWORD,
+        directory_cache=DirectoryCache(config_obj.ACME_DIRECTORY_CACHE_PATH, ttl=config_obj.ACME_DIRECTORY_CACHE_TTL),
+        metrics=acme_client.metrics
+    )
+
+    replacements = []
+    with ThreadPoolExecutor(max_workers=config_obj.REPLACE_MAX_WORKERS, thread_name_prefix="replace") as executor:
+        on_revoked = None
+        if not args.no_replace:
+            acme_client._init_acme_client()
+            acme_client.register_acme_account(email=config_obj.ACME_CONTACT_EMAIL)
+            acme_client.prefetch_nonces(min(config_obj.REPLACE_MAX_WORKERS, len(certificates)))
+
+            def on_revoked(cert, _result):
+                if cert.get("sans") and cert.get("key_path"):
+                    replacements.append(executor.submit(_issue_replacement, acme_client, config_obj, cert, logger_obj))
+
+        revocations = revoker.revoke_all(certificates, on_revoked=on_revoked)
+
+    replaced = [future.result() for future in replacements]
+    if replaced:
+        logger_obj.info(f"重新签发完成：成功 {sum(1 for r in replaced if r['success'])} 张，共 {len(replaced)} 张。")
+    journal.finish()
+
+    report.set("revocations", revocations)
+    report.set("replacements", replaced)
+    report.set("api_calls", acme_client.metrics.snapshot())
+    if acme_client.chain_selector is not None:
+        report.set("chain_selection", acme_client.chain_selector.snapshot())
+    report.save()
+    logger_obj.complete()
+
+def _planned_certificate_config(config_obj, cert):
+    """
+    根据 SAN 打包计划中的一张证书派生配置：域名取自计划，文件以证书 ID 命名（例如 example.com_default_001.crt）。
+    """
+    cert_config = _copy_config(config_obj)
+    cert_config.DOMAINS = cert["domains"]
+    cert_config.cert_key_path = os.path.join(config_obj.KEY_PATH, f"{cert['id']}.key")
+    cert_config.certificate_path = os.path.join(config_obj.CERT_PATH, f"{cert['id']}.crt")
+    cert_config.certificate_chain_path = os.path.join(config_obj.CERT_PATH, f"{cert['id']}-chain.crt")
+    if cert_config.CERT_DUAL_ALGORITHM:
+        _set_secondary_paths(cert_config)
+    return cert_config
+
+def _issue_planned_certificate(acme_client_obj, config_obj, cert, logger_obj):
+    """
+    签发 SAN 打包计划中的一张证书。
+    """
+    cert_config = _planned_certificate_config(config_obj, cert)
+    with logger_obj.contextualize(cert=cert["id"]):
+        if cert_config.ACME_CAS:
+            success, _ = _execute_multi_ca_process(acme_client_obj, cert_config, logger_obj)
+        else:
+            forked = acme_client_obj.fork()
+            success, cleanup = _execute_acme_process(forked, cert_config, logger_obj)
+            if cleanup:
+                forked.cleanup_dns_records(cleanup)
+        result = {"id": cert["id"], "domains": cert["domains"], "success": success}
+        if success and cert_config.VERIFY_ENDPOINTS:
+            result["tls_verification"] = _verify_endpoints(cert_config, logger_obj)
+    return result
+
+def _run_shard(index, count, config_obj, logger_obj):
+    """
+    --shard i/N：签发 SAN 打包计划中属于第 i 个分片的证书。
+    证书按主域名所在区域的稳定哈希分配到分片，N 个并行任务（或主机）各自处理互不重叠的证书，
+    运行报告单独保存，之后可以使用 merge-reports 命令合并。
+    """
+    config_obj.RUN_ID = create_run_id()
+    config_obj.LOG_FILE = os.path.join(getattr(config_obj, 'LOG_DIR', LOG_DIR), f"shard-{index}of{count}-{config_obj.RUN_ID}.log")
+    _setup_logging(config_obj.LOG_FILE, logger_obj, config_obj)
+    if not _initialize_config(config_obj, logger_obj):
+        logger_obj.error("配置初始化失败，程序退出。")
+        return
+
+    planner = SanPlanner(plan_path=config_obj.SAN_PLAN_PATH)
+    certificates = [dict(cert, id=cert_id) for cert_id, cert in sorted(planner.certificates.items())]
+    if not certificates:
+        logger_obj.error(f"SAN 打包计划为空，请先运行 python main.py plan。位置：{config_obj.SAN_PLAN_PATH}")
+        return
+    selected = select_shard(certificates, index, count)
+    logger_obj.info(f"[分片]分片 {index}/{count}：计划中共 {len(certificates)} 张证书，本分片处理 {len(selected)} 张。")
+
+    report = RunReport(os.path.join(config_obj.REPORT_DIR, f"run-{config_obj.RUN_ID}-shard-{index}of{count}.json"), config_obj.RUN_ID)
+    report.set("shard", {"index": index, "count": count, "planned_certificates": len(certificates)})
+    journal = RunJournal(config_obj.JOURNAL_DIR, config_obj.RUN_ID)
+    acme_client = _initialize_services(config_obj, logger_obj, journal)
+    if acme_client is None:
+        journal.finish()
+        report.set("success", False)
+        report.save()
+        return
+
+    # 运行前预测配额消耗；推迟时按顺序保留配额内的证书。台账由所有分片共享，
+    # 准入时在跨进程锁内为本分片预留配额，同时启动的其他分片会扣除这部分配额
+    forecaster = _create_quota_forecaster(config_obj)
+    quota_run_id = f"{config_obj.RUN_ID}-shard-{index}of{count}"
+    # 双算法签发时每张证书创建两个订单，两个订单都在配额内才处理该证书
+    admitted, deferred, forecast = forecaster.admit(
+        [cert["domains"] for cert in selected], orders_per_certificate=2 if config_obj.CERT_DUAL_ALGORITHM else 1,
+        run_id=quota_run_id)
+    report.set("quota_forecast", forecast)
+    if deferred and config_obj.QUOTA_ACTION != "defer":
+        logger_obj.error("预计将超出配额，拒绝执行本分片的证书申请。")
+        forecaster.release(quota_run_id)
+        admitted = []
+    to_issue, postponed = selected[:len(admitted)], selected[len(admitted):]
+    if postponed and config_obj.QUOTA_ACTION == "defer":
+        logger_obj.warning(f"预计将超出配额，本分片推迟 {len(postponed)} 张证书。")
+
+    results = []
+    try:
+        if to_issue and not config_obj.ACME_CAS:
+            # 先注册账户，所有证书共享同一个 ACME 连接和账户
+            acme_client._init_acme_client()
+            acme_client.register_acme_account(email=config_obj.ACME_CONTACT_EMAIL)
+            acme_client.prefetch_nonces(min(config_obj.SHARD_MAX_WORKERS, len(to_issue)))
+        with ThreadPoolExecutor(max_workers=config_obj.SHARD_MAX_WORKERS, thread_name_prefix="shard") as executor:
+            futures = [executor.submit(_issue_planned_certificate, acme_client, config_obj, cert, logger_obj) for cert in to_issue]
+            results = [future.result() for future in futures]
+    except Exception as e:
+        logger_obj.error(f"[分片]执行分片 {index}/{count} 时发生严重错误: {e}", exc_info=True)
+    journal.finish()
+
+    issued = {result["id"] for result in results}
+    results += [{"id": cert["id"], "domains": cert["domains"], "success": False,
+                 "deferred": cert in postponed} for cert in selected if cert["id"] not in issued]
+    succeeded = sum(1 for result in results if result["success"])
+    logger_obj.info(f"[分片]分片 {index}/{count} 完成：成功 {succeeded} 张，共 {len(selected)} 张。")
+
+    report.set("certificates", results)
+    report.set("api_calls", acme_client.metrics.snapshot())
+    if acme_client.chain_selector is not None:
+        report.set("chain_selection", acme_client.chain_selector.snapshot())
+    report.set("quota_usage", _record_quota_usage(forecaster, acme_client.metrics, logger_obj, quota_run_id, acme_client.cassette))
+    if acme_client.cassette is not None:
+        acme_client.cassette.save()
+        report.set("cassette", acme_client.cassette.stats())
+    report.set("success", succeeded == len(selected))
+    report.save()
+    logger_obj.complete()
+
+def _prewarm_targets(config_obj, days, force):
+    """
+    返回需要预热的证书：DOMAINS 对应的证书，以及 SAN 打包计划中的证书（如果有）。
+    只包含 days 天内到期或尚未签发的证书；force 为 True 时包含所有证书。
+    """
+    targets = [{"id": config_obj.DOMAINS[0], "domains": config_obj.DOMAINS, "path": config_obj.certificate_path}]
+    planner = SanPlanner(plan_path=config_obj.SAN_PLAN_PATH)
+    for cert_id, cert in sorted(planner.certificates.items()):
+        if cert["domains"]:
+            targets.append({"id": cert_id, "domains": cert["domains"],
+                            "path": _planned_certificate_config(config_obj, dict(cert, id=cert_id)).certificate_path})
+    if force:
+        return targets
+
+    inventory = _create_inventory(config_obj)
+    inventory.scan()
+    deadline = datetime.now().timestamp() + days * 86400
+    selected = []
+    for target in targets:
+        cert = inventory.find_by_path(target["path"])
+        if cert is None or cert.get("not_after", 0) <= deadline:
+            selected.append(target)
+    return selected
+
+def _prewarm_one(acme_client_obj, target, logger_obj):
+    """
+    预热一张证书的所有域名，完成后清理挑战记录。
+    """
+    forked = acme_client_obj.fork()
+    with logger_obj.contextualize(cert=target["id"]):
+        cleanup = []
+        try:
+            summary, cleanup = forked.prewarm_authorizations(target["domains"])
+            return dict(summary, id=target["id"], success=True)
+        except Exception as e:
+            logger_obj.error(f"[授权预热]预热 {target['id']} 失败: {e}")
+            return {"id": target["id"], "domains": len(target["domains"]), "success": False, "error": str(e)}
+        finally:
+            if cleanup:
+                forked.cleanup_dns_records(cleanup)
+
+def _run_prewarm(args, config_obj, logger_obj):
+    """
+    prewarm 命令：在续期窗口之前（建议在业务低峰时段通过 cron 运行）完成即将续期的证书中所有域名的验证，
+    使授权在续期时已经有效，续期只需要创建订单并最终确定。授权属于 ACME 账户，因此需要启用 ACME_ACCOUNT_CACHE
+    （或配置 ACME_CAS，此时预热第一个 CA 的账户）。
+    """
+    config_obj.RUN_ID = create_run_id()
+    config_obj.LOG_FILE = os.path.join(getattr(config_obj, 'LOG_DIR', LOG_DIR), f"prewarm-{config_obj.RUN_ID}.log")
+    _setup_logging(config_obj.LOG_FILE, logger_obj, config_obj)
+    if not _initialize_config(config_obj, logger_obj):
+        logger_obj.error("配置初始化失败，程序退出。")
+        return
+    if not config_obj.ACME_ACCOUNT_CACHE and not config_obj.ACME_CAS:
+        logger_obj.error("预热的授权属于 ACME 账户，续期时必须使用同一个账户。请启用 ACME_ACCOUNT_CACHE 后再运行。")
+        return
+
+    days = args.days if args.days is not None else config_obj.PREWARM_DAYS
+    targets = _prewarm_targets(config_obj, days, args.force)
+    if not targets:
+        logger_obj.info(f"没有 {days} 天内到期的证书，无需预热。")
+        return
+
+    report = RunReport(os.path.join(config_obj.REPORT_DIR, f"prewarm-{config_obj.RUN_ID}.json"), config_obj.RUN_ID)
+    journal = RunJournal(config_obj.JOURNAL_DIR, config_obj.RUN_ID)
+    acme_client = _initialize_services(config_obj, logger_obj, journal)
+    if acme_client is None:
+        journal.finish()
+        return
+    if config_obj.ACME_CAS:
+        ca = config_obj.ACME_CAS[0]
+        acme_client = acme_client.for_ca(
+            ca["name"], ca["directory_url"], eab_kid=ca.get("eab_kid"), eab_hmac_key=ca.get("eab_hmac_key"),
+            account_cache=AccountCache(config_obj.ACCOUNT_CACHE_DIR, password=config_obj.COMMON_PASSWORD)
+        )
+
+    # 预热订单同样计入订单配额
+    forecaster = _create_quota_forecaster(config_obj)
+    admitted, deferred, forecast = forecaster.admit([target["domains"] for target in targets], run_id=config_obj.RUN_ID)
+    report.set("quota_forecast", forecast)
+    if deferred:
+        logger_obj.warning(f"预计将超出配额，跳过 {len(deferred)} 张证书的预热。")
+
+    results = []
+    try:
+        acme_client._init_acme_client()
+        acme_client.register_acme_account(email=config_obj.ACME_CONTACT_EMAIL)
+        acme_client.prefetch_nonces(min(config_obj.PREWARM_MAX_WORKERS, len(admitted)))
+        logger_obj.info(f"[授权预热]开始预热 {len(admitted)} 张证书（{days} 天内到期）。")
+        with ThreadPoolExecutor(max_workers=config_obj.PREWARM_MAX_WORKERS, thread_name_prefix="prewarm") as executor:
+            futures = [executor.submit(_prewarm_one, acme_client, target, logger_obj) for target in targets[:len(admitted)]]
+            results = [future.result() for future in futures]
+    except Exception as e:
+        logger_obj.error(f"[授权预热]执行预热时发生严重错误: {e}", exc_info=True)
+    journal.finish()
+
+    logger_obj.info(f"[授权预热]完成：成功 {sum(1 for r in results if r['success'])} 张，共 {len(results)} 张。")
+    report.set("prewarm", results)
+    report.set("api_calls", acme_client.metrics.snapshot())
+    report.set("quota_usage", _record_quota_usage(forecaster, acme_client.metrics, logger_obj, config_obj.RUN_ID, acme_client.cassette))
+    if acme_client.cassette is not None:
+        acme_client.cassette.save()
+    report.set("success", bool(results) and all(r["success"] for r in results))
+    report.save()
+    logger_obj.complete()
+
+def _create_sweeper(acme_client_obj, config_obj, max_age=None):
+    """
+    根据配置创建残留挑战记录清理器，与签发流程共用 DNS 管理器（及其 API 调用统计）和锁管理器。
+    """
+    return StaleRecordSweeper(
+        dns_manager=acme_client_obj.aliyun_dns_manager,
+        journal_dir=config_obj.JOURNAL_DIR,
+        max_age_seconds=max_age if max_age is not None else config_obj.STALE_RECORD_MAX_AGE,
+        rate=config_obj.STALE_SWEEP_RATE,
+        max_workers=config_obj.STALE_SWEEP_MAX_WORKERS,
+        lock_manager=acme_client_obj.lock_manager,
+        challenge_zone=config_obj.ACME_CHALLENGE_ZONE
+    )
+
+def _run_sweep(args, config_obj, logger_obj):
+    """
+    sweep 命令：清理失败或被强制终止的运行残留在各区域中的 _acme-challenge TXT 记录。
+    """
+    config_obj.RUN_ID = create_run_id()
+    config_obj.LOG_FILE = os.path.join(getattr(config_obj, 'LOG_DIR', LOG_DIR), f"sweep-{config_obj.RUN_ID}.log")
+    _setup_logging(config_obj.LOG_FILE, logger_obj, config_obj)
+    if not _initialize_config(config_obj, logger_obj):
+        logger_obj.error("配置初始化失败，程序退出。")
+        return
+    acme_client = _initialize_services(config_obj, logger_obj)
+    if acme_client is None:
+        return
+
+    report = RunReport(os.path.join(config_obj.REPORT_DIR, f"sweep-{config_obj.RUN_ID}.json"), config_obj.RUN_ID)
+    result = None
+    try:
+        result = _create_sweeper(acme_client, config_obj, max_age=args.max_age).sweep(
+            zones=args.zones or None, dry_run=args.dry_run)
+        for record in result["stale"]:
+            logger_obj.info(f"[残留清理]{'将删除' if args.dry_run else '残留记录'}：{record['rr']}.{record['zone']} "
+                            f"(RecordId={record['record_id']}，原因：{record['reason']}，已存在 {record['age_seconds']} 秒)")
+    except Exception as e:
+        logger_obj.error(f"[残留清理]执行清理时发生严重错误: {e}", exc_info=True)
+    report.set("sweep", result)
+    report.set("api_calls", acme_client.metrics.snapshot())
+    if acme_client.cassette is not None:
+        acme_client.cassette.save()
+    report.set("success", result is not None and not result["failed"] and not result["errors"])
+    report.save()
+    logger_obj.complete()
+
+def _run_rollover_account(args, config_obj, logger_obj):
+    """
+    rollover-account 命令：将缓存的 ACME 账户（ACME_ACCOUNT_CACHE 或 ACME_CAS 中的各 CA）的密钥轮换为
+    ACME_ACCOUNT_KEY_TYPE 类型的新密钥，账户本身保持不变。
+    """
+    config_obj.RUN_ID = create_run_id()
+    config_obj.LOG_FILE = os.path.join(getattr(config_obj, 'LOG_DIR', LOG_DIR), f"rollover-{config_obj.RUN_ID}.log")
+    _setup_logging(config_obj.LOG_FILE, logger_obj, config_obj)
+    if not _initialize_config(config_obj, logger_obj):
+        logger_obj.error("配置初始化失败，程序退出。")
+        return
+    if not config_obj.ACME_ACCOUNT_CACHE and not config_obj.ACME_CAS:
+        logger_obj.error("未启用 ACME_ACCOUNT_CACHE，每次运行都使用新账户，无需轮换账户密钥。")
+        return
+    acme_client = _initialize_services(config_obj, logger_obj)
+    if acme_client is None:
+        return
+
+    account_cache = AccountCache(config_obj.ACCOUNT_CACHE_DIR, password=config_obj.COMMON_PASSWORD)
+    cas = config_obj.ACME_CAS or [{"name": "default", "directory_url": config_obj.ACME_DIRECTORY_URL}]
+    for ca in cas:
+        client = acme_client.for_ca(ca["name"], ca["directory_url"], eab_kid=ca.get("eab_kid"),
+                                    eab_hmac_key=ca.get("eab_hmac_key"), account_cache=account_cache)
+        try:
+            client._init_acme_client()
+            if client.account is None:
+                logger_obj.info(f"[账户密钥]{ca['name']} 没有缓存的账户，跳过。")
+                continue
+            if not client.rollover_to_key_type(config_obj.ACME_ACCOUNT_KEY_TYPE, force=args.force):
+                logger_obj.info(f"[账户密钥]{ca['name']} 的账户密钥已是 {config_obj.ACME_ACCOUNT_KEY_TYPE} 类型，跳过（使用 --force 强制轮换）。")
+        except Exception as e:
+            logger_obj.error(f"[账户密钥]{ca['name']} 的账户密钥轮换失败: {e}")
+    logger_obj.complete()
+
+def _run_merge_reports(args, logger_obj):
+    """
+    merge-reports 命令：合并各分片的运行报告，输出汇总结果。存在失败、缺少或重复的分片时以状态码 1 退出。
+    """
+    reports = []
+    for path in args.paths:
+        with open(path, "r", encoding="utf-8") as f:
+            reports.append(json.load(f))
+    try:
+        merged = merge_reports(reports)
+    except ValueError as e:
+        logger_obj.error(f"合并运行报告失败: {e}")
+        sys.exit(1)
+
+    content = json.dumps(merged, ensure_ascii=False, indent=2).encode("utf-8")
+    if args.output:
+        write_file_atomic(args.output, content)
+    else:
+        print(content.decode("utf-8"))
+
+    succeeded = sum(1 for cert in merged["certificates"] if cert["success"])
+    print(f"共 {len(merged['shards'])} 个分片、{len(merged['certificates'])} 张证书，成功 {succeeded} 张。", file=sys.stderr)
+    if merged["missing_shards"]:
+        print(f"缺少分片：{', '.join(map(str, merged['missing_shards']))}", file=sys.stderr)
+    if merged["duplicates"]:
+        print(f"被多个分片处理的证书：{', '.join(merged['duplicates'])}", file=sys.stderr)
+    if not merged["success"]:
+        sys.exit(1)
+
+def _parse_args(argv=None):
+    """
+    解析命令行参数。不带子命令时执行证书申请流程。
+    """
+    parser = argparse.ArgumentParser(description="ACME 证书自动申请工具")
+    parser.add_argument("--shard", metavar="i/N", help="只签发 SAN 打包计划中属于第 i 个分片（共 N 个）的证书")
+    parser.add_argument("--profile", action="store_true",
+                        help="按阶段进行性能分析，保存 .pstats 和折叠调用栈文件，并在运行报告中记录 CPU 时间和墙钟时间")
+    subparsers = parser.add_subparsers(dest="command")
+
+    status_parser = subparsers.add_parser("status", help="查询即将过期的证书")
+    status_parser.add_argument("--days", type=int, default=30, help="查询多少天内过期的证书 (默认: 30)")
+
+    plan_parser = subparsers.add_parser("plan", help="将 HOSTNAME_INVENTORY 打包为尽可能少的证书")
+    plan_parser.add_argument("--dry-run", action="store_true", help="只输出规划结果，不保存计划文件")
+
+    revoke_parser = subparsers.add_parser("revoke", help="批量吊销证书，并使用新私钥重新签发")
+    revoke_parser.add_argument("paths", nargs="*", help="需要吊销的证书文件路径")
+    revoke_parser.add_argument("--all", action="store_true", help="吊销 CERT_PATH 中的所有证书")
+    revoke_parser.add_argument("--reason", default="unspecified", choices=list(REVOCATION_REASONS), help="吊销原因 (默认: unspecified)")
+    revoke_parser.add_argument("--no-replace", action="store_true", help="只吊销，不重新签发")
+
+    prewarm_parser = subparsers.add_parser("prewarm", help="在续期之前预先完成域名验证，使续期只需要创建订单并最终确定")
+    prewarm_parser.add_argument("--days", type=int, default=None, help="预热多少天内到期的证书 (默认: PREWARM_DAYS)")
+    prewarm_parser.add_argument("--force", action="store_true", help="忽略到期时间，预热所有证书")
+
+    rollover_parser = subparsers.add_parser("rollover-account", help="将缓存账户的密钥轮换为 ACME_ACCOUNT_KEY_TYPE 类型的新密钥")
+    rollover_parser.add_argument("--force", action="store_true", help="密钥类型已一致时也轮换为新密钥")
+
+    sweep_parser = subparsers.add_parser("sweep", help="清理失败或被中断的运行残留在各区域中的 _acme-challenge TXT 记录")
+    sweep_parser.add_argument("zones", nargs="*", help="只检查这些区域 (默认: 账号下的所有区域)")
+    sweep_parser.add_argument("--max-age", type=int, default=None,
+                              help="来源不明的记录超过多少秒后删除 (默认: STALE_RECORD_MAX_AGE)")
+    sweep_parser.add_argument("--dry-run", action="store_true", help="只列出残留记录，不删除")
+
+    merge_parser = subparsers.add_parser("merge-reports", help="合并 --shard 运行生成的各分片运行报告")
+    merge_parser.add_argument("paths", nargs="+", help="各分片的运行报告文件路径")
+    merge_parser.add_argument("--output", help="合并结果的保存路径 (默认: 输出到标准输出)")
+
+    args = parser.parse_args(argv)
+    if args.profile and (args.shard or args.command):
+        parser.error("--profile 只能用于默认的证书申请流程。")
+    args.shard_index = args.shard_count = None
+    if args.shard:
+        try:
+            args.shard_index, args.shard_count = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+    return args
+
+def main(argv=None):
     """
     主函数，用于申请 ACME 证书并发送邮件通知。
     """
-    # 1. 配置日志
-    _setup_logging(LOG_FILE, logger)
+    args = _parse_args(argv)
+    if args.command == "status":
+        _run_status(args.days, config, logger)
+        return
+    if args.command == "plan":
+        _run_plan(args.dry_run, config, logger)
+        return
+    if args.command == "revoke":
+        _run_revoke(args, config, logger)
+        return
+    if args.command == "prewarm":
+        _run_prewarm(args, config, logger)
+        return
+    if args.command == "rollover-account":
+        _run_rollover_account(args, config, logger)
+        return
+    if args.command == "sweep":
+        _run_sweep(args, config, logger)
+        return
+    if args.command == "merge-reports":
+        _run_merge_reports(args, logger)
+        return
+    if args.shard:
+        _run_shard(args.shard_index, args.shard_count, config, logger)
+        return
+
+    # 1. 配置日志（每次运行使用独立的日志文件，避免并发运行互相覆盖）
+    config.RUN_ID = create_run_id()
+    config.LOG_FILE = os.path.join(getattr(config, 'LOG_DIR', LOG_DIR), f"main_run-{config.RUN_ID}.log")
+    _setup_logging(config.LOG_FILE, logger, config)
+    logger.info(f"运行 ID：{config.RUN_ID}，日志文件：{config.LOG_FILE}")
 
     # 2. 初始化和验证配置
     if not _initialize_config(config, logger):
@@ -278,28 +1530,115 @@ def main():
         return
 
     # 3. 初始化服务
-    acme_client = _initialize_services(config, logger)
+    report = RunReport(os.path.join(config.REPORT_DIR, f"run-{config.RUN_ID}.json"), config.RUN_ID)
+    report.set("domains", config.DOMAINS)
+    profiler = None
+    if args.profile:
+        profiler = PhaseProfiler(os.path.join(config.PROFILE_DIR, config.RUN_ID))
+        logger.info(f"已启用性能分析，分析结果保存在 {profiler.output_dir}。")
+    journal = RunJournal(config.JOURNAL_DIR, config.RUN_ID)
+    acme_client = _initialize_services(config, logger, journal)
 
     if acme_client is None:
+        journal.finish()
         # 如果服务初始化失败，尝试发送失败邮件通知
         if config.SEND_EMAIL:
             _send_notification_email(success=False, config=config, logger=logger)
         return
 
-    # 4. 执行 ACME 流程
-    process_success, cleanup = _execute_acme_process(acme_client, config, logger)
+    # 4. 运行前预测配额消耗，超出配额时按 QUOTA_ACTION 拒绝或推迟
+    forecaster = _create_quota_forecaster(config)
+    # 双算法签发时每次运行创建两个订单
+    admitted, deferred, forecast = forecaster.admit([config.DOMAINS], orders_per_certificate=2 if config.CERT_DUAL_ALGORITHM else 1,
+                                                    run_id=config.RUN_ID)
+    report.set("quota_forecast", forecast)
+    if deferred:
+        journal.finish()
+        report.set("success", False)
+        if config.QUOTA_ACTION == "defer":
+            logger.warning("预计将超出配额，本次运行推迟证书申请。")
+            report.set("deferred", deferred)
+            report.save()
+            logger.complete()
+            return
+        logger.error("预计将超出配额，拒绝执行证书申请。")
+        report.save()
+        if config.SEND_EMAIL:
+            _send_notification_email(success=False, config=config, logger=logger)
+        return
 
-    # 5. 清理 DNS 记录
+    # 5. 启动阶段：并行完成预检和准备工作，任何致命错误都在创建订单之前中止
+    try:
+        # 启动任务在工作线程中执行，由各任务的子阶段分别分析，这里只记录整个启动阶段的时间
+        with _phase(profiler, "bootstrap", profile=False):
+            key_prepared, timings = _run_bootstrap(acme_client, config, logger, profiler=profiler)
+        report.set("bootstrap", timings)
+    except PreflightError as e:
+        logger.error(f"启动预检失败，未创建任何订单：{e}")
+        forecaster.release(config.RUN_ID)
+        journal.finish()
+        report.set("bootstrap", {"failed": e.task, "error": str(e.error)})
+        report.set("api_calls", acme_client.metrics.snapshot())
+        report.set("success", False)
+        report.save()
+        if config.SEND_EMAIL:
+            _send_notification_email(success=False, config=config, logger=logger)
+        logger.complete()
+        return
+
+    # 6. 执行 ACME 流程（日志中绑定当前证书，便于在结构化日志中按证书筛选）
+    with logger.contextualize(cert=config.DOMAINS[0]):
+        if config.ACME_CAS:
+            cleanup = []
+            process_success, winner_client = _execute_multi_ca_process(acme_client, config, logger)
+            if winner_client is not None:
+                acme_client = winner_client
+            report.set("ca", {"winner": winner_client.ca_name if winner_client else None,
+                              "health": CaHealth(config.CA_HEALTH_PATH).snapshot()})
+        else:
+            process_success, cleanup = _execute_acme_process(acme_client, config, logger, key_prepared=key_prepared,
+                                                             profiler=profiler)
+
+    # 7. 清理 DNS 记录
     if cleanup:
         logger.info("开始清理 DNS 挑战记录...")
-        acme_client.cleanup_dns_records(cleanup)
+        with _phase(profiler, "cleanup"):
+            acme_client.cleanup_dns_records(cleanup)
         logger.info("DNS 清理完成。")
+    journal.finish()
+
+    # 8. 校验部署后的 TLS 端点
+    if process_success and config.VERIFY_ENDPOINTS:
+        with _phase(profiler, "verify"):
+            report.set("tls_verification", _verify_endpoints(config, logger))
+
+    network_stats = acme_client.network_stats
+    if network_stats:
+        logger.info(f"本次运行共发送 {network_stats['round_trips']} 个 ACME 请求，其中 nonce 请求 {network_stats['nonce_requests']} 个。")
+    report.set("acme_network", network_stats)
+    report.set("api_calls", acme_client.metrics.snapshot())
+    if acme_client.chain_selector is not None:
+        report.set("chain_selection", acme_client.chain_selector.snapshot())
+    report.set("quota_usage", _record_quota_usage(forecaster, acme_client.metrics, logger, config.RUN_ID, acme_client.cassette))
+    if acme_client.cassette is not None:
+        acme_client.cassette.save()
+        report.set("cassette", acme_client.cassette.stats())
+    report.set("success", process_success)
+    report.save()
     
     logger.info("ACME 证书申请流程结束。")
 
-    # 6. 发送邮件通知
+    # 9. 发送邮件通知
     if config.SEND_EMAIL:
-        _send_notification_email(process_success, config, logger)
+        with _phase(profiler, "email"):
+            _send_notification_email(process_success, config, logger)
+
+    if profiler is not None:
+        # 邮件在报告保存之后发送，补充写入包含全部阶段的分析结果
+        report.set("profile", profiler.summary())
+        report.save()
+
+    logger.complete()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,163 @@
+import os
+import re
+import time
+import pstats
+import cProfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+from loguru import logger
+
+# 折叠调用栈的最大深度，超出部分合并到最深一层
+MAX_STACK_DEPTH = 64
+# 折叠调用栈的最大行数。调用路径数随调用图中被多处调用的函数层数指数增长（例如菱形调用图），
+# 达到上限后不再展开，剩余子调用的耗时合并到调用者所在的帧
+MAX_FOLDED_PATHS = 20000
+# 分摊到一条路径上的耗时低于此值（秒）时不再展开，耗时合并到调用者所在的帧（折叠后的权重为 0 微秒）
+MIN_PATH_WEIGHT = 0.5e-6
+
+
+def _frame_name(func) -> str:
+    filename, line, name = func
+    if filename == "~":
+        # 内置函数，例如 <built-in method time.sleep>
+        return name.strip("<>")
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def collapse_stats(stats: pstats.Stats) -> List[str]:
+    """
+    将 cProfile 的统计结果转换为折叠调用栈格式（每行 "帧;帧;帧 权重"，权重为微秒），
+    可以直接交给 flamegraph.pl、speedscope 等火焰图工具。
+    cProfile 只记录“调用者 -> 被调用者”的耗时，不记录完整调用栈，因此一个函数被多处调用时，
+    其子调用的耗时按各调用者占该函数累计耗时的比例分摊（与 flameprof 等工具的做法相同）。
+    展开的路径数不超过 MAX_FOLDED_PATHS，耗时大的子调用优先展开；未展开部分的耗时计入调用者，总权重不变。
+    """
+    entries = stats.stats
+    callees: Dict[Any, List[Any]] = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller in callers:
+            callees.setdefault(caller, []).append(func)
+
+    lines: Dict[str, float] = {}
+
+    def walk(func, stack: List[str], share: float) -> None:
+        _, _, tt, ct, _ = entries[func]
+        stack = stack + [_frame_name(func)]
+        key = ";".join(stack)
+        if len(stack) >= MAX_STACK_DEPTH:
+            lines[key] = lines.get(key, 0.0) + ct * share
+            return
+        lines[key] = lines.get(key, 0.0) + tt * share
+        children = []
+        for callee in callees.get(func, []):
+            callee_ct = entries[callee][3]
+            if callee == func or _frame_name(callee) in stack or callee_ct <= 0:
+                # 递归调用的耗时已经包含在外层帧中
+                continue
+            children.append((entries[callee][4][func][3] * share, callee))
+        for weight, callee in sorted(children, key=lambda child: -child[0]):
+            if weight < MIN_PATH_WEIGHT or len(lines) >= MAX_FOLDED_PATHS:
+                lines[key] += weight
+                continue
+            walk(callee, stack, weight / entries[callee][3])
+
+    # 根帧：没有其他调用者的函数（只被自身递归调用的函数也是根帧）
+    roots = [func for func, entry in entries.items() if not set(entry[4]) - {func}]
+    for root in roots:
+        walk(root, [], 1.0)
+    return [f"{key} {round(weight * 1e6)}" for key, weight in lines.items() if round(weight * 1e6) > 0]
+
+
+class PhaseProfiler:
+    """
+    按阶段进行确定性性能分析（cProfile）。
+    每个阶段单独生成一个 .pstats 文件（可用 python -m pstats 或 snakeviz 查看）和一个折叠调用栈文件（.folded，用于火焰图），
+    并记录墙钟时间和 CPU 时间：两者相差较大说明该阶段主要在等待网络（ACME 服务器、DNS 传播），
+    接近则说明耗时在 Python 代码本身（密钥生成、JWS 签名、日志格式化等）。
+    cProfile 只分析当前线程，阶段内由线程池执行的代码不会出现在调用栈中，但其 CPU 时间计入该阶段（按进程统计）。
+    在多个线程中并发执行的工作（例如启动阶段的各项任务）可以在各自的线程中作为子阶段（parent）分别分析，
+    所属阶段本身只记录时间（profile=False）。顶层阶段必须依次执行，不能嵌套。
+    """
+    def __init__(self, output_dir: str, enabled: bool = True):
+        """
+        初始化 PhaseProfiler。
+        :param output_dir: 分析结果的保存目录。
+        :param enabled: 为 False 时 phase 不做任何分析。
+        """
+        self.output_dir = output_dir
+        self.enabled = enabled
+        self.phases: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str, profile: bool = True, parent: Optional[str] = None):
+        """
+        分析一个阶段。同名阶段多次执行时（例如分片或重试）累计时间，分析结果以序号区分。
+        :param profile: 为 False 时只记录墙钟时间和 CPU 时间，不生成分析文件（阶段中的工作已按子阶段分别分析）。
+        :param parent: (可选) 所属的阶段。子阶段可以在不同线程中并发执行，CPU 时间只统计当前线程，不计入汇总。
+        """
+        if not self.enabled:
+            yield
+            return
+        cpu_clock = time.thread_time if parent else time.process_time
+        profile_obj = cProfile.Profile() if profile else None
+        wall_start = time.perf_counter()
+        cpu_start = cpu_clock()
+        if profile_obj is not None:
+            try:
+                profile_obj.enable()
+            except ValueError as e:
+                # Python 3.12 起同一时间只能启用一个分析器，此时只记录时间
+                logger.warning(f"[性能分析]无法分析阶段 {name}，只记录时间：{e}")
+                profile_obj = None
+        try:
+            yield
+        finally:
+            if profile_obj is not None:
+                profile_obj.disable()
+            wall_ms = (time.perf_counter() - wall_start) * 1000
+            cpu_ms = (cpu_clock() - cpu_start) * 1000
+            self._record(name, profile_obj, wall_ms, cpu_ms, parent)
+
+    def _record(self, name: str, profile: Optional[cProfile.Profile], wall_ms: float, cpu_ms: float,
+                parent: Optional[str] = None) -> None:
+        with self._lock:
+            entry = self.phases.setdefault(name, {"calls": 0, "wall_ms": 0.0, "cpu_ms": 0.0, "files": []})
+            if parent:
+                entry["parent"] = parent
+            entry["calls"] += 1
+            entry["wall_ms"] = round(entry["wall_ms"] + wall_ms, 1)
+            entry["cpu_ms"] = round(entry["cpu_ms"] + cpu_ms, 1)
+            entry["cpu_ratio"] = round(entry["cpu_ms"] / entry["wall_ms"], 3) if entry["wall_ms"] else None
+            base = os.path.join(self.output_dir, f"{len(self.phases):02d}-{re.sub(r'[^A-Za-z0-9_.-]', '_', name)}")
+            if entry["calls"] > 1:
+                base += f"-{entry['calls']}"
+        if profile is None:
+            logger.info(f"[性能分析]阶段 {name}：墙钟时间 {wall_ms:.1f} 毫秒，CPU 时间 {cpu_ms:.1f} 毫秒。")
+            return
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            profile.dump_stats(base + ".pstats")
+            with open(base + ".folded", "w", encoding="utf-8") as f:
+                f.write("\n".join(collapse_stats(pstats.Stats(profile))) + "\n")
+            entry["files"].append(base + ".pstats")
+        except Exception as e:
+            # 性能分析不影响运行结果
+            logger.warning(f"[性能分析]保存阶段 {name} 的分析结果失败：{e}")
+        logger.info(f"[性能分析]阶段 {name}：墙钟时间 {wall_ms:.1f} 毫秒，CPU 时间 {cpu_ms:.1f} 毫秒。")
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        返回各阶段的墙钟时间和 CPU 时间，写入运行报告。汇总只计算顶层阶段，子阶段的时间已包含在所属阶段中。
+        """
+        top_level = [entry for entry in self.phases.values() if not entry.get("parent")]
+        wall_ms = sum(entry["wall_ms"] for entry in top_level)
+        cpu_ms = sum(entry["cpu_ms"] for entry in top_level)
+        return {
+            "output_dir": self.output_dir,
+            "wall_ms": round(wall_ms, 1),
+            "cpu_ms": round(cpu_ms, 1),
+            "cpu_ratio": round(cpu_ms / wall_ms, 3) if wall_ms else None,
+            "phases": self.phases,
+        }
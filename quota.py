@@ -0,0 +1,197 @@
+import json
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import List, Dict, Any, Optional, Tuple
+from loguru import logger
+
+from file_utils import write_file_atomic
+from locks import LockManager
+from san_planner import zone_of
+
+# 默认配额：Let's Encrypt 每个账户每 3 小时最多创建 300 个新订单。其他配额需要根据实际情况配置。
+DEFAULT_QUOTAS = {
+    "orders": {"limit": 300, "window": 3 * 3600},
+}
+QUOTA_KINDS = ("orders", "new_authorizations", "dns_api_calls")
+# 配额台账的跨进程锁
+LEDGER_LOCK_KEY = "quota-ledger"
+
+
+def _is_reservation(entry: Dict[str, Any], run_id: str) -> bool:
+    return entry.get("run_id") == run_id and bool(entry.get("reserved"))
+
+
+class QuotaForecaster:
+    """
+    配额预测：在运行之前估算一批证书将消耗的 DNS API 调用次数、订单数和新授权数，
+    并结合配额台账（最近各时间窗口内的实际消耗）判断哪些证书可以在本次运行中处理，哪些需要推迟。
+    指定 run_id 时，admit 在台账中为可处理的证书写入预留记录，之后同时启动的其他运行（例如分片）会扣除这部分配额；
+    运行结束后 record 用实际消耗替换预留，未执行时用 release 删除预留。
+    """
+    def __init__(self, ledger_path: str, quotas: Dict[str, Dict[str, int]] = None, delegated: bool = False,
+                 lock_manager: Optional[LockManager] = None):
+        """
+        初始化 QuotaForecaster。
+        :param ledger_path: 配额台账文件路径。
+        :param quotas: {配额类型: {"limit": 上限, "window": 时间窗口（秒）}}，配额类型为 orders、new_authorizations 或 dns_api_calls。
+        :param delegated: 是否启用了挑战委派（所有挑战记录写入同一个验证区域）。
+        :param lock_manager: (可选) 跨进程锁。多个进程（例如分片运行）共享台账时必须提供，
+                             否则同时写入会丢失彼此的记录，同时准入的运行也看不到彼此的预留。
+        """
+        self.ledger_path = ledger_path
+        self.quotas = quotas if quotas is not None else dict(DEFAULT_QUOTAS)
+        for kind in self.quotas:
+            if kind not in QUOTA_KINDS:
+                raise ValueError(f"未知的配额类型：{kind}，可选值为 {', '.join(QUOTA_KINDS)}。")
+        self.delegated = delegated
+        self.lock_manager = lock_manager
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _ledger_lock(self):
+        """
+        持有台账的锁：进程内的线程锁和（如果配置了）跨进程锁。读取、检查和写回必须在锁内一次完成。
+        """
+        file_lock = self.lock_manager.lock(LEDGER_LOCK_KEY) if self.lock_manager is not None else nullcontext()
+        with self._lock, file_lock:
+            yield
+
+    def _save_ledger(self, ledger: List[Dict[str, Any]]) -> None:
+        """
+        删除超出所有时间窗口的旧记录后写回台账。
+        """
+        max_window = max((quota["window"] for quota in self.quotas.values()), default=0)
+        cutoff = time.time() - max_window
+        ledger = [entry for entry in ledger if entry.get("ts", 0) >= cutoff]
+        try:
+            write_file_atomic(self.ledger_path, json.dumps(ledger).encode("utf-8"))
+        except Exception as e:
+            logger.warning(f"[配额预测]保存配额台账失败，位置：{self.ledger_path}，错误：{e}")
+
+    def _load_ledger(self) -> List[Dict[str, Any]]:
+        try:
+            with open(self.ledger_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+        except Exception as e:
+            logger.warning(f"[配额预测]读取配额台账失败，位置：{self.ledger_path}，错误：{e}")
+            return []
+
+    def used_in_window(self, kind: str, ledger: List[Dict[str, Any]] = None) -> int:
+        """
+        返回指定配额类型在其时间窗口内已消耗的数量。
+        """
+        quota = self.quotas.get(kind)
+        if not quota:
+            return 0
+        ledger = ledger if ledger is not None else self._load_ledger()
+        since = time.time() - quota["window"]
+        return sum(entry.get(kind, 0) for entry in ledger if entry.get("ts", 0) >= since)
+
+    def estimate(self, certificates: List[List[str]], orders_per_certificate: int = 1) -> Dict[str, int]:
+        """
+        估算一批证书的消耗。
+        每张证书 orders_per_certificate 个订单；每个域名一个新授权（不考虑仍然有效的授权，因此是上限）；
+        DNS API 调用包括每个区域一次记录索引查询，以及每个挑战值一次写入和一次删除。
+        :param certificates: 证书列表，每张证书为域名列表。
+        :param orders_per_certificate: 每张证书的订单数。双算法签发时为 2，第二个订单复用第一个订单已验证的授权，
+                                       不产生新的授权和 DNS API 调用。
+        :return: {"orders": ..., "new_authorizations": ..., "dns_api_calls": ...}
+        """
+        zones = set()
+        names = 0
+        for domains in certificates:
+            unique = set(domains)
+            names += len(unique)
+            if not self.delegated:
+                zones.update(zone_of(domain) for domain in unique)
+        zone_count = 1 if self.delegated and names else len(zones)
+        return {
+            "orders": len(certificates) * orders_per_certificate,
+            "new_authorizations": names,
+            "dns_api_calls": zone_count + 2 * names,
+        }
+
+    def admit(self, certificates: List[List[str]], orders_per_certificate: int = 1,
+              run_id: Optional[str] = None) -> Tuple[List[List[str]], List[List[str]], Dict[str, Any]]:
+        """
+        按顺序决定哪些证书可以在配额内处理。
+        :param certificates: 证书列表，每张证书为域名列表。
+        :param orders_per_certificate: 每张证书的订单数，见 estimate。
+        :param run_id: (可选) 运行标识。指定时在台账中为可处理的证书预留配额（读取、检查和写入在锁内一次完成）。
+        :return: (可处理的证书, 需要推迟的证书, 预测详情)。
+        """
+        if run_id is None:
+            return self._admit(self._load_ledger(), certificates, orders_per_certificate)
+        with self._ledger_lock():
+            # 同一运行再次准入时替换之前的预留
+            ledger = [entry for entry in self._load_ledger() if not _is_reservation(entry, run_id)]
+            admitted, deferred, forecast = self._admit(ledger, certificates, orders_per_certificate)
+            if admitted:
+                ledger.append(dict(forecast["planned"], ts=time.time(), run_id=run_id, reserved=True))
+                self._save_ledger(ledger)
+                forecast["reserved"] = True
+        return admitted, deferred, forecast
+
+    def _admit(self, ledger: List[Dict[str, Any]], certificates: List[List[str]],
+               orders_per_certificate: int) -> Tuple[List[List[str]], List[List[str]], Dict[str, Any]]:
+        remaining = {
+            kind: quota["limit"] - self.used_in_window(kind, ledger)
+            for kind, quota in self.quotas.items() if quota.get("limit") is not None
+        }
+
+        admitted, deferred = [], []
+        planned = {kind: 0 for kind in QUOTA_KINDS}
+        for domains in certificates:
+            if deferred:
+                # 保持顺序：一旦开始推迟，后续证书也全部推迟
+                deferred.append(domains)
+                continue
+            estimate = self.estimate(admitted + [domains], orders_per_certificate)
+            if all(estimate[kind] <= limit for kind, limit in remaining.items()):
+                admitted.append(domains)
+                planned = estimate
+            else:
+                deferred.append(domains)
+
+        forecast = {
+            "planned": planned,
+            "remaining_before": remaining,
+            "orders_per_certificate": orders_per_certificate,
+            "admitted": len(admitted),
+            "deferred": len(deferred),
+        }
+        if deferred:
+            logger.warning(f"[配额预测]{len(deferred)} 张证书将超出配额，需要推迟。剩余配额：{remaining}，预计消耗：{self.estimate(certificates, orders_per_certificate)}。")
+        else:
+            logger.info(f"[配额预测]预计消耗：{planned}，剩余配额：{remaining}。")
+        return admitted, deferred, forecast
+
+    def record(self, usage: Dict[str, int], run_id: Optional[str] = None) -> None:
+        """
+        将本次运行的实际消耗写入配额台账（替换 admit 为同一 run_id 写入的预留），并删除超出所有时间窗口的旧记录。
+        读取、追加和写回在跨进程锁内完成。
+        :param usage: {"orders": ..., "new_authorizations": ..., "dns_api_calls": ...}
+        :param run_id: (可选) 运行标识，与 admit 使用的相同。
+        """
+        with self._ledger_lock():
+            ledger = self._load_ledger()
+            entry = dict({kind: int(usage.get(kind, 0)) for kind in QUOTA_KINDS}, ts=time.time())
+            if run_id is not None:
+                ledger = [e for e in ledger if not _is_reservation(e, run_id)]
+                entry["run_id"] = run_id
+            ledger.append(entry)
+            self._save_ledger(ledger)
+
+    def release(self, run_id: str) -> None:
+        """
+        删除 admit 为指定运行写入的预留（运行在创建订单之前中止时调用）。
+        """
+        with self._ledger_lock():
+            ledger = self._load_ledger()
+            remaining = [e for e in ledger if not _is_reservation(e, run_id)]
+            if len(remaining) != len(ledger):
+                self._save_ledger(remaining)
+
@@ -0,0 +1,36 @@
+import time
+import threading
+
+
+class RateLimiter:
+    """
+    线程安全的令牌桶限速器，限制每秒发出的请求数。
+    """
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        初始化 RateLimiter。
+        :param rate: 每秒允许的请求数，为 0 时不限速。
+        :param burst: 允许的突发请求数。
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        获取一个令牌，必要时等待。
+        """
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
@@ -0,0 +1,149 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional
+from cryptography import x509
+from cryptography.hazmat.primitives import serialization
+import acme.client as acme_client_module
+from acme import messages
+from loguru import logger
+
+from acme_network import PooledClientNetwork, DirectoryCache
+from api_metrics import ApiMetrics
+from key_manager import jwk_for_private_key
+from rate_limiter import RateLimiter
+
+# RFC 5280 中 ACME 服务器接受的吊销原因
+REVOCATION_REASONS = {
+    "unspecified": 0,
+    "keyCompromise": 1,
+    "affiliationChanged": 3,
+    "superseded": 4,
+    "cessationOfOperation": 5,
+}
+
+class BulkRevoker:
+    """
+    并发吊销多张证书。
+    每个吊销请求都使用证书自身的私钥签名（RFC 8555 第 7.6 节），因此不依赖签发证书时使用的账户密钥，
+    证书私钥必须存在于 KEY_PATH 中。所有请求共享限速器，遇到 rateLimited 错误时按指数退避重试。
+    """
+    def __init__(self, directory_url: str, reason: str = "unspecified", max_workers: int = 8, rate: float = 5,
+                 max_retries: int = 3, password: str = None, directory_cache: Optional[DirectoryCache] = None,
+                 metrics: Optional[ApiMetrics] = None):
+        """
+        初始化 BulkRevoker。
+        :param directory_url: ACME 目录 URL。
+        :param reason: 吊销原因，取值见 REVOCATION_REASONS。
+        :param max_workers: 最大并发数。
+        :param rate: 每秒最多发送的吊销请求数，为 0 时不限速。
+        :param max_retries: 遇到限速错误时的最大重试次数。
+        :param password: 证书私钥的加密密码（如果有）。
+        :param directory_cache: (可选) ACME 目录缓存。
+        :param metrics: (可选) API 调用统计。
+        """
+        if reason not in REVOCATION_REASONS:
+            raise ValueError(f"未知的吊销原因：{reason}，可选值为 {', '.join(REVOCATION_REASONS)}。")
+        self.directory_url = directory_url
+        self.reason = reason
+        self.max_workers = max_workers
+        self.limiter = RateLimiter(rate, burst=max(1, int(rate)))
+        self.max_retries = max_retries
+        self.password = password
+        self.directory_cache = directory_cache
+        self.metrics = metrics if metrics is not None else ApiMetrics()
+        self._directory = None
+        self._directory_lock = threading.Lock()
+
+    def _get_directory(self, net: PooledClientNetwork) -> messages.Directory:
+        with self._directory_lock:
+            if self._directory is None:
+                if self.directory_cache is not None:
+                    self._directory = self.directory_cache.get(self.directory_url, net)
+                else:
+                    self._directory = messages.Directory.from_json(net.get(self.directory_url).json())
+        net.set_directory(self.directory_url, self._directory)
+        return self._directory
+
+    def _directory_request_failed(self, error: Exception) -> None:
+        """
+        吊销请求失败时，删除可能已失效的目录缓存，之后的吊销重新获取目录。
+        """
+        if self.directory_cache is not None and self.directory_cache.invalidate_after_failure(self.directory_url, error):
+            with self._directory_lock:
+                self._directory = None
+
+    def _load_private_key(self, key_path: str):
+        with open(key_path, "rb") as f:
+            return serialization.load_pem_private_key(
+                f.read(), password=self.password.encode("utf-8") if self.password else None)
+
+    def revoke_one(self, cert_info: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        吊销一张证书。
+        :param cert_info: 证书清单中的证书信息，至少包含 path 和 key_path。
+        :return: {"path", "sans", "success", "already_revoked", "attempts", "error"}
+        """
+        result = {"path": cert_info["path"], "sans": cert_info.get("sans", []), "success": False,
+                  "already_revoked": False, "attempts": 0, "error": None}
+        try:
+            if not cert_info.get("key_path"):
+                raise ValueError("未找到与证书匹配的私钥，无法签名吊销请求。")
+            with open(cert_info["path"], "rb") as f:
+                certificate = x509.load_pem_x509_certificates(f.read())[0]
+            jwk, alg = jwk_for_private_key(self._load_private_key(cert_info["key_path"]))
+            net = PooledClientNetwork(jwk, alg=alg, pool_size=1, metrics=self.metrics,
+                                      directory_url=self.directory_url, user_agent="acme-python-client")
+            client = acme_client_module.ClientV2(directory=self._get_directory(net), net=net)
+
+            for attempt in range(self.max_retries + 1):
+                result["attempts"] = attempt + 1
+                self.limiter.acquire()
+                try:
+                    client.revoke(certificate, REVOCATION_REASONS[self.reason])
+                    result["success"] = True
+                    break
+                except messages.Error as e:
+                    if e.code == "alreadyRevoked":
+                        result["success"] = result["already_revoked"] = True
+                        break
+                    if e.code != "rateLimited" or attempt == self.max_retries:
+                        self._directory_request_failed(e)
+                        raise
+                    delay = 2 ** attempt * 5
+                    logger.warning(f"[批量吊销]吊销 {cert_info['path']} 时触发限速，{delay} 秒后重试。")
+                    time.sleep(delay)
+                except Exception as e:
+                    self._directory_request_failed(e)
+                    raise
+        except Exception as e:
+            result["error"] = str(e)
+        return result
+
+    def revoke_all(self, certificates: List[Dict[str, Any]],
+                   on_revoked: Callable[[Dict[str, Any], Dict[str, Any]], None] = None) -> List[Dict[str, Any]]:
+        """
+        并发吊销多张证书，并输出进度。
+        :param certificates: 证书清单中的证书信息列表。
+        :param on_revoked: (可选) 每张证书吊销成功后立即调用，参数为 (证书信息, 吊销结果)，例如用于排队重新签发。
+        :return: 每张证书的吊销结果。
+        """
+        total = len(certificates)
+        results = []
+        logger.info(f"[批量吊销]开始吊销 {total} 张证书，原因：{self.reason}，并发数：{self.max_workers}。")
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, total)), thread_name_prefix="revoke") as executor:
+            futures = {executor.submit(self.revoke_one, cert): cert for cert in certificates}
+            for done, future in enumerate(as_completed(futures), 1):
+                cert, result = futures[future], future.result()
+                results.append(result)
+                if result["success"]:
+                    logger.info(f"[批量吊销]进度 {done}/{total}：已吊销 {result['path']}"
+                                f"{'（此前已吊销）' if result['already_revoked'] else ''}。")
+                    if on_revoked is not None:
+                        on_revoked(cert, result)
+                else:
+                    logger.error(f"[批量吊销]进度 {done}/{total}：吊销 {result['path']} 失败，错误：{result['error']}")
+
+        succeeded = sum(1 for r in results if r["success"])
+        logger.info(f"[批量吊销]完成：成功 {succeeded} 张，失败 {total - succeeded} 张。")
+        return results
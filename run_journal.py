@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import socket
+import threading
+from datetime import datetime
+from typing import List, Dict, Any, Set
+from loguru import logger
+
+from file_utils import write_file_atomic
+
+
+def create_run_id() -> str:
+    """
+    生成本次运行的唯一 ID，例如 20250101-120000-12345。
+    """
+    return f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}"
+
+
+class RunJournal:
+    """
+    运行日志（journal）：记录本次运行发布的挑战 TXT 记录。
+    清理时只删除本次运行发布的记录；运行结束后删除 journal 文件。
+    被强制终止的运行会留下 journal 文件，清理工具可以据此判断哪些记录仍属于活动的运行。
+    """
+    def __init__(self, journal_dir: str, run_id: str):
+        """
+        初始化 RunJournal 并写入初始 journal 文件。
+        :param journal_dir: journal 文件目录。
+        :param run_id: 本次运行的 ID。
+        """
+        self.journal_dir = journal_dir
+        self.run_id = run_id
+        self.path = os.path.join(journal_dir, f"{run_id}.json")
+        self._lock = threading.Lock()
+        self._data = {
+            "run_id": run_id,
+            "pid": os.getpid(),
+            "host": socket.gethostname(),
+            "started_at": time.time(),
+            "records": []
+        }
+        self._flush()
+
+    def _flush(self) -> None:
+        try:
+            write_file_atomic(self.path, json.dumps(self._data, ensure_ascii=False).encode("utf-8"))
+        except Exception as e:
+            logger.warning(f"[运行日志]写入 journal 失败，位置：{self.path}，错误：{e}")
+
+    def record_published(self, zone: str, rr: str, record_id: str, value: str) -> None:
+        """
+        记录本次运行发布的一条 TXT 记录。
+        """
+        with self._lock:
+            self._data["records"].append({"zone": zone, "rr": rr, "record_id": record_id, "value": value})
+            self._flush()
+
+    def record_deleted(self, record_id: str) -> None:
+        """
+        记录已被删除的 TXT 记录。
+        """
+        with self._lock:
+            self._data["records"] = [r for r in self._data["records"] if r["record_id"] != record_id]
+            self._flush()
+
+    @property
+    def records(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._data["records"])
+
+    def finish(self) -> None:
+        """
+        运行结束时调用。所有记录均已清理时删除 journal 文件，否则保留以便后续清理。
+        """
+        with self._lock:
+            if self._data["records"]:
+                logger.warning(f"[运行日志]仍有 {len(self._data['records'])} 条记录未清理，保留 journal：{self.path}。")
+                return
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def load_all(journal_dir: str) -> List[Dict[str, Any]]:
+        """
+        读取目录中所有 journal。
+        """
+        journals = []
+        if not os.path.isdir(journal_dir):
+            return journals
+        for name in os.listdir(journal_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(journal_dir, name), "r", encoding="utf-8") as f:
+                    journals.append(json.load(f))
+            except Exception as e:
+                logger.warning(f"[运行日志]读取 journal 失败：{name}，错误：{e}")
+        return journals
+
+    @staticmethod
+    def is_active(journal: Dict[str, Any], max_age_seconds: float = 6 * 3600) -> bool:
+        """
+        判断 journal 对应的运行是否仍在进行。
+        本机的运行通过进程是否存在判断；其他主机的运行在 max_age_seconds 内视为活动。
+        """
+        if time.time() - journal.get("started_at", 0) > max_age_seconds:
+            return False
+        if journal.get("host") != socket.gethostname() or os.name == "nt":
+            # Windows 上 os.kill 会直接结束进程，无法用于探测
+            return True
+        try:
+            os.kill(journal["pid"], 0)
+            return True
+        except PermissionError:
+            return True
+        except (OSError, KeyError):
+            return False
+
+    @staticmethod
+    def active_record_ids(journal_dir: str) -> Set[str]:
+        """
+        返回所有活动运行发布的 TXT 记录 ID。
+        """
+        return {
+            record["record_id"]
+            for journal in RunJournal.load_all(journal_dir) if RunJournal.is_active(journal)
+            for record in journal.get("records", [])
+        }
+
+    @staticmethod
+    def orphaned_record_ids(journal_dir: str) -> Set[str]:
+        """
+        返回已经结束（或被强制终止）但未清理完的运行发布的 TXT 记录 ID，这些记录可以直接删除。
+        """
+        return {
+            record["record_id"]
+            for journal in RunJournal.load_all(journal_dir) if not RunJournal.is_active(journal)
+            for record in journal.get("records", [])
+        }
+
+    @staticmethod
+    def prune_records(journal_dir: str, record_ids: Set[str]) -> None:
+        """
+        从已结束运行的 journal 中移除已被删除的记录，记录全部移除后删除 journal 文件。
+        """
+        for journal in RunJournal.load_all(journal_dir):
+            if RunJournal.is_active(journal) or not journal.get("run_id"):
+                continue
+            records = [r for r in journal.get("records", []) if r["record_id"] not in record_ids]
+            if len(records) == len(journal.get("records", [])):
+                continue
+            path = os.path.join(journal_dir, f"{journal['run_id']}.json")
+            try:
+                if records:
+                    journal["records"] = records
+                    write_file_atomic(path, json.dumps(journal, ensure_ascii=False).encode("utf-8"))
+                else:
+                    os.remove(path)
+            except OSError as e:
+                logger.warning(f"[运行日志]更新 journal 失败，位置：{path}，错误：{e}")
@@ -0,0 +1,53 @@
+import json
+import time
+import threading
+from typing import Any, Dict
+from loguru import logger
+
+from file_utils import write_file_atomic
+
+
+class RunReport:
+    """
+    运行报告：以 JSON 格式汇总一次运行的结果和统计信息（例如 ACME 请求往返次数）。
+    各模块通过 set/update 写入自己的部分，运行结束时调用 save 保存。
+    """
+    def __init__(self, report_path: str, run_id: str):
+        """
+        初始化 RunReport。
+        :param report_path: 报告文件路径。
+        :param run_id: 本次运行的 ID。
+        """
+        self.report_path = report_path
+        self._lock = threading.Lock()
+        self.data: Dict[str, Any] = {"run_id": run_id, "started_at": time.time()}
+
+    def set(self, section: str, value: Any) -> None:
+        """
+        设置报告中的一个部分。
+        """
+        with self._lock:
+            self.data[section] = value
+
+    def update(self, section: str, **values: Any) -> None:
+        """
+        合并更新报告中的一个部分（字典）。
+        """
+        with self._lock:
+            self.data.setdefault(section, {}).update(values)
+
+    def save(self) -> bool:
+        """
+        将报告原子地写入文件。
+        :return: 保存成功返回 True。
+        """
+        with self._lock:
+            self.data["finished_at"] = time.time()
+            content = json.dumps(self.data, ensure_ascii=False, indent=2, default=str).encode("utf-8")
+        try:
+            write_file_atomic(self.report_path, content)
+            logger.info(f"[运行报告]运行报告已保存：{self.report_path}")
+            return True
+        except Exception as e:
+            logger.error(f"[运行报告]保存运行报告失败，位置：{self.report_path}，错误：{e}")
+            return False
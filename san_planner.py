@@ -0,0 +1,195 @@
+import json
+from typing import List, Dict, Any, Tuple, Union
+from loguru import logger
+
+from file_utils import write_file_atomic
+
+PLAN_VERSION = 1
+DEFAULT_TARGET = "default"
+
+
+def zone_of(hostname: str) -> str:
+    """
+    返回域名所在的区域（主域名）。
+    与 AcmeClient._get_dns_rr_and_base_domain 一致，假设主域名是最后两段；对于 co.uk 等复杂后缀需要更高级的库。
+    """
+    name = hostname[2:] if hostname.startswith("*.") else hostname
+    return ".".join(name.split(".")[-2:])
+
+
+def _normalize_inventory(inventory: List[Union[str, Dict[str, str]]]) -> Dict[Tuple[str, str], List[str]]:
+    """
+    将域名清单规范化为 {(区域, 部署目标): [域名, ...]}。
+    清单中的每一项可以是域名字符串，也可以是 {"name": 域名, "target": 部署目标} 字典。
+    """
+    groups: Dict[Tuple[str, str], List[str]] = {}
+    for item in inventory:
+        if isinstance(item, str):
+            name, target = item, DEFAULT_TARGET
+        else:
+            name, target = item["name"], item.get("target") or DEFAULT_TARGET
+        name = name.strip().strip(".").lower()
+        if not name:
+            continue
+        group = groups.setdefault((zone_of(name), target), [])
+        if name not in group:
+            group.append(name)
+    return groups
+
+
+def collapse_wildcards(names: List[str], threshold: int = None) -> List[str]:
+    """
+    将同一父域名下的兄弟域名合并为通配符域名，以减少授权数量。
+    已被通配符覆盖的域名会被移除；通配符只覆盖一级子域名，因此父域名本身仍需保留。
+    :param names: 同一区域、同一部署目标下的域名列表。
+    :param threshold: 兄弟域名数量达到该值时合并为通配符；为 None 时只移除已被显式通配符覆盖的域名。
+    :return: 合并后的域名列表（排序后）。
+    """
+    wildcard_parents = {name[2:] for name in names if name.startswith("*.")}
+
+    if threshold:
+        siblings: Dict[str, int] = {}
+        for name in names:
+            if name.startswith("*.") or name.count(".") < 2:
+                continue
+            parent = name.split(".", 1)[1]
+            siblings[parent] = siblings.get(parent, 0) + 1
+        wildcard_parents.update(parent for parent, count in siblings.items() if count >= threshold)
+
+    result = {f"*.{parent}" for parent in wildcard_parents}
+    for name in names:
+        if name.startswith("*."):
+            continue
+        parent = name.split(".", 1)[1] if "." in name else None
+        if parent not in wildcard_parents:
+            result.add(name)
+    return sorted(result, key=lambda n: (n.lstrip("*."), n))
+
+
+class SanPlanner:
+    """
+    SAN 打包规划器。
+    将扁平的域名清单按区域和部署目标分组，打包成尽可能少的证书（每张最多 max_sans 个 SAN）。
+    规划结果保存在计划文件中；域名清单变化时增量重新规划，只有受影响的证书需要重新签发。
+    """
+    def __init__(self, plan_path: str, max_sans: int = 100, wildcard_threshold: int = None):
+        """
+        初始化 SanPlanner。
+        :param plan_path: 计划文件路径。
+        :param max_sans: 每张证书最多包含的 SAN 数量（Let's Encrypt 上限为 100）。
+        :param wildcard_threshold: 兄弟域名数量达到该值时合并为通配符，为 None 时不自动合并。
+        """
+        if max_sans < 1:
+            raise ValueError("max_sans 必须大于 0。")
+        self.plan_path = plan_path
+        self.max_sans = max_sans
+        self.wildcard_threshold = wildcard_threshold
+        self.certificates: Dict[str, Dict[str, Any]] = self._load_plan()
+
+    def _load_plan(self) -> Dict[str, Dict[str, Any]]:
+        """
+        读取已有的计划文件，不存在或无法读取时返回空计划。
+        """
+        try:
+            with open(self.plan_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"[SAN规划]读取计划文件失败，将重新规划，位置：{self.plan_path}，错误：{e}")
+            return {}
+        if data.get("version") != PLAN_VERSION:
+            return {}
+        return data.get("certificates", {})
+
+    def save(self) -> bool:
+        """
+        将当前计划原子地写入计划文件。
+        :return: 文件内容发生变化返回 True。
+        """
+        data = {"version": PLAN_VERSION, "certificates": self.certificates}
+        content = json.dumps(data, ensure_ascii=False, indent=2, sort_keys=True).encode("utf-8")
+        return write_file_atomic(self.plan_path, content)
+
+    def _new_certificate_id(self, zone: str, target: str) -> str:
+        """
+        为指定分组生成新的证书 ID，例如 example.com_default_002。
+        """
+        sequence = 1
+        while f"{zone}_{target}_{sequence:03d}" in self.certificates:
+            sequence += 1
+        return f"{zone}_{target}_{sequence:03d}"
+
+    def plan(self, inventory: List[Union[str, Dict[str, str]]]) -> Dict[str, List[str]]:
+        """
+        根据域名清单增量更新计划。
+        已有证书中仍然需要的域名保持不动，被移除的域名从所在证书中删除，新增的域名优先放入同组中仍有空位的证书，
+        否则创建新证书。因此新增少量域名时只有一张证书需要重新签发。
+        :param inventory: 域名清单，每项为域名字符串或 {"name": 域名, "target": 部署目标} 字典。
+        :return: {"added": [...], "changed": [...], "removed": [...], "unchanged": [...]}，值为证书 ID 列表。
+        """
+        desired = {
+            group: collapse_wildcards(names, self.wildcard_threshold)
+            for group, names in _normalize_inventory(inventory).items()
+        }
+
+        result = {"added": [], "changed": [], "removed": [], "unchanged": []}
+        assigned = set()
+
+        # 1. 保留已有证书中仍然需要的域名
+        for cert_id, cert in sorted(self.certificates.items()):
+            group = (cert["zone"], cert["target"])
+            wanted = set(desired.get(group, []))
+            kept = [name for name in cert["domains"] if name in wanted and (group, name) not in assigned]
+            assigned.update((group, name) for name in kept)
+            if len(kept) != len(cert["domains"]):
+                cert["domains"] = kept
+                result["changed"].append(cert_id)
+
+        # 2. 将未分配的域名放入同组中仍有空位的证书，或创建新证书
+        for group, names in sorted(desired.items()):
+            pending = [name for name in names if (group, name) not in assigned]
+            if not pending:
+                continue
+            zone, target = group
+            for cert_id, cert in sorted(self.certificates.items()):
+                if not pending:
+                    break
+                if (cert["zone"], cert["target"]) != group or len(cert["domains"]) >= self.max_sans:
+                    continue
+                room = self.max_sans - len(cert["domains"])
+                cert["domains"].extend(pending[:room])
+                pending = pending[room:]
+                if cert_id not in result["changed"]:
+                    result["changed"].append(cert_id)
+            while pending:
+                cert_id = self._new_certificate_id(zone, target)
+                self.certificates[cert_id] = {"zone": zone, "target": target, "domains": pending[:self.max_sans]}
+                pending = pending[self.max_sans:]
+                result["added"].append(cert_id)
+
+        # 3. 删除已没有域名的证书
+        for cert_id in [cert_id for cert_id, cert in self.certificates.items() if not cert["domains"]]:
+            del self.certificates[cert_id]
+            if cert_id in result["changed"]:
+                result["changed"].remove(cert_id)
+            result["removed"].append(cert_id)
+
+        touched = set(result["added"]) | set(result["changed"])
+        result["unchanged"] = sorted(cert_id for cert_id in self.certificates if cert_id not in touched)
+
+        total_sans = sum(len(cert["domains"]) for cert in self.certificates.values())
+        logger.info(f"[SAN规划]规划完成，共 {len(self.certificates)} 张证书、{total_sans} 个 SAN；"
+                    f"新增 {len(result['added'])} 张，变更 {len(result['changed'])} 张，移除 {len(result['removed'])} 张。")
+        return result
+
+    def reissue_list(self, plan_result: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+        """
+        返回需要（重新）签发的证书列表。
+        :param plan_result: plan() 的返回值。
+        :return: [{"id": 证书 ID, "zone": ..., "target": ..., "domains": [...]}, ...]
+        """
+        return [
+            dict(self.certificates[cert_id], id=cert_id)
+            for cert_id in plan_result["added"] + plan_result["changed"]
+        ]
@@ -0,0 +1,113 @@
+import re
+import math
+import hashlib
+from collections import Counter
+from typing import Any, Dict, List, Set, Tuple
+
+from san_planner import zone_of
+
+_SHARD_PATTERN = re.compile(r"^\s*(\d+)\s*/\s*(\d+)\s*$")
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """
+    解析分片参数，例如 "3/8" 表示共 8 个分片中的第 3 个（从 1 开始）。
+    :return: (分片序号, 分片总数)
+    :raises ValueError: 格式错误或序号超出范围。
+    """
+    match = _SHARD_PATTERN.match(spec or "")
+    if not match:
+        raise ValueError(f"分片参数格式错误：{spec}，应为 i/N，例如 1/8。")
+    index, count = int(match.group(1)), int(match.group(2))
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"分片参数超出范围：{spec}，序号应在 1 到 {max(count, 1)} 之间。")
+    return index, count
+
+
+def shard_key(domains: List[str], split_zones: Set[str] = frozenset()) -> str:
+    """
+    返回证书的分片键：默认为主域名（第一个域名）所在的区域，同一区域的证书总是落在同一个分片，
+    不同分片之间不会争用同一个区域的 DNS 锁；split_zones 中的区域改为使用主域名本身，使这些区域的证书分散到多个分片。
+    SAN 跨多个区域的证书按主域名的区域分配，其余区域仍可能与其他分片共享（由锁保证正确性）。
+    """
+    primary = domains[0].strip().strip(".").lower()
+    zone = zone_of(primary)
+    return primary if zone in split_zones else zone
+
+
+def shard_of(key: str, count: int) -> int:
+    """
+    使用稳定哈希（SHA-256，不受 PYTHONHASHSEED 影响）计算分片键所属的分片（从 1 开始）。
+    不同的机器、不同的运行对同一个键总是得到相同的结果。
+    """
+    digest = hashlib.sha256(key.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+def select_shard(certificates: List[Dict[str, Any]], index: int, count: int) -> List[Dict[str, Any]]:
+    """
+    从证书列表中选出属于指定分片的证书。
+    证书数量超过平均每个分片证书数的区域无法放在同一个分片中，这些区域的证书按主域名分散，其余区域整体分配。
+    所有分片读取同一份计划，因此得到互不重叠且完整覆盖的划分。
+    :param certificates: 证书列表，每项至少包含 domains。
+    :param index: 分片序号（从 1 开始）。
+    :param count: 分片总数。
+    """
+    certificates = [cert for cert in certificates if cert["domains"]]
+    per_zone = Counter(shard_key(cert["domains"]) for cert in certificates)
+    limit = math.ceil(len(certificates) / count)
+    split_zones = {zone for zone, size in per_zone.items() if size > limit}
+    return [cert for cert in certificates if shard_of(shard_key(cert["domains"], split_zones), count) == index]
+
+
+def _merge_api_calls(target: Dict[str, Any], source: Dict[str, Any]) -> None:
+    for service, actions in source.items():
+        merged = target.setdefault(service, {})
+        for action, entry in actions.items():
+            if action == "_total":
+                merged["_total"] = merged.get("_total", 0) + entry
+                continue
+            current = merged.setdefault(action, {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+            current["count"] += entry.get("count", 0)
+            current["errors"] += entry.get("errors", 0)
+            current["total_ms"] = round(current["total_ms"] + entry.get("total_ms", 0), 1)
+            current["max_ms"] = max(current["max_ms"], entry.get("max_ms", 0))
+
+
+def merge_reports(reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    合并各分片的运行报告。
+    证书结果按分片拼接，API 调用统计和配额消耗累加；缺少的分片和被多个分片处理的证书会单独列出，
+    此时合并结果视为失败。
+    :param reports: 各分片的运行报告（包含 shard 字段）。
+    :return: 合并后的报告。
+    """
+    merged: Dict[str, Any] = {"shards": [], "certificates": [], "duplicates": [], "missing_shards": [],
+                              "api_calls": {}, "quota_usage": {}}
+    counts = set()
+    seen: Dict[str, int] = {}
+    for report in sorted(reports, key=lambda r: r.get("shard", {}).get("index", 0)):
+        shard = report.get("shard") or {}
+        counts.add(shard.get("count"))
+        merged["shards"].append({"index": shard.get("index"), "count": shard.get("count"),
+                                 "run_id": report.get("run_id"), "success": bool(report.get("success"))})
+        for cert in report.get("certificates", []):
+            if cert["id"] in seen and cert["id"] not in merged["duplicates"]:
+                merged["duplicates"].append(cert["id"])
+            seen[cert["id"]] = shard.get("index")
+            merged["certificates"].append(dict(cert, shard=shard.get("index")))
+        _merge_api_calls(merged["api_calls"], report.get("api_calls") or {})
+        for kind, value in (report.get("quota_usage") or {}).items():
+            merged["quota_usage"][kind] = merged["quota_usage"].get(kind, 0) + value
+
+    if None in counts:
+        raise ValueError("部分运行报告不包含分片信息，请只合并使用 --shard 运行时生成的报告。")
+    if len(counts) > 1:
+        raise ValueError(f"各分片的分片总数不一致：{sorted(counts)}")
+    if counts:
+        present = {shard["index"] for shard in merged["shards"]}
+        merged["missing_shards"] = [index for index in range(1, counts.pop() + 1) if index not in present]
+
+    merged["success"] = (bool(merged["shards"]) and all(shard["success"] for shard in merged["shards"])
+                         and not merged["missing_shards"] and not merged["duplicates"])
+    return merged
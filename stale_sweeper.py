@@ -0,0 +1,149 @@
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from loguru import logger
+
+from aliyun_dns import AliyunDNSManager
+from challenge_delegation import CHALLENGE_PREFIX
+from locks import LockManager
+from rate_limiter import RateLimiter
+from run_journal import RunJournal
+
+
+def is_challenge_rr(rr: str) -> bool:
+    """
+    判断主机记录是否为 ACME 挑战记录，例如 "_acme-challenge" 或 "_acme-challenge.www"。
+    """
+    rr = (rr or "").lower()
+    return rr == CHALLENGE_PREFIX or rr.startswith(f"{CHALLENGE_PREFIX}.")
+
+
+class StaleRecordSweeper:
+    """
+    残留挑战记录清理器。
+    失败或被强制终止的运行不会返回 cleanup 列表，发布的 TXT 记录会残留在区域中，
+    拖慢解析记录的分页查询，并让按主机记录查询的结果混入过期的值。
+    清理器遍历账号下的所有区域，找出所有 _acme-challenge* TXT 记录（验证区域中的所有 TXT 记录），按以下规则删除：
+    属于活动运行的记录不删除；属于已结束运行的 journal 的记录直接删除；其他来源不明的记录超过 max_age_seconds 后删除。
+    删除请求共享限速器，并与签发流程使用相同的区域/主机记录锁。
+    """
+    def __init__(self, dns_manager: AliyunDNSManager, journal_dir: str, max_age_seconds: float = 3600,
+                 rate: float = 5, max_workers: int = 4, lock_manager: Optional[LockManager] = None,
+                 challenge_zone: str = None):
+        """
+        初始化 StaleRecordSweeper。
+        :param dns_manager: 阿里云 DNS 管理器。
+        :param journal_dir: 运行 journal 目录，用于判断记录是否属于活动的运行。
+        :param max_age_seconds: 来源不明的记录超过该时间（按最后修改时间计算）后视为残留。
+        :param rate: 每秒最多发送的删除请求数，为 0 时不限速。
+        :param max_workers: 查询区域和删除记录的最大并发数。
+        :param lock_manager: (可选) 跨进程的区域/主机记录锁。
+        :param challenge_zone: (可选) 挑战委派的验证区域，其中的所有 TXT 记录都视为挑战记录。
+        """
+        self.dns_manager = dns_manager
+        self.journal_dir = journal_dir
+        self.max_age_seconds = max_age_seconds
+        self.limiter = RateLimiter(rate, burst=max(1, int(rate)))
+        self.max_workers = max(1, max_workers)
+        self.lock_manager = lock_manager
+        self.challenge_zone = challenge_zone.strip(".").lower() if challenge_zone else None
+
+    def _list_zone(self, zone: str) -> List[Dict[str, Any]]:
+        if zone.lower() == self.challenge_zone:
+            return self.dns_manager.list_all_records(zone, record_type="TXT")
+        records = self.dns_manager.list_all_records(zone, rr_key_word=CHALLENGE_PREFIX, record_type="TXT")
+        # RRKeyWord 为模糊匹配，需要再按前缀过滤
+        return [record for record in records if is_challenge_rr(record.get("RR"))]
+
+    def find_stale(self, zones: List[str] = None) -> Dict[str, Any]:
+        """
+        查找残留的挑战记录。
+        :param zones: (可选) 需要检查的区域，默认为账号下的所有区域。
+        :return: {"zones", "scanned", "active", "stale": [{"zone", "rr", "record_id", "value", "age_seconds", "reason"}],
+                  "errors", "vanished"}
+        """
+        all_zones = zones is None
+        if all_zones:
+            zones = self.dns_manager.list_domains()
+            if self.challenge_zone and self.challenge_zone not in (zone.lower() for zone in zones):
+                zones.append(self.challenge_zone)
+        active = RunJournal.active_record_ids(self.journal_dir)
+        orphaned = RunJournal.orphaned_record_ids(self.journal_dir)
+        now = time.time()
+
+        result = {"zones": len(zones), "scanned": 0, "active": 0, "stale": [], "errors": {}, "vanished": []}
+        seen = set()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="sweep-list") as executor:
+            futures = {zone: executor.submit(self._list_zone, zone) for zone in zones}
+        for zone, future in futures.items():
+            try:
+                records = future.result()
+            except Exception as e:
+                result["errors"][zone] = str(getattr(e, "message", e))
+                continue
+            result["scanned"] += len(records)
+            for record in records:
+                record_id = str(record.get("RecordId"))
+                seen.add(record_id)
+                if record_id in active:
+                    result["active"] += 1
+                    continue
+                timestamp = record.get("UpdateTimestamp") or record.get("CreateTimestamp")
+                age = now - timestamp / 1000 if timestamp else None
+                if record_id in orphaned:
+                    reason = "orphaned"
+                elif age is not None and age > self.max_age_seconds:
+                    reason = "expired"
+                else:
+                    continue
+                result["stale"].append({"zone": zone, "rr": record.get("RR"), "record_id": record_id,
+                                        "value": record.get("Value"),
+                                        "age_seconds": round(age) if age is not None else None, "reason": reason})
+        if all_zones and not result["errors"]:
+            # 已结束运行的 journal 中记录已不存在（例如被手动删除），可以从 journal 中移除
+            result["vanished"] = sorted(orphaned - seen)
+        return result
+
+    def _delete(self, record: Dict[str, Any]) -> Optional[str]:
+        self.limiter.acquire()
+        lock = self.lock_manager.lock(record["zone"], record["rr"]) if self.lock_manager is not None else nullcontext()
+        try:
+            with lock:
+                self.dns_manager.delete_record(record["record_id"], domain_name=record["zone"])
+            return None
+        except Exception as e:
+            return str(getattr(e, "message", e))
+
+    def sweep(self, zones: List[str] = None, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        查找并删除残留的挑战记录。
+        :param zones: (可选) 需要检查的区域，默认为账号下的所有区域。
+        :param dry_run: 只查找，不删除。
+        :return: find_stale 的结果，另外包含 deleted、failed 和 elapsed。
+        """
+        start = time.monotonic()
+        result = self.find_stale(zones)
+        result.update(deleted=0, failed=[])
+        stale = result["stale"]
+        logger.info(f"[残留清理]检查 {result['zones']} 个区域、{result['scanned']} 条挑战记录，"
+                    f"活动运行的记录 {result['active']} 条，残留记录 {len(stale)} 条。")
+        for zone, error in result["errors"].items():
+            logger.warning(f"[残留清理]查询区域 {zone} 失败：{error}")
+
+        if stale and not dry_run:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="sweep-delete") as executor:
+                errors = list(executor.map(self._delete, stale))
+            deleted = set()
+            for record, error in zip(stale, errors):
+                if error is None:
+                    deleted.add(record["record_id"])
+                else:
+                    result["failed"].append(dict(record, error=error))
+            result["deleted"] = len(deleted)
+            RunJournal.prune_records(self.journal_dir, deleted | set(result["vanished"]))
+            logger.info(f"[残留清理]删除残留记录 {result['deleted']} 条，失败 {len(result['failed'])} 条。")
+        elif result["vanished"] and not dry_run:
+            RunJournal.prune_records(self.journal_dir, set(result["vanished"]))
+        result["elapsed"] = round(time.monotonic() - start, 2)
+        return result
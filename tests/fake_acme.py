@@ -0,0 +1,220 @@
+"""
+录制 cassette 用的本地替身：最小的 ACME 服务器（不校验 JWS 签名，挑战响应后立即有效）和阿里云 DNS 客户端。
+"""
+import json
+import base64
+import secrets
+import time
+import datetime
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+from cryptography import x509
+from cryptography.x509.oid import NameOID
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from alibabacloud_alidns20150109 import models as alidns_20150109_models
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _issue_ca(common_name: str, issuer_key=None, issuer_name: x509.Name = None):
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, common_name)])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder()
+            .subject_name(name).issuer_name(issuer_name or name)
+            .public_key(key.public_key()).serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1)).not_valid_after(now + datetime.timedelta(days=3650))
+            .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+            .sign(issuer_key or key, hashes.SHA256()))
+    return key, cert
+
+
+class FakeAcmeServer:
+    """
+    在 127.0.0.1 上监听的最小 ACME 服务器，覆盖目录、newNonce、newAccount、newOrder、授权、挑战、
+    最终确定订单和证书下载。
+    """
+    def __init__(self, port: int = 0, latency: float = 0.0):
+        self.latency = latency # 每个响应前的等待（秒），模拟网络往返
+        self.root_key, self.root = _issue_ca("Fake Root X1")
+        self.intermediate_key, self.intermediate = _issue_ca("Fake Intermediate R1", self.root_key, self.root.subject)
+        self.orders: Dict[str, Dict[str, Any]] = {}
+        self.authzs: Dict[str, Dict[str, Any]] = {}
+        self.certificates: Dict[str, str] = {}
+        self.key_changes: List[Dict[str, Any]] = [] # 收到的账户密钥轮换请求（内层 JWS）
+        self.reject_key_change = False
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.base_url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        self._thread = None
+
+    @property
+    def directory_url(self) -> str:
+        return f"{self.base_url}/dir"
+
+    def start(self) -> "FakeAcmeServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _directory(self) -> Dict[str, str]:
+        return {"newNonce": f"{self.base_url}/nonce", "newAccount": f"{self.base_url}/new-acct",
+                "newOrder": f"{self.base_url}/new-order", "revokeCert": f"{self.base_url}/revoke",
+                "keyChange": f"{self.base_url}/key-change"}
+
+    def _order_body(self, order_id: str) -> Dict[str, Any]:
+        order = self.orders[order_id]
+        if order["status"] == "pending" and all(self.authzs[a]["status"] == "valid" for a in order["authzs"]):
+            order["status"] = "ready"
+        body = {"status": order["status"], "identifiers": order["identifiers"],
+                "authorizations": [f"{self.base_url}/authz/{a}" for a in order["authzs"]],
+                "finalize": f"{self.base_url}/finalize/{order_id}"}
+        if order["status"] == "valid":
+            body["certificate"] = f"{self.base_url}/cert/{order_id}"
+        return body
+
+    def _authz_body(self, authz_id: str) -> Dict[str, Any]:
+        authz = self.authzs[authz_id]
+        body = {"identifier": {"type": "dns", "value": authz["value"]}, "status": authz["status"],
+                "challenges": [{"type": "dns-01", "url": f"{self.base_url}/chall/{authz_id}",
+                                "token": authz["token"], "status": authz["status"]}]}
+        if authz["wildcard"]:
+            body["wildcard"] = True
+        return body
+
+    def _issue(self, order_id: str, csr_der: bytes) -> None:
+        csr = x509.load_der_x509_csr(csr_der)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        san = csr.extensions.get_extension_for_class(x509.SubjectAlternativeName).value
+        leaf = (x509.CertificateBuilder()
+                .subject_name(x509.Name([])).issuer_name(self.intermediate.subject)
+                .public_key(csr.public_key()).serial_number(x509.random_serial_number())
+                .not_valid_before(now).not_valid_after(now + datetime.timedelta(days=90))
+                .add_extension(san, critical=True)
+                .sign(self.intermediate_key, hashes.SHA256()))
+        self.certificates[order_id] = "".join(
+            cert.public_bytes(serialization.Encoding.PEM).decode("ascii") for cert in (leaf, self.intermediate))
+        self.orders[order_id]["status"] = "valid"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def _send(self, status: int, body: Any = None, headers: Dict[str, str] = None,
+                      content_type: str = "application/json") -> None:
+                time.sleep(server.latency)
+                data = b"" if body is None else (body.encode("ascii") if isinstance(body, str) else json.dumps(body).encode("utf-8"))
+                self.send_response(status)
+                self.send_header("Replay-Nonce", secrets.token_urlsafe(16))
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(data)
+
+            def do_HEAD(self) -> None:
+                self._send(200)
+
+            def do_GET(self) -> None:
+                if self.path == "/dir":
+                    self._send(200, server._directory())
+                else:
+                    self._send(404, {"type": "urn:ietf:params:acme:error:malformed", "detail": "not found"},
+                               content_type="application/problem+json")
+
+            def do_POST(self) -> None:
+                jws = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                payload = json.loads(_b64decode(jws["payload"])) if jws.get("payload") else None
+                _, kind, *rest = self.path.split("/")
+                ident = rest[0] if rest else None
+                with server._lock:
+                    self._dispatch(kind, ident, payload)
+
+            def _dispatch(self, kind: str, ident: str, payload: Any) -> None:
+                base = server.base_url
+                if kind == "new-acct":
+                    self._send(201, {"status": "valid", "contact": payload.get("contact", [])},
+                               headers={"Location": f"{base}/acct/1"})
+                elif kind == "new-order":
+                    order_id = str(len(server.orders) + 1)
+                    authz_ids = []
+                    for i, identifier in enumerate(payload["identifiers"]):
+                        authz_id = f"{order_id}-{i}"
+                        value = identifier["value"]
+                        server.authzs[authz_id] = {"value": value[2:] if value.startswith("*.") else value,
+                                                   "wildcard": value.startswith("*."), "status": "pending",
+                                                   "token": secrets.token_urlsafe(32)}
+                        authz_ids.append(authz_id)
+                    server.orders[order_id] = {"status": "pending", "identifiers": payload["identifiers"], "authzs": authz_ids}
+                    self._send(201, server._order_body(order_id), headers={"Location": f"{base}/order/{order_id}"})
+                elif kind == "authz":
+                    self._send(200, server._authz_body(ident))
+                elif kind == "chall":
+                    server.authzs[ident]["status"] = "valid"
+                    body = server._authz_body(ident)["challenges"][0]
+                    self._send(200, body, headers={"Link": f'<{base}/authz/{ident}>;rel="up"'})
+                elif kind == "finalize":
+                    server._issue(ident, _b64decode(payload["csr"]))
+                    self._send(200, server._order_body(ident), headers={"Location": f"{base}/order/{ident}"})
+                elif kind == "order":
+                    self._send(200, server._order_body(ident))
+                elif kind == "key-change":
+                    if server.reject_key_change:
+                        self._send(400, {"type": "urn:ietf:params:acme:error:malformed", "detail": "key change rejected"},
+                                   content_type="application/problem+json")
+                    else:
+                        server.key_changes.append(json.loads(_b64decode(payload["payload"])))
+                        self._send(200, {"status": "valid"})
+                elif kind == "cert":
+                    self._send(200, server.certificates[ident], content_type="application/pem-certificate-chain")
+                else:
+                    self._send(404, {"type": "urn:ietf:params:acme:error:malformed", "detail": "not found"},
+                               content_type="application/problem+json")
+
+        return Handler
+
+
+class FakeAlidnsClient:
+    """
+    阿里云 DNS SDK 客户端的替身，只实现申请流程用到的 *_with_options 方法，返回真实的 SDK 响应模型。
+    """
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.records: List[Dict[str, Any]] = []
+        self._next_id = 1000
+
+    def _response(self, model: str, body: Dict[str, Any]):
+        time.sleep(self.latency)
+        return getattr(alidns_20150109_models, model)().from_map({"headers": {}, "statusCode": 200, "body": body})
+
+    def describe_domain_records_with_options(self, request, runtime):
+        records = [r for r in self.records if r["DomainName"] == request.domain_name
+                   and (not request.rrkey_word or request.rrkey_word in r["RR"])
+                   and (not request.type or r["Type"] == request.type)]
+        return self._response("DescribeDomainRecordsResponse", {
+            "TotalCount": len(records), "PageSize": request.page_size or 20, "PageNumber": request.page_number or 1,
+            "DomainRecords": {"Record": records}, "RequestId": "fake"})
+
+    def add_domain_record_with_options(self, request, runtime):
+        self._next_id += 1
+        self.records.append({"DomainName": request.domain_name, "RR": request.rr, "Type": request.type,
+                             "Value": request.value, "TTL": request.ttl, "RecordId": str(self._next_id)})
+        return self._response("AddDomainRecordResponse", {"RecordId": str(self._next_id), "RequestId": "fake"})
+
+    def delete_domain_record_with_options(self, request, runtime):
+        self.records = [r for r in self.records if r["RecordId"] != request.record_id]
+        return self._response("DeleteDomainRecordResponse", {"RecordId": request.record_id, "RequestId": "fake"})
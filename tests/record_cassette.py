@@ -0,0 +1,105 @@
+"""
+重新生成 tests/fixtures/issuance_cassette.json：启动本地 ACME 替身服务器，配合阿里云 DNS 替身客户端，
+以录制模式通过 main._execute_acme_process 完整执行一次申请流程（注册账户、创建订单、DNS-01 挑战、
+最终确定订单、保存证书），然后清理 DNS 记录。
+
+    python tests/record_cassette.py
+
+替身服务器固定监听 FIXTURE_PORT，回放时按录制的 URL 匹配请求；替身的响应延迟使录制的耗时可用于回放时的耗时断言。
+"""
+import os
+import sys
+import tempfile
+import types
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loguru import logger
+
+import main as acme_main
+from acme_client import AcmeClient
+from acme_network import DirectoryCache
+from aliyun_dns import AliyunDNSManager
+from api_metrics import ApiMetrics
+from cassette import Cassette, CASSETTE_RECORD
+from key_manager import KEY_REUSE_NEW, KEY_TYPE_EC
+
+FIXTURE_PORT = 14000
+ACME_LATENCY = 0.05
+ALIYUN_LATENCY = 0.02
+DIRECTORY_URL = f"http://127.0.0.1:{FIXTURE_PORT}/dir"
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "issuance_cassette.json")
+DOMAINS = ["example.com", "*.example.com"]
+
+
+def fixture_config(output_dir: str) -> types.SimpleNamespace:
+    """
+    返回申请流程使用的配置，密钥和证书保存在 output_dir 中。
+    """
+    key_path = os.path.join(output_dir, "keys")
+    cert_path = os.path.join(output_dir, "certs")
+    return types.SimpleNamespace(
+        DOMAINS=DOMAINS,
+        ACME_CONTACT_EMAIL="fixture@example.com",
+        KEY_PATH=key_path,
+        CERT_PATH=cert_path,
+        INVENTORY_INDEX_PATH=os.path.join(key_path, ".inventory.json"),
+        account_key_path=os.path.join(key_path, "account.key"),
+        cert_key_path=os.path.join(key_path, "cert.key"),
+        certificate_path=os.path.join(cert_path, "cert.pem"),
+        certificate_chain_path=os.path.join(cert_path, "chain.pem"),
+        COMMON_PASSWORD=None,
+        CERT_KEY_SIZE=3072,
+        CERT_KEY_TYPE=KEY_TYPE_EC,
+        CERT_EC_CURVE="secp256r1",
+        CERT_KEY_REUSE_POLICY=KEY_REUSE_NEW,
+        CERT_KEY_MAX_AGE_DAYS=90,
+        CERT_DUAL_ALGORITHM=False,
+        CHAIN_STORE=False,
+        DEPLOY_TARGETS=[],
+    )
+
+
+def run_issuance(cassette: Cassette, directory_cache_path: str, output_dir: str,
+                 aliyun_client: Any = None) -> Dict[str, Any]:
+    """
+    使用 cassette 通过 main._execute_acme_process 执行一次完整的申请流程，然后清理 DNS 记录。
+    :param cassette: 录制或回放用的 Cassette。
+    :param directory_cache_path: ACME 目录缓存文件路径。
+    :param output_dir: 保存密钥和证书的目录。
+    :param aliyun_client: (可选) 录制时使用的阿里云 DNS 客户端；回放时不需要。
+    :return: {"metrics": ApiMetrics, "client": AcmeClient, "config": 配置, "ok": 是否成功申请并保存证书}
+    """
+    metrics = ApiMetrics()
+    dns = AliyunDNSManager("fixture-key", "fixture-secret", "alidns.fixture.test", metrics=metrics, cassette=cassette)
+    # 回放时所有调用由 cassette 返回，被包装的客户端不会被调用
+    dns._client = cassette.wrap_aliyun_client(aliyun_client)
+    client = AcmeClient(DIRECTORY_URL, dns, metrics=metrics, cassette=cassette,
+                        directory_cache=DirectoryCache(directory_cache_path))
+    config_obj = fixture_config(output_dir)
+    ok, cleanup = acme_main._execute_acme_process(client, config_obj, logger)
+    client.cleanup_dns_records(cleanup)
+    return {"metrics": metrics, "client": client, "config": config_obj, "ok": ok}
+
+
+def main() -> int:
+    from fake_acme import FakeAcmeServer, FakeAlidnsClient
+
+    server = FakeAcmeServer(FIXTURE_PORT, latency=ACME_LATENCY).start()
+    cassette = Cassette(FIXTURE_PATH, CASSETTE_RECORD)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            result = run_issuance(cassette, os.path.join(tmp, "directory.json"), tmp,
+                                  FakeAlidnsClient(latency=ALIYUN_LATENCY))
+    finally:
+        server.stop()
+    if not result["ok"]:
+        print("申请失败，未保存 cassette。", file=sys.stderr)
+        return 1
+    cassette.save()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+from acme_client import AcmeClient
+from ca_pool import AccountCache
+from fake_acme import FakeAcmeServer
+from key_manager import KeyManager, KEY_TYPE_EC, KEY_TYPE_RSA
+
+CA_NAME = "default"
+
+
+@pytest.fixture
+def server():
+    server = FakeAcmeServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AccountCache(str(tmp_path / "accounts"))
+
+
+def _client(server, cache, key_type):
+    base = AcmeClient(server.directory_url, None, account_key_type=key_type)
+    return base.for_ca(CA_NAME, server.directory_url, account_cache=cache)
+
+
+@pytest.fixture
+def rsa_account(server, cache):
+    # 先以 RSA 密钥注册并缓存账户
+    client = _client(server, cache, KEY_TYPE_RSA)
+    client.register_acme_account("admin@example.test")
+    return client
+
+
+def _cached_key_type(server, cache):
+    key, _ = cache.load(CA_NAME, server.directory_url)
+    return KeyManager(account_key=key).account_key_type
+
+
+def test_cached_rsa_account_is_rolled_over_to_ec(server, cache, rsa_account):
+    client = _client(server, cache, KEY_TYPE_EC)
+    client.register_acme_account("admin@example.test")
+
+    assert client.key_manager.account_key_type == KEY_TYPE_EC
+    assert _cached_key_type(server, cache) == KEY_TYPE_EC
+    assert len(server.key_changes) == 1
+    assert server.key_changes[0]["account"] == rsa_account.account.uri
+
+
+def test_rejected_rollover_keeps_old_key(server, cache, rsa_account):
+    server.reject_key_change = True
+    client = _client(server, cache, KEY_TYPE_EC)
+
+    client.register_acme_account("admin@example.test")
+
+    assert client.account.uri == rsa_account.account.uri
+    assert client.key_manager.account_key_type == KEY_TYPE_RSA
+    assert _cached_key_type(server, cache) == KEY_TYPE_RSA
+
+
+def test_rollover_by_another_process_is_reused(server, cache, rsa_account):
+    # 两个运行都读取了缓存的 RSA 账户，第一个完成轮换后，第二个改用缓存中的新密钥，而不是用已作废的旧密钥再轮换一次
+    first = _client(server, cache, KEY_TYPE_EC)
+    second = _client(server, cache, KEY_TYPE_EC)
+    first.register_acme_account("admin@example.test")
+
+    second.register_acme_account("admin@example.test")
+
+    assert len(server.key_changes) == 1
+    cached_key, _ = cache.load(CA_NAME, server.directory_url)
+    for client in (first, second):
+        assert client.key_manager._account_key.private_numbers() == cached_key.private_numbers()
+        assert client.client.net.key.key.private_numbers() == cached_key.private_numbers()
+
+
+def test_forced_rollover_generates_a_new_key(server, cache, rsa_account):
+    client = _client(server, cache, KEY_TYPE_EC)
+    client._init_acme_client()
+
+    assert not client.rollover_to_key_type(KEY_TYPE_RSA)
+    assert client.rollover_to_key_type(KEY_TYPE_RSA, force=True)
+    assert len(server.key_changes) == 1
+    assert _cached_key_type(server, cache) == KEY_TYPE_RSA
+
+
+def test_unsupported_cached_key_is_ignored(server, cache, rsa_account):
+    key_path, _ = cache._paths(CA_NAME)
+    with open(key_path, "wb") as f:
+        f.write(ed25519.Ed25519PrivateKey.generate().private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()))
+
+    assert cache.load(CA_NAME, server.directory_url) is None
@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+import pytest
+
+from bootstrap import Bootstrap, PreflightError
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_collects_results_and_skips_non_fatal_failures():
+    bootstrap = Bootstrap(max_workers=2)
+    bootstrap.add("a", lambda: 1)
+    bootstrap.add("b", lambda: 1 / 0, fatal=False)
+    bootstrap.add("c", lambda: "c")
+
+    assert bootstrap.run() == {"a": 1, "c": "c"}
+    assert "division by zero" in bootstrap.timings["b"]["error"]
+    assert set(bootstrap.timings) == {"a", "b", "c"}
+
+
+def test_fatal_failure_does_not_wait_for_running_tasks():
+    release = threading.Event()
+    started = []
+    bootstrap = Bootstrap(max_workers=2)
+    bootstrap.add("blocked", lambda: release.wait(30))
+    bootstrap.add("dns_zones", lambda: (_ for _ in ()).throw(RuntimeError("区域不存在")))
+    bootstrap.add("later", lambda: started.append("later"))
+
+    start = time.monotonic()
+    with pytest.raises(PreflightError) as info:
+        bootstrap.run()
+    assert time.monotonic() - start < 5
+    assert info.value.task == "dns_zones"
+    release.set()
+    time.sleep(0.1)
+    # 失败之后尚未开始的任务不再执行
+    assert started == []
+
+
+def test_process_exits_while_task_is_still_running():
+    script = textwrap.dedent("""
+        import threading
+        from bootstrap import Bootstrap, PreflightError
+        bootstrap = Bootstrap()
+        bootstrap.add("hung", threading.Event().wait)
+        bootstrap.add("fails", lambda: 1 / 0)
+        try:
+            bootstrap.run()
+        except PreflightError:
+            pass
+    """)
+    completed = subprocess.run([sys.executable, "-c", script], cwd=REPO_ROOT, capture_output=True, timeout=30)
+
+    assert completed.returncode == 0
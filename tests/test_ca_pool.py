@@ -0,0 +1,136 @@
+import threading
+import time
+
+import pytest
+
+from acme_client import AcmeClient
+from ca_pool import CaHealth, IssuanceRace, MultiCaIssuer, CA_POLICY_FAILOVER, CA_POLICY_HEDGE
+from key_manager import KEY_TYPE_EC
+
+CAS = [{"name": "ca-a", "directory_url": "https://ca-a.test/directory"},
+       {"name": "ca-b", "directory_url": "https://ca-b.test/directory"}]
+
+
+@pytest.fixture
+def base_client():
+    return AcmeClient("https://unused.test/directory", None, account_key_type=KEY_TYPE_EC)
+
+
+@pytest.fixture
+def health(tmp_path):
+    return CaHealth(str(tmp_path / "ca_health.json"))
+
+
+class FakeAttempts:
+    """
+    按 CA 名称配置的签发尝试：等待 delay 秒后失败（fail=True）或调用 claim_result 保存证书。
+    cancellable=False 时等待不响应取消信号，用来模拟已经在最终确定订单、来不及放弃的 CA。
+    """
+    def __init__(self, base_client, plans):
+        self.base_client = base_client
+        self.plans = plans
+        self.started = []
+        self.claims = {}
+        self.cancelled = []
+        self._lock = threading.Lock()
+
+    def __call__(self, ca, race):
+        plan = self.plans[ca["name"]]
+        client = self.base_client.for_ca(ca["name"], ca["directory_url"], race=race)
+        with self._lock:
+            self.started.append(ca["name"])
+        try:
+            if plan.get("cancellable", True):
+                client._sleep(plan["delay"])
+            else:
+                time.sleep(plan["delay"])
+        except Exception:
+            with self._lock:
+                self.cancelled.append(ca["name"])
+            raise
+        if plan.get("fail"):
+            raise RuntimeError(f"{ca['name']} 签发失败")
+        claimed = client.claim_result()
+        with self._lock:
+            self.claims[ca["name"]] = claimed
+        return claimed
+
+
+def test_failover_switches_after_failure(base_client, health):
+    attempts = FakeAttempts(base_client, {"ca-a": {"delay": 0, "fail": True}, "ca-b": {"delay": 0}})
+    issuer = MultiCaIssuer(CAS, policy=CA_POLICY_FAILOVER, deadline=5, health=health)
+
+    assert issuer.issue(attempts) == "ca-b"
+    assert attempts.started == ["ca-a", "ca-b"]
+    snapshot = health.snapshot()
+    assert snapshot["ca-a"]["failures"] == 1 and snapshot["ca-a"]["last_error"] == "ca-a 签发失败"
+    assert snapshot["ca-b"]["successes"] == 1
+    # 失败的 CA 在冷却期内排到后面
+    assert [ca["name"] for ca in health.ordered(CAS)] == ["ca-b", "ca-a"]
+
+
+def test_failover_cancels_after_deadline(base_client, health):
+    attempts = FakeAttempts(base_client, {"ca-a": {"delay": 30}, "ca-b": {"delay": 0}})
+    issuer = MultiCaIssuer(CAS, policy=CA_POLICY_FAILOVER, deadline=0.2, health=health)
+
+    start = time.monotonic()
+    assert issuer.issue(attempts) == "ca-b"
+    assert time.monotonic() - start < 5
+    assert attempts.cancelled == ["ca-a"]
+    assert "ca-a" not in attempts.claims
+    # 超时只记录一次
+    snapshot = health.snapshot()
+    assert snapshot["ca-a"]["failures"] == 1 and snapshot["ca-a"]["last_error"] == "超时"
+
+
+def test_hedge_first_ca_wins_before_delay(base_client, health):
+    attempts = FakeAttempts(base_client, {"ca-a": {"delay": 0}, "ca-b": {"delay": 0}})
+    issuer = MultiCaIssuer(CAS, policy=CA_POLICY_HEDGE, hedge_delay=5, health=health)
+
+    assert issuer.issue(attempts) == "ca-a"
+    assert attempts.started == ["ca-a"]
+
+
+def test_hedge_second_ca_wins_and_first_is_cancelled(base_client, health):
+    attempts = FakeAttempts(base_client, {"ca-a": {"delay": 30}, "ca-b": {"delay": 0.05}})
+    issuer = MultiCaIssuer(CAS, policy=CA_POLICY_HEDGE, hedge_delay=0.1, health=health)
+
+    start = time.monotonic()
+    assert issuer.issue(attempts) == "ca-b"
+    assert time.monotonic() - start < 5
+    assert attempts.started == ["ca-a", "ca-b"]
+    assert attempts.cancelled == ["ca-a"]
+    # 被取消的 CA 不记为失败
+    assert "ca-a" not in health.snapshot()
+
+
+def test_hedge_late_loser_cannot_claim(base_client, health):
+    attempts = FakeAttempts(base_client, {"ca-a": {"delay": 0.4, "cancellable": False}, "ca-b": {"delay": 0}})
+    issuer = MultiCaIssuer(CAS, policy=CA_POLICY_HEDGE, hedge_delay=0.1, health=health)
+
+    assert issuer.issue(attempts) == "ca-b"
+    # 较慢的 CA 完成后仍会调用 claim_result，但不能保存证书
+    assert attempts.claims == {"ca-b": True, "ca-a": False}
+    snapshot = health.snapshot()
+    assert "ca-a" not in snapshot and snapshot["ca-b"]["successes"] == 1
+
+
+def test_hedge_both_fail(base_client, health):
+    attempts = FakeAttempts(base_client, {"ca-a": {"delay": 0.2, "fail": True}, "ca-b": {"delay": 0, "fail": True}})
+    issuer = MultiCaIssuer(CAS, policy=CA_POLICY_HEDGE, hedge_delay=0.05, health=health)
+
+    assert issuer.issue(attempts) is None
+    assert sorted(attempts.started) == ["ca-a", "ca-b"]
+    assert attempts.claims == {}
+    snapshot = health.snapshot()
+    assert snapshot["ca-a"]["failures"] == 1 and snapshot["ca-b"]["failures"] == 1
+
+
+def test_race_claim_is_exclusive():
+    race = IssuanceRace()
+    events = {name: race.register(name) for name in ("ca-a", "ca-b", "ca-c")}
+
+    assert race.claim("ca-b")
+    assert not race.claim("ca-a")
+    assert race.claim("ca-b")
+    assert events["ca-a"].is_set() and events["ca-c"].is_set() and not events["ca-b"].is_set()
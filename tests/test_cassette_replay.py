@@ -0,0 +1,74 @@
+import json
+import os
+import time
+
+import pytest
+
+from cassette import Cassette, CASSETTE_REPLAY
+from record_cassette import DIRECTORY_URL, FIXTURE_PATH, run_issuance
+
+CPU_BUDGET = 3.0 # 秒，主要是生成账户密钥
+
+
+def _recorded():
+    with open(FIXTURE_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)["interactions"]
+
+
+@pytest.fixture
+def stale_directory_cache(tmp_path):
+    # 缓存中的目录仍在有效期内，但端点地址已失效；使用 cassette 时不应读取它
+    path = tmp_path / "directory.json"
+    path.write_text(json.dumps({DIRECTORY_URL: {"fetched_at": time.time(), "directory": {
+        "newNonce": "http://127.0.0.1:1/gone", "newAccount": "http://127.0.0.1:1/gone",
+        "newOrder": "http://127.0.0.1:1/gone"}}}), encoding="utf-8")
+    return str(path)
+
+
+def test_replay_full_issuance_offline(stale_directory_cache, tmp_path):
+    cassette = Cassette(FIXTURE_PATH, CASSETTE_REPLAY, speed=0)
+    start = time.process_time()
+    result = run_issuance(cassette, stale_directory_cache, str(tmp_path))
+    cpu = time.process_time() - start
+
+    assert result["ok"]
+    config_obj = result["config"]
+    with open(config_obj.certificate_chain_path, "rb") as f:
+        assert f.read() == result["client"].key_manager.certificate_chain
+    for path in (config_obj.account_key_path, config_obj.cert_key_path, config_obj.certificate_path):
+        assert os.path.isfile(path)
+    assert cassette.stats() == {"mode": CASSETTE_REPLAY, "replayed": len(_recorded()), "unused": 0}
+
+    metrics = result["metrics"]
+    assert metrics.total("acme", "directory") == 1
+    assert metrics.total("acme", "newNonce") == 0
+    assert metrics.total("acme", "newAccount") == 1
+    assert metrics.total("acme", "newOrder") == 1
+    assert metrics.total("acme", "authorization") == 6
+    assert metrics.total("acme", "challenge") == 2
+    assert metrics.total("acme", "finalize") == 1
+    assert metrics.total("acme", "order") == 1
+    assert metrics.total("acme", "certificate") == 1
+    assert metrics.total("acme") == 14
+    assert metrics.total("aliyun_dns") == 5
+
+    # 回放不访问网络，CPU 时间只用于生成密钥、签名和解析响应；不受 acme 库轮询等待的影响
+    assert cpu < CPU_BUDGET
+
+
+def test_replay_scales_recorded_latency(stale_directory_cache, tmp_path):
+    speed = 0.2
+    cassette = Cassette(FIXTURE_PATH, CASSETTE_REPLAY, speed=speed)
+    result = run_issuance(cassette, stale_directory_cache, str(tmp_path))
+
+    assert result["ok"]
+    recorded = {}
+    for interaction in _recorded():
+        if interaction["key"].startswith("http "):
+            recorded["acme"] = recorded.get("acme", 0) + interaction["elapsed"]
+        else:
+            recorded["aliyun_dns"] = recorded.get("aliyun_dns", 0) + interaction["elapsed"]
+    snapshot = result["metrics"].snapshot()
+    for service, seconds in recorded.items():
+        total_ms = sum(entry["total_ms"] for action, entry in snapshot[service].items() if action != "_total")
+        assert total_ms >= seconds * speed * 1000 * 0.95
@@ -0,0 +1,84 @@
+import datetime
+import json
+import multiprocessing
+import os
+import types
+
+from cryptography import x509
+from cryptography.x509.oid import NameOID
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+import main
+from chain_store import ChainStore
+
+PROCESSES = 4
+CHAINS_PER_PROCESS = 10
+
+
+def _cert(common_name, issuer_key=None, issuer_name=None):
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, common_name)])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder()
+            .subject_name(name).issuer_name(issuer_name or name)
+            .public_key(key.public_key()).serial_number(x509.random_serial_number())
+            .not_valid_before(now).not_valid_after(now + datetime.timedelta(days=30))
+            .sign(issuer_key or key, hashes.SHA256()))
+    return key, cert
+
+
+def _chain(intermediate_key, intermediate, common_name):
+    _, leaf = _cert(common_name, intermediate_key, intermediate.subject)
+    return b"".join(c.public_bytes(serialization.Encoding.PEM) for c in (leaf, intermediate))
+
+
+def _store_many(store_dir, worker, intermediate_pem, intermediate_key_pem):
+    intermediate = x509.load_pem_x509_certificate(intermediate_pem)
+    intermediate_key = serialization.load_pem_private_key(intermediate_key_pem, password=None)
+    store = ChainStore(store_dir)
+    for i in range(CHAINS_PER_PROCESS):
+        name = f"w{worker}-{i}.example.test"
+        store.store_chain(_chain(intermediate_key, intermediate, name), os.path.join(store_dir, "out", f"{name}.pem"))
+
+
+def test_store_chain_deduplicates_intermediates(tmp_path):
+    intermediate_key, intermediate = _cert("Test Intermediate")
+    store = ChainStore(str(tmp_path / "store"))
+
+    chain = _chain(intermediate_key, intermediate, "a.example.test")
+    assert store.store_chain(chain, str(tmp_path / "a.pem")) == chain
+    store.store_chain(_chain(intermediate_key, intermediate, "b.example.test"), str(tmp_path / "b.pem"))
+
+    manifest = store.manifest()
+    assert len(manifest["certificates"]) == 2
+    assert len(manifest["intermediates"]) == 1
+    assert os.listdir(store.objects_dir) == [f"{next(iter(manifest['intermediates']))}.pem"]
+
+
+def test_concurrent_processes_keep_every_manifest_entry(tmp_path):
+    store_dir = str(tmp_path / "store")
+    intermediate_key, intermediate = _cert("Test Intermediate")
+    args = (intermediate.public_bytes(serialization.Encoding.PEM),
+            intermediate_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                           serialization.NoEncryption()))
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_store_many, args=(store_dir, worker) + args) for worker in range(PROCESSES)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+
+    with open(os.path.join(store_dir, "manifest.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert len(manifest["certificates"]) == PROCESSES * CHAINS_PER_PROCESS
+    assert len(manifest["intermediates"]) == 1
+
+
+def test_chain_store_is_shared_per_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "_chain_stores", {})
+    config_obj = types.SimpleNamespace(CHAIN_STORE=True, CHAIN_STORE_DIR=str(tmp_path / "store"))
+
+    assert main._chain_store(config_obj) is main._chain_store(config_obj)
+    assert main._chain_store(types.SimpleNamespace(CHAIN_STORE=False)) is None
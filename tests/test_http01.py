@@ -0,0 +1,99 @@
+import http.client
+import threading
+
+import pytest
+
+from http01 import Http01Responder, StandaloneHttp01Responder, HTTP01_PATH_PREFIX
+
+
+def _get(port: int, path: str, method: str = "GET"):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        conn.request(method, path)
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+
+def _listening(port: int) -> bool:
+    try:
+        _get(port, "/")
+        return True
+    except OSError:
+        return False
+
+
+@pytest.fixture
+def responder():
+    responder = StandaloneHttp01Responder(host="127.0.0.1", port=0)
+    yield responder
+    while responder._users:
+        responder.stop()
+
+
+def test_interface_is_abstract():
+    with pytest.raises(TypeError):
+        Http01Responder()
+
+
+def test_serves_token_and_404_for_unknown(responder):
+    responder.start()
+    responder.add("token-1", "token-1.thumbprint")
+
+    assert _get(responder.port, HTTP01_PATH_PREFIX + "token-1") == (200, b"token-1.thumbprint")
+    assert _get(responder.port, HTTP01_PATH_PREFIX + "token-1", method="HEAD") == (200, b"")
+    assert _get(responder.port, HTTP01_PATH_PREFIX + "unknown")[0] == 404
+    assert _get(responder.port, "/index.html")[0] == 404
+
+    responder.remove("token-1")
+    assert _get(responder.port, HTTP01_PATH_PREFIX + "token-1")[0] == 404
+
+    port = responder.port
+    responder.stop()
+    assert not _listening(port)
+
+
+def test_stop_keeps_listening_while_other_users_remain(responder):
+    responder.start()
+    responder.start()
+    responder.add("token-2", "token-2.thumbprint")
+
+    responder.stop()
+    assert _get(responder.port, HTTP01_PATH_PREFIX + "token-2") == (200, b"token-2.thumbprint")
+
+    responder.stop()
+    assert not _listening(responder.port)
+    # 多余的 stop 不会出错
+    responder.stop()
+
+
+def test_concurrent_start_stop(responder):
+    responder.start()
+    responder.add("token-3", "token-3.thumbprint")
+    barrier = threading.Barrier(8)
+    errors = []
+
+    def flow():
+        try:
+            barrier.wait()
+            responder.start()
+            try:
+                status, body = _get(responder.port, HTTP01_PATH_PREFIX + "token-3")
+                assert (status, body) == (200, b"token-3.thumbprint")
+            finally:
+                responder.stop()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=flow) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    # 第一次 start 仍未 stop，监听保持
+    assert _get(responder.port, HTTP01_PATH_PREFIX + "token-3")[0] == 200
+    responder.stop()
+    assert not _listening(responder.port)
@@ -0,0 +1,108 @@
+import time
+import types
+
+import profiler
+from bootstrap import Bootstrap
+from profiler import collapse_stats, PhaseProfiler
+
+TT = 0.01
+
+
+def _func(name):
+    return ("app.py", 1, name)
+
+
+def _diamond(layers):
+    """
+    合成的菱形调用图：root 调用第 1 层的 a1、b1，第 i 层的两个函数都调用第 i+1 层的两个函数。
+    每个函数自身耗时 TT，第 i 层函数的累计耗时为 TT * (layers - i + 1)，由上一层的两个调用者平分。
+    """
+    def cumulative(layer):
+        return TT * (layers - layer + 1)
+
+    entries = {}
+    for layer in range(1, layers + 1):
+        callers = ["root"] if layer == 1 else [f"a{layer - 1}", f"b{layer - 1}"]
+        for name in (f"a{layer}", f"b{layer}"):
+            entries[_func(name)] = (len(callers), len(callers), TT, cumulative(layer), {
+                _func(caller): (1, 1, TT / len(callers), cumulative(layer) / len(callers)) for caller in callers
+            })
+    entries[_func("root")] = (1, 1, TT, TT + 2 * cumulative(1), {})
+    return types.SimpleNamespace(stats=entries)
+
+
+def _weights(lines):
+    return {line.rsplit(" ", 1)[0]: int(line.rsplit(" ", 1)[1]) for line in lines}
+
+
+def test_small_diamond_splits_shared_callees():
+    weights = _weights(collapse_stats(_diamond(2)))
+    r, a1, b1, a2, b2 = (f"{name} (app.py:1)" for name in ("root", "a1", "b1", "a2", "b2"))
+
+    assert weights == {
+        r: 10000,
+        f"{r};{a1}": 10000, f"{r};{a1};{a2}": 5000, f"{r};{a1};{b2}": 5000,
+        f"{r};{b1}": 10000, f"{r};{b1};{a2}": 5000, f"{r};{b1};{b2}": 5000,
+    }
+
+
+def test_deep_diamond_is_bounded_and_keeps_total(monkeypatch):
+    monkeypatch.setattr(profiler, "MAX_FOLDED_PATHS", 500)
+    layers = 40 # 完全展开需要 2^40 条路径
+    stats = _diamond(layers)
+
+    start = time.perf_counter()
+    lines = collapse_stats(stats)
+    assert time.perf_counter() - start < 5
+
+    assert len(lines) <= 500
+    total = sum(_weights(lines).values())
+    root_ct = stats.stats[_func("root")][3]
+    assert abs(total - root_ct * 1e6) <= len(lines)
+
+
+def test_default_limit_on_deep_diamond():
+    lines = collapse_stats(_diamond(60))
+
+    assert len(lines) <= profiler.MAX_FOLDED_PATHS
+    assert max(line.count(";") for line in lines) < profiler.MAX_STACK_DEPTH
+
+
+def test_phase_profiler_writes_folded_stacks(tmp_path):
+    phases = PhaseProfiler(str(tmp_path))
+    with phases.phase("work"):
+        sum(i * i for i in range(10000))
+
+    summary = phases.summary()
+    assert summary["phases"]["work"]["calls"] == 1
+    (pstats_path,) = summary["phases"]["work"]["files"]
+    with open(pstats_path[:-len(".pstats")] + ".folded", "r", encoding="utf-8") as f:
+        assert f.read().strip()
+
+
+def _spin_account():
+    return sum(i * i for i in range(20000))
+
+
+def _spin_zones():
+    return sum(i for i in range(20000))
+
+
+def test_bootstrap_tasks_are_profiled_on_their_worker_threads(tmp_path):
+    phases = PhaseProfiler(str(tmp_path))
+    bootstrap = Bootstrap(max_workers=2, profiler=phases)
+    bootstrap.add("acme_account", _spin_account)
+    bootstrap.add("dns_zones", _spin_zones)
+    with phases.phase("bootstrap", profile=False):
+        bootstrap.run()
+
+    summary = phases.summary()
+    assert summary["phases"]["bootstrap"]["files"] == []
+    for task, func in (("acme_account", _spin_account), ("dns_zones", _spin_zones)):
+        entry = summary["phases"][f"bootstrap.{task}"]
+        assert entry["parent"] == "bootstrap"
+        (pstats_path,) = entry["files"]
+        with open(pstats_path[:-len(".pstats")] + ".folded", "r", encoding="utf-8") as f:
+            assert func.__name__ in f.read()
+    # 子阶段的时间已包含在启动阶段中，汇总不重复计算
+    assert summary["wall_ms"] == summary["phases"]["bootstrap"]["wall_ms"]
@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from locks import FileLockBackend, LockManager
+from quota import QuotaForecaster
+
+CERT = ["example.com", "*.example.com", "www.example.com"]
+
+
+@pytest.fixture
+def ledger_path(tmp_path):
+    return str(tmp_path / "ledger.json")
+
+
+def test_estimate_counts_orders_per_certificate(ledger_path):
+    forecaster = QuotaForecaster(ledger_path)
+
+    assert forecaster.estimate([CERT]) == {"orders": 1, "new_authorizations": 3, "dns_api_calls": 7}
+    # 第二个订单复用已验证的授权，只增加订单数
+    assert forecaster.estimate([CERT], orders_per_certificate=2) == {"orders": 2, "new_authorizations": 3, "dns_api_calls": 7}
+
+
+def test_dual_algorithm_admission_uses_real_headroom(ledger_path):
+    quotas = {"orders": {"limit": 10, "window": 3600}, "new_authorizations": {"limit": 6, "window": 3600}}
+    forecaster = QuotaForecaster(ledger_path, quotas=quotas)
+
+    admitted, deferred, forecast = forecaster.admit([CERT, ["a.example.org"], ["b.example.org"]], orders_per_certificate=2)
+
+    assert admitted == [CERT, ["a.example.org"], ["b.example.org"]] and deferred == []
+    assert forecast["planned"]["orders"] == 6 and forecast["planned"]["new_authorizations"] == 5
+    assert forecast["orders_per_certificate"] == 2
+
+
+def test_orders_limit_defers_in_order(ledger_path):
+    forecaster = QuotaForecaster(ledger_path, quotas={"orders": {"limit": 3, "window": 3600}})
+
+    admitted, deferred, _ = forecaster.admit([["a.test"], ["b.test"], ["c.test"]], orders_per_certificate=2)
+
+    assert admitted == [["a.test"]] and deferred == [["b.test"], ["c.test"]]
+
+
+def _ledger_forecaster(ledger_path, lock_dir, limit=2):
+    return QuotaForecaster(ledger_path, quotas={"orders": {"limit": limit, "window": 3600}},
+                           lock_manager=LockManager(FileLockBackend(lock_dir)))
+
+
+def test_concurrent_runs_see_each_others_reservation(ledger_path, tmp_path):
+    # 两个同时启动的分片共享台账：第一个分片准入后预留配额，第二个分片只能使用剩余部分
+    first = _ledger_forecaster(ledger_path, str(tmp_path / "locks"))
+    second = _ledger_forecaster(ledger_path, str(tmp_path / "locks"))
+
+    admitted, deferred, forecast = first.admit([["a.test"], ["b.test"]], run_id="run-shard-1of2")
+    assert len(admitted) == 2 and deferred == [] and forecast["reserved"]
+
+    admitted, deferred, forecast = second.admit([["c.test"], ["d.test"]], run_id="run-shard-2of2")
+    assert admitted == [] and deferred == [["c.test"], ["d.test"]]
+    assert forecast["remaining_before"] == {"orders": 0}
+
+
+def test_record_replaces_reservation_and_release_frees_it(ledger_path, tmp_path):
+    forecaster = _ledger_forecaster(ledger_path, str(tmp_path / "locks"), limit=3)
+    forecaster.admit([["a.test"], ["b.test"]], run_id="run-1")
+    forecaster.admit([["c.test"]], run_id="run-2")
+    assert forecaster.used_in_window("orders") == 3
+
+    # 实际只创建了一个订单
+    forecaster.record({"orders": 1}, run_id="run-1")
+    assert forecaster.used_in_window("orders") == 2
+    forecaster.release("run-2")
+    assert forecaster.used_in_window("orders") == 1
+
+    with open(ledger_path, "r", encoding="utf-8") as f:
+        (entry,) = json.load(f)
+    assert entry["run_id"] == "run-1" and not entry.get("reserved")
+
+
+def test_readmission_replaces_own_reservation(ledger_path, tmp_path):
+    forecaster = _ledger_forecaster(ledger_path, str(tmp_path / "locks"))
+
+    forecaster.admit([["a.test"], ["b.test"]], run_id="run-1")
+    admitted, _, _ = forecaster.admit([["a.test"], ["b.test"]], run_id="run-1")
+
+    assert len(admitted) == 2 and forecaster.used_in_window("orders") == 2
@@ -0,0 +1,146 @@
+import datetime
+import socket
+import ssl
+import threading
+
+import pytest
+from cryptography import x509
+from cryptography.x509.oid import NameOID
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from tls_verify import TlsEndpointVerifier, parse_endpoint
+
+SANS = ["example.test", "www.example.test", "*.example.test"]
+
+
+def _self_signed(directory, name):
+    key = ec.generate_private_key(ec.SECP256R1())
+    subject = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, SANS[0])])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder()
+            .subject_name(subject).issuer_name(subject)
+            .public_key(key.public_key()).serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1)).not_valid_after(now + datetime.timedelta(days=30))
+            .add_extension(x509.SubjectAlternativeName([x509.DNSName(san) for san in SANS]), critical=False)
+            .sign(key, hashes.SHA256()))
+    cert_path, key_path = directory / f"{name}.crt", directory / f"{name}.key"
+    cert_path.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    key_path.write_bytes(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                           serialization.NoEncryption()))
+    return str(cert_path), str(key_path)
+
+
+class LocalTlsServer:
+    """
+    在 127.0.0.1 的随机端口上提供指定证书的 TLS 服务器，每个连接完成握手后关闭。
+    """
+    def __init__(self, cert_path, key_path):
+        self.context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        self.context.load_cert_chain(cert_path, key_path)
+        self.sock = socket.create_server(("127.0.0.1", 0))
+        self.port = self.sock.getsockname()[1]
+        self.server_names = []
+        self.context.sni_callback = lambda ssl_sock, server_name, ctx: self.server_names.append(server_name)
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        try:
+            with self.context.wrap_socket(conn, server_side=True) as tls:
+                tls.recv(1)
+        except (OSError, ssl.SSLError):
+            pass
+
+    def close(self):
+        self.sock.close()
+
+
+@pytest.fixture
+def certs(tmp_path):
+    return {"deployed": _self_signed(tmp_path, "deployed"), "other": _self_signed(tmp_path, "other")}
+
+
+@pytest.fixture
+def server(certs):
+    server = LocalTlsServer(*certs["deployed"])
+    yield server
+    server.close()
+
+
+def test_parse_endpoint():
+    assert parse_endpoint("example.test") == ("example.test", 443)
+    assert parse_endpoint("example.test:8443") == ("example.test", 8443)
+    assert parse_endpoint("[::1]:8443") == ("::1", 8443)
+    assert parse_endpoint("[::1]") == ("::1", 443)
+
+
+def test_matched_endpoint_reports_latency(certs, server):
+    summary = TlsEndpointVerifier(timeout=5).verify([certs["deployed"][0]], [f"127.0.0.1:{server.port}"])
+
+    assert summary["checked"] == 2 and summary["matched"] == 2
+    assert summary["mismatched"] == [] and summary["errors"] == []
+    # 通配符域名没有确定的 SNI
+    assert summary["skipped"] == ["*.example.test"]
+    assert sorted(server.server_names) == ["example.test", "www.example.test"]
+    for result in summary["results"]:
+        assert result["attempts"] == 1
+        assert result["handshake_ms"] > 0
+    latency = summary["latency_ms"]
+    assert set(latency) == {"p50", "p95", "max"}
+    assert 0 < latency["p50"] <= latency["p95"] <= latency["max"]
+    assert latency["max"] == max(r["handshake_ms"] for r in summary["results"])
+
+
+def test_any_of_dual_certificates_matches(certs, server):
+    summary = TlsEndpointVerifier().verify([certs["other"][0], certs["deployed"][0]], [f"127.0.0.1:{server.port}"])
+
+    assert summary["matched"] == summary["checked"] == 2
+
+
+def test_mismatched_endpoint_is_retried(certs, server):
+    verifier = TlsEndpointVerifier(attempts=2, retry_delay=0.05)
+    summary = verifier.verify([certs["other"][0]], [{"address": f"127.0.0.1:{server.port}", "domains": ["www.example.test"]}])
+
+    assert summary["checked"] == 1 and summary["matched"] == 0 and summary["errors"] == []
+    (result,) = summary["mismatched"]
+    assert result["server_name"] == "www.example.test"
+    assert result["attempts"] == 2
+    assert result["fingerprint"] is not None and result["handshake_ms"] > 0
+    assert summary["latency_ms"]["max"] == result["handshake_ms"]
+
+
+def test_handshake_timeout_and_refused(certs):
+    # 只接受 TCP 连接、从不响应 ClientHello 的端点
+    silent = socket.create_server(("127.0.0.1", 0))
+    closed = socket.create_server(("127.0.0.1", 0))
+    closed_port = closed.getsockname()[1]
+    closed.close()
+    try:
+        verifier = TlsEndpointVerifier(timeout=0.3)
+        summary = verifier.verify([certs["deployed"][0]], [f"127.0.0.1:{silent.getsockname()[1]}", f"127.0.0.1:{closed_port}"],
+                                  domains=["example.test"])
+    finally:
+        silent.close()
+
+    assert summary["checked"] == 2 and summary["matched"] == 0 and summary["mismatched"] == []
+    assert len(summary["errors"]) == 2
+    timeout, refused = summary["errors"]
+    assert timeout["error"] == "TimeoutError"
+    assert refused["error"]
+    assert timeout["handshake_ms"] is None and refused["handshake_ms"] is None
+    assert summary["latency_ms"] is None
+
+
+def test_no_targets(certs):
+    summary = TlsEndpointVerifier().verify([certs["deployed"][0]], [{"address": "127.0.0.1:1", "domains": ["other.test"]}])
+
+    assert summary["checked"] == 0 and summary["latency_ms"] is None and summary["results"] == []
@@ -0,0 +1,152 @@
+import ssl
+import time
+import asyncio
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple, Union
+from loguru import logger
+
+from cert_inventory import parse_certificate_metadata
+
+
+def parse_endpoint(address: str, default_port: int = 443) -> Tuple[str, int]:
+    """
+    解析 "host:port" 形式的地址，支持 "[IPv6]:port"，未指定端口时使用 default_port。
+    """
+    address = address.strip()
+    if address.startswith("["):
+        host, _, rest = address[1:].partition("]")
+        return host, int(rest[1:]) if rest.startswith(":") else default_port
+    if address.count(":") == 1:
+        host, port = address.split(":")
+        return host, int(port)
+    return address, default_port
+
+
+class TlsEndpointVerifier:
+    """
+    部署后的 TLS 端点校验器。
+    使用 asyncio 并发连接每个端点，对证书中的每个 SAN 分别以其作为 SNI 完成 TLS 握手，
+    将服务器返回的终端证书指纹与刚保存的证书比较，并记录握手耗时。
+    由于直接比较指纹，默认不校验证书链，因此也可以用于测试环境的证书和本地 TLS 服务器。
+    """
+    def __init__(self, concurrency: int = 200, timeout: float = 5.0, attempts: int = 1, retry_delay: float = 2.0,
+                 ssl_context: Optional[ssl.SSLContext] = None):
+        """
+        初始化 TlsEndpointVerifier。
+        :param concurrency: 同时进行的握手数量上限。
+        :param timeout: 单次连接和握手的超时时间（秒）。
+        :param attempts: 指纹不一致或连接失败时的最大尝试次数（服务器可能仍在重载）。
+        :param retry_delay: 两次尝试之间的等待时间（秒）。
+        :param ssl_context: (可选) 自定义的 SSLContext，默认不校验证书链和主机名。
+        """
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.attempts = max(1, attempts)
+        self.retry_delay = retry_delay
+        if ssl_context is None:
+            ssl_context = ssl.create_default_context()
+            ssl_context.check_hostname = False
+            ssl_context.verify_mode = ssl.CERT_NONE
+        self.ssl_context = ssl_context
+
+    async def _handshake(self, host: str, port: int, server_name: str) -> Tuple[str, float]:
+        """
+        完成一次 TLS 握手，返回 (终端证书的 SHA-256 指纹, 连接和握手耗时毫秒数)。
+        """
+        start = time.perf_counter()
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=self.ssl_context, server_hostname=server_name,
+                                    ssl_handshake_timeout=self.timeout),
+            self.timeout
+        )
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        try:
+            der = writer.get_extra_info("ssl_object").getpeercert(binary_form=True)
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, ssl.SSLError):
+                pass
+        return hashlib.sha256(der).hexdigest(), elapsed_ms
+
+    async def _probe(self, semaphore: asyncio.Semaphore, host: str, port: int, server_name: str,
+                     expected: set) -> Dict[str, Any]:
+        result = {"endpoint": f"{host}:{port}", "server_name": server_name, "matched": False,
+                  "fingerprint": None, "handshake_ms": None, "attempts": 0, "error": None}
+        for attempt in range(self.attempts):
+            if attempt:
+                await asyncio.sleep(self.retry_delay)
+            result["attempts"] = attempt + 1
+            async with semaphore:
+                try:
+                    fingerprint, elapsed_ms = await self._handshake(host, port, server_name)
+                    result.update(fingerprint=fingerprint, handshake_ms=round(elapsed_ms, 1), error=None,
+                                  matched=fingerprint in expected)
+                except (OSError, ssl.SSLError, asyncio.TimeoutError) as e:
+                    result.update(fingerprint=None, handshake_ms=None, error=str(e) or type(e).__name__)
+            if result["matched"]:
+                break
+        return result
+
+    async def _verify_async(self, targets: List[Tuple[str, int, str]], expected: set) -> List[Dict[str, Any]]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        return await asyncio.gather(*(self._probe(semaphore, host, port, name, expected) for host, port, name in targets))
+
+    def verify(self, certificate_paths: List[str], endpoints: List[Union[str, Dict[str, Any]]],
+               domains: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        校验所有端点是否已经在提供新证书。
+        :param certificate_paths: 新证书文件路径列表（双算法签发时包含两张证书，端点提供其中任意一张即视为一致）。
+        :param endpoints: 端点列表，每项为 "host:port" 字符串，或 {"address": "host:port", "domains": [...]} 字典，
+                          domains 表示该端点只服务这些域名（不填则服务证书中的所有域名）。
+        :param domains: (可选) 需要校验的域名，默认使用第一张证书中的 SAN。
+        :return: {"checked", "matched", "mismatched", "errors", "skipped", "latency_ms", "results"}
+        """
+        expected = set()
+        for path in certificate_paths:
+            with open(path, "rb") as f:
+                metadata = parse_certificate_metadata(f.read())
+            expected.add(metadata["fingerprint_sha256"])
+            if domains is None:
+                domains = metadata["sans"]
+
+        # 通配符域名没有确定的 SNI，跳过（由同一端点上的其他 SAN 覆盖）
+        skipped = [name for name in domains if name.startswith("*.")]
+        names = [name for name in domains if not name.startswith("*.")]
+        targets = []
+        for endpoint in endpoints:
+            if isinstance(endpoint, str):
+                endpoint = {"address": endpoint}
+            host, port = parse_endpoint(endpoint["address"])
+            served = endpoint.get("domains")
+            targets.extend((host, port, name) for name in names if not served or name in served)
+
+        if not targets:
+            return {"checked": 0, "matched": 0, "mismatched": [], "errors": [], "skipped": skipped,
+                    "latency_ms": None, "results": []}
+
+        logger.info(f"[TLS 校验]开始校验 {len(endpoints)} 个端点、共 {len(targets)} 次握手，并发数 {self.concurrency}。")
+        results = asyncio.run(self._verify_async(targets, expected))
+
+        latencies = sorted(r["handshake_ms"] for r in results if r["handshake_ms"] is not None)
+        summary = {
+            "checked": len(results),
+            "matched": sum(1 for r in results if r["matched"]),
+            "mismatched": [r for r in results if not r["matched"] and r["fingerprint"] is not None],
+            "errors": [r for r in results if r["fingerprint"] is None],
+            "skipped": skipped,
+            "latency_ms": {
+                "p50": latencies[len(latencies) // 2],
+                "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+                "max": latencies[-1],
+            } if latencies else None,
+            "results": results,
+        }
+        for r in summary["mismatched"]:
+            logger.warning(f"[TLS 校验]{r['endpoint']} (SNI {r['server_name']}) 提供的证书与新证书不一致，指纹：{r['fingerprint']}")
+        for r in summary["errors"]:
+            logger.warning(f"[TLS 校验]{r['endpoint']} (SNI {r['server_name']}) 握手失败：{r['error']}")
+        logger.info(f"[TLS 校验]完成：一致 {summary['matched']}/{summary['checked']}，不一致 {len(summary['mismatched'])}，"
+                    f"失败 {len(summary['errors'])}，握手耗时 {summary['latency_ms']}")
+        return summary